@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import mmap
 import os
+import re
 import struct
-from typing import Dict, List, Any
+import time
+import warnings
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+import catalog_index
+import iso9660
+import package_store
+from binary_sections import resolve_offset, is_file_offset, parse_number, section_index, SectionIndex, StringPool
 
 # ----------------------------
 # Basic readers
@@ -24,39 +35,59 @@ def read_u32_be(chunk: bytes) -> int:
 # Byte1: high=challenge, low=heavy
 # Byte2: low=beginner (high reserved. Double beginner?)
 # Byte3: reserved
+# In the config every level is a field of its own: "single_light" is a "nibble_lo" at byte 0 of the group...
+# (nibble_difficulty_fields writes them). Older configs have a 4 byte "single_difficulties" /
+# "double_difficulties" field and "difficulty_scale": "1_10" instead, see expand_difficulty_fields.
 # ----------------------------
 
-def parse_difficulties(raw_bytes: bytes) -> Dict[str, int]:
-    if len(raw_bytes) != 4:
-        raise ValueError("Difficulty block must be 4 bytes")
-    b0, b1, b2, _ = raw_bytes
-    standard  = (b0 >> 4) & 0xF
-    light     = b0 & 0xF
-    challenge = (b1 >> 4) & 0xF
-    heavy     = b1 & 0xF
-    beginner  = b2 & 0xF
-    return {
-        "beginner": beginner,
-        "light": light,
-        "standard": standard,
-        "heavy": heavy,
-        "challenge": challenge
-    }
+# level -> (byte inside the 4 bytes, field type)
+DIFFICULTY_NIBBLES = {
+    "beginner":  (2, "nibble_lo"),
+    "light":     (0, "nibble_lo"),
+    "standard":  (0, "nibble_hi"),
+    "heavy":     (1, "nibble_lo"),
+    "challenge": (1, "nibble_hi"),
+}
+
+DIFFICULTY_SCALES = ("1_10", "1_20")
+
+def nibble_difficulty_fields(mode: str, pos: int) -> List[List[Any]]:
+    """The config fields of a 1-10 difficulty group (4 bytes at 'pos'): "<mode>_beginner"... as nibbles."""
+    return [[f"{mode}_{level}", f"0x{pos + byte:02X}", 1, ntype] for level, (byte, ntype) in DIFFICULTY_NIBBLES.items()]
+
+def expand_difficulty_fields(positions: List[tuple], scale: str) -> List[tuple]:
+    """
+    Legacy configs, the only place "difficulty_scale" is looked at: with "1_10", the 4 byte
+    "single_difficulties" / "double_difficulties" fields get their per level nibble fields.
+    Fields already in the config win. 'positions' are (name, offset, size, type), like field_positions gives.
+    """
+    if scale not in DIFFICULTY_SCALES:
+        raise ValueError(f"Unknown difficulty mode: {scale}")
+    if scale != "1_10":
+        return positions
+    names = {p[0] for p in positions}
+    extra = []
+    for name, pos, size, ftype in positions:
+        mode = name[:-len("_difficulties")]
+        if name.endswith("_difficulties") and size == 4:
+            for level, (byte, ntype) in DIFFICULTY_NIBBLES.items():
+                if f"{mode}_{level}" not in names:
+                    extra.append((f"{mode}_{level}", pos + byte, 1, ntype))
+    return positions + extra
 
 # -------------------
 # Generic block parse
 # -------------------
 
-def parse_block(data: bytes, fields: List[List[Any]]) -> Dict[str, Any]:
+def field_positions(fields: List[List[Any]]):
     """
-    Hybrid parser::
+    Yields (name, offset, size, type) for every field, with the offset as an integer.
+    Accepts both field formats:
     - Sequential format: ["name", size, tipo]
     - Offet input format: ["name", offset, size, tipo]
       Offset can be integer or a string "0x.." with hex values.
     """
-    result: Dict[str, Any] = {}
     offset = 0
-
     for field in fields:
         if len(field) == 3:
             # Sequential format
@@ -74,140 +105,226 @@ def parse_block(data: bytes, fields: List[List[Any]]) -> Dict[str, Any]:
                     pos = int(pos)  # In case it comes as "12"
         else:
             raise ValueError(f"Invalid Field format: {field}")
+        yield name, pos, size, ftype
+
+# ----------------------------
+# Field types
+# - Integers: u8, s8, u16, s16, u32, s32 (s = signed).
+#   With "_le" or "_be" at the end (u16_le, u32_be...) the byte order is fixed. Without it,
+#   the "endianness" block of the config decides, e.g. {"u16": "le", "u32": "be"}. Default is "le".
+# - Bits: "nibble_lo" / "nibble_hi" (low/high 4 bits of 1 byte), or "bits:<shift>:<width>" for
+#   <width> bits starting at bit <shift> of a 1, 2 or 4 byte field (read with the config's byte order).
+# - Pointers: "ptr" is the 4 byte address of something else in the file (a title string...), read like a u32.
+#   "ptr_le" / "ptr_be" fix the byte order. The value is the address as it is, see parse_titles_pointers.
+# - "string" and "bytes" (and anything unknown) are taken as they are.
+# ----------------------------
+
+INT_TYPE = re.compile(r"^([us])(8|16|32)(?:_(le|be))?$")
+BITS_TYPE = re.compile(r"^bits:(\d+):(\d+)$")
+NIBBLE_TYPES = {"nibble_lo": (0, 4), "nibble_hi": (4, 4)}
+INT_CHARS = {(False, 1): "B", (True, 1): "b", (False, 2): "H", (True, 2): "h", (False, 4): "I", (True, 4): "i"}
+BYTE_ORDERS = {"le": "<", "be": ">"}
+POINTER_TYPES = {"ptr": "u32", "ptr_le": "u32_le", "ptr_be": "u32_be"}
+
+_field_readers: Dict[tuple, Optional[tuple]] = {}
+
+def field_reader(ftype: str, size: int, endianness: Optional[Dict[str, str]] = None) -> Optional[tuple]:
+    """
+    How to read a numeric field: (byte order, struct char, bits), where bits is (shift, mask) or None.
+    None if the type isn't numeric.
+    """
+    endianness = endianness or {}
+    key = (ftype, size, endianness.get("u16"), endianness.get("u32"))
+    if key in _field_readers:
+        return _field_readers[key]
+
+    reader = None
+    m = INT_TYPE.match(POINTER_TYPES.get(ftype, ftype))
+    if m:
+        width = int(m.group(2)) // 8
+        order = m.group(3) or endianness.get(f"u{m.group(2)}", "le")
+        reader = (BYTE_ORDERS[order], INT_CHARS[(m.group(1) == "s", width)], None)
+    else:
+        if ftype in NIBBLE_TYPES:
+            shift, width = NIBBLE_TYPES[ftype]
+        else:
+            m = BITS_TYPE.match(ftype)
+            shift, width = (int(m.group(1)), int(m.group(2))) if m else (None, None)
+        if shift is not None and size in (1, 2, 4):
+            if shift + width > size * 8:
+                raise ValueError(f"'{ftype}' doesn't fit in {size} byte(s)")
+            order = endianness.get(f"u{size * 8}", "le")
+            reader = (BYTE_ORDERS[order], INT_CHARS[(False, size)], (shift, (1 << width) - 1))
+
+    if reader is not None and struct.calcsize(reader[1]) > size:
+        raise ValueError(f"'{ftype}' needs {struct.calcsize(reader[1])} bytes, the field has {size}")
+    _field_readers[key] = reader
+    return reader
+
+def decode_field(chunk: bytes, ftype: str, endianness: Optional[Dict[str, str]] = None) -> Any:
+    if ftype == "string":
+        return chunk.decode("ascii", errors="ignore").strip("\x00")
+    reader = field_reader(ftype, len(chunk), endianness)
+    if reader is None:
+        return bytes(chunk)
+    order, char, bits = reader
+    value = struct.unpack_from(order + char, chunk)[0]
+    if bits:
+        value = (value >> bits[0]) & bits[1]
+    return value
+
+def parse_block(data: bytes, fields: List[List[Any]], endianness: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Hybrid parser, see field_positions for the accepted field formats.
+    """
+    result: Dict[str, Any] = {}
 
+    for name, pos, size, ftype in field_positions(fields):
         chunk = data[pos:pos+size]
         if len(chunk) != size:
             raise ValueError(f"Incomplete block when reading '{name}' (expected {size}, got {len(chunk)})")
-
-        if ftype == "string":
-            result[name] = chunk.decode("ascii", errors="ignore").strip("\x00")
-        elif ftype == "u8":
-            result[name] = read_u8(chunk)
-        elif ftype == "u16_le":
-            result[name] = read_u16_le(chunk)
-        elif ftype == "u32_be":
-            result[name] = read_u32_be(chunk)
-        elif ftype == "bytes":
-            result[name] = chunk
-        else:
-            result[name] = chunk
+        result[name] = decode_field(chunk, ftype, endianness)
 
     return result
 
 # ----------------------------
-# Radar block construction from individual values
+# Groove radar matrix.
+# Instead of 45 separate keys (and a bunch of nested dicts) per song, the radar values
+# are stored in a flat array of mode × level × metric (2 × 5 × 5 = 50 values).
+# Where each field goes in that array is worked out once per config and cached,
+# and the nested dict is only built when the package is written.
 # ----------------------------
 
+RADAR_MODES = ("single", "double")
+RADAR_LEVELS = ("beginner", "light", "standard", "heavy", "challenge")
+RADAR_METRICS = ("voltage", "stream", "air", "chaos", "freeze")
+RADAR_SIZE = len(RADAR_MODES) * len(RADAR_LEVELS) * len(RADAR_METRICS)
+
+# Radar values are small numbers, almost always u8/u16: the matrix is 16 bit then. Any other numeric type
+# (s16, u32, bits...) makes the matrix of the config 64 bit instead, so no value is cut.
+RADAR_FORMATS = ("B", "H")
+RADAR_MAX_H = 0xFFFF
+
+def radar_index(mode: str, level: str, metric: str) -> int:
+    return ((RADAR_MODES.index(mode) * len(RADAR_LEVELS) + RADAR_LEVELS.index(level))
+            * len(RADAR_METRICS) + RADAR_METRICS.index(metric))
+
+# Config field name -> position in the matrix. e.g. "voltage_single_light" -> 5
+RADAR_KEYS = {
+    f"{metric}_{mode}_{level}": radar_index(mode, level, metric)
+    for mode in RADAR_MODES for level in RADAR_LEVELS for metric in RADAR_METRICS
+}
+
+_radar_plans: Dict[tuple, tuple] = {}
+
+def radar_plan(fields: List[List[Any]], endianness: Optional[Dict[str, str]] = None) -> tuple:
+    """
+    Splits the config fields in two:
+    - The radar reads, as (matrix index, offset, struct format, bits) tuples.
+    - The rest of the fields, to be read with parse_block as usual.
+    The result is cached, so it's only computed once per config.
+    Radar fields without an offset are skipped (they stay at 0). Radar fields that aren't numbers stay in the rest.
+    Sequential fields (["name", size, "type"]) get their offset written down, so taking the radar fields
+    out doesn't move the ones after them.
+    """
+    key = (tuple(tuple(f) for f in fields), tuple(sorted((endianness or {}).items())))
+    plan = _radar_plans.get(key)
+    if plan is not None:
+        return plan
+
+    reads = []
+    others = []
+    offset = 0  # Same running offset as field_positions
+    for field in fields:
+        if len(field) == 3:
+            name, size, ftype = field
+            pos = offset
+            offset += size
+        elif len(field) == 4:
+            name, pos, size, ftype = field
+        else:
+            raise ValueError(f"Invalid Field format: {field}")
+        reader = field_reader(ftype, size, endianness) if name in RADAR_KEYS else None
+        if reader is None:
+            others.append([name, pos, size, ftype])
+            continue
+        if pos == "":
+            continue
+        if isinstance(pos, str):
+            pos = int(pos, 16) if pos.startswith("0x") else int(pos)
+        reads.append((RADAR_KEYS[name], pos, reader[0] + reader[1], reader[2]))
+
+    plan = (tuple(reads), others)
+    _radar_plans[key] = plan
+    return plan
+
+def radar_typecode(reads: tuple) -> str:
+    """Array type of the radar matrix: "H" if every read fits in 16 bits unsigned, "q" if not."""
+    for _, _, fmt, bits in reads:
+        if (bits[1] > RADAR_MAX_H) if bits else (fmt[1] not in RADAR_FORMATS):
+            return "q"
+    return "H"
+
+def read_radar_matrix(data: bytes, base: int, reads: tuple, typecode: str = "H") -> array:
+    matrix = array(typecode, [0]) * RADAR_SIZE
+    for idx, pos, fmt, bits in reads:
+        value = struct.unpack_from(fmt, data, base + pos)[0]
+        matrix[idx] = (value >> bits[0]) & bits[1] if bits else value
+    return matrix
+
+def radar_matrix_from_block(b: Dict[str, Any]) -> array:
+    """Returns the radar matrix of a block, building it from the individual keys if needed."""
+    matrix = b.get("radar")
+    if matrix is not None:
+        return matrix
+    values = [0] * RADAR_SIZE
+    for key, idx in RADAR_KEYS.items():
+        values[idx] = b.get(key, 0)
+    return array("H" if all(0 <= v <= RADAR_MAX_H for v in values) else "q", values)
+
+def radar_matrix_to_dict(matrix: array, include_single_beginner: bool = False) -> Dict[str, Any]:
+    result = {}
+    for m, mode in enumerate(RADAR_MODES):
+        levels = {}
+        for l, level in enumerate(RADAR_LEVELS):
+            # Only single mode may have a beginner radar, and only if the config asks for it.
+            if level == "beginner" and not (mode == "single" and include_single_beginner):
+                continue
+            base = (m * len(RADAR_LEVELS) + l) * len(RADAR_METRICS)
+            levels[level] = dict(zip(RADAR_METRICS, matrix[base:base + len(RADAR_METRICS)]))
+        result[mode] = levels
+    return result
+
 def build_groove_radar(b: Dict[str, Any], include_single_beginner: bool = False) -> Dict[str, Any]:
-    def grab(metric: str, mode: str, level: str) -> int:
-        key = f"{metric}_{mode}_{level}"
-        return b.get(key, 0)
-
-    single = {
-        "light": {
-            "voltage": grab("voltage", "single", "light"),
-            "stream":  grab("stream",  "single", "light"),
-            "air":     grab("air",     "single", "light"),
-            "chaos":   grab("chaos",   "single", "light"),
-            "freeze":  grab("freeze",  "single", "light"),
-        },
-        "standard": {
-            "voltage": grab("voltage", "single", "standard"),
-            "stream":  grab("stream",  "single", "standard"),
-            "air":     grab("air",     "single", "standard"),
-            "chaos":   grab("chaos",   "single", "standard"),
-            "freeze":  grab("freeze",  "single", "standard"),
-        },
-        "heavy": {
-            "voltage": grab("voltage", "single", "heavy"),
-            "stream":  grab("stream",  "single", "heavy"),
-            "air":     grab("air",     "single", "heavy"),
-            "chaos":   grab("chaos",   "single", "heavy"),
-            "freeze":  grab("freeze",  "single", "heavy"),
-        },
-        "challenge": {
-            "voltage": grab("voltage", "single", "challenge"),
-            "stream":  grab("stream",  "single", "challenge"),
-            "air":     grab("air",     "single", "challenge"),
-            "chaos":   grab("chaos",   "single", "challenge"),
-            "freeze":  grab("freeze",  "single", "challenge"),
-        },
-    }
+    return radar_matrix_to_dict(radar_matrix_from_block(b), include_single_beginner)
 
-    if include_single_beginner:
-        single["beginner"] = {
-            "voltage": grab("voltage", "single", "beginner"),
-            "stream":  grab("stream",  "single", "beginner"),
-            "air":     grab("air",     "single", "beginner"),
-            "chaos":   grab("chaos",   "single", "beginner"),
-            "freeze":  grab("freeze",  "single", "beginner"),
-        }
-
-    double = {
-        "light": {
-            "voltage": grab("voltage", "double", "light"),
-            "stream":  grab("stream",  "double", "light"),
-            "air":     grab("air",     "double", "light"),
-            "chaos":   grab("chaos",   "double", "light"),
-            "freeze":  grab("freeze",  "double", "light"),
-        },
-        "standard": {
-            "voltage": grab("voltage", "double", "standard"),
-            "stream":  grab("stream",  "double", "standard"),
-            "air":     grab("air",     "double", "standard"),
-            "chaos":   grab("chaos",   "double", "standard"),
-            "freeze":  grab("freeze",  "double", "standard"),
-        },
-        "heavy": {
-            "voltage": grab("voltage", "double", "heavy"),
-            "stream":  grab("stream",  "double", "heavy"),
-            "air":     grab("air",     "double", "heavy"),
-            "chaos":   grab("chaos",   "double", "heavy"),
-            "freeze":  grab("freeze",  "double", "heavy"),
-        },
-        "challenge": {
-            "voltage": grab("voltage", "double", "challenge"),
-            "stream":  grab("stream",  "double", "challenge"),
-            "air":     grab("air",     "double", "challenge"),
-            "chaos":   grab("chaos",   "double", "challenge"),
-            "freeze":  grab("freeze",  "double", "challenge"),
-        },
-    }
-    return {"single": single, "double": double}
+def fill_zero_radars(packages: Iterable[Dict[str, Any]], radars: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Radars that are all 0 in the packages get the values from 'radars' ({music_id: {mode: {level: radar}}},
+    see ssq_radar.py). Real values are never replaced. Returns how many radars were filled.
+    """
+    filled = 0
+    for pkg in packages:
+        song = radars.get(pkg["music_id"])
+        if not song:
+            continue
+        for mode, levels in pkg["groove_radar"].items():
+            for level, radar in levels.items():
+                new = song.get(mode, {}).get(level)
+                if new and not any(radar.values()) and any(new.values()):
+                    levels[level] = dict(new)
+                    filled += 1
+    return filled
 
 # ------------------------------------------------------
-# To build the difficulty block according to the old 1-10 scale or the modern 1-20 scale.
-# The old difficulties were set with only 1 BIT, and nowadays they're set with a whole byte.
-# Here a parameter is created to be set in the config.json file.
-# 
-# The field is called "difficulty_scale" and can be set to:
-# - "1_10" (games prior to DDR X) or 
-# - "1_20" (DDR X and later)
+# The difficulty block of a package.
+# The old 1-10 scale keeps every level in a nibble, DDR X and later (1-20) in a whole byte. That's only
+# how the fields are set in the config ("nibble_lo"/"nibble_hi" or "u8"), here they're all read the same:
+# "single_light", "double_heavy"... by name, 0 if the game doesn't have it.
 # ------------------------------------------------------
 
-def build_difficulties(b: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
-    mode = cfg.get("difficulty_scale", "1_10")
-    if mode == "1_10":
-        single = parse_difficulties(b["single_difficulties"])
-        double = parse_difficulties(b["double_difficulties"])
-    elif mode == "1_20":
-        single = {
-            "beginner": b.get("single_beginner", 0),
-            "light":    b.get("single_light", 0),
-            "standard": b.get("single_standard", 0),
-            "heavy":    b.get("single_heavy", 0),
-            "challenge":b.get("single_challenge", 0),
-        }
-        double = {
-            "beginner": b.get("double_beginner", 0),
-            "light":    b.get("double_light", 0),
-            "standard": b.get("double_standard", 0),
-            "heavy":    b.get("double_heavy", 0),
-            "challenge":b.get("double_challenge", 0),
-        }
-    else:
-        raise ValueError(f"Unknown difficulty mode: {mode}")
-    return {"single": single, "double": double}
+def build_difficulties(b: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    return {play: {level: b.get(f"{play}_{level}", 0) for level in RADAR_LEVELS} for play in RADAR_MODES}
 
 # ----------------------------
 # Function to parse titles from the file.
@@ -453,6 +570,38 @@ def parse_titles_sequential(data: bytes, start: int, end: int) -> list[str]:
     return titles
 
 
+# ----------------------------
+# Titles from pointers.
+# Some song tables don't need a title table to be guessed: every block has the ADDRESS of its title.
+# Map it as a "title_ptr" field of type "ptr" (and "title2_ptr" if there's a second one) and set
+# "titles_parser": "parse_titles_pointers". "pointer_base" in the config is the address the file is
+# loaded at (file offset = address - pointer_base). Without it, the section table of the executable is used.
+# No scanning and no guessing: every block gets exactly the string it points to, so orphans can't happen.
+# ----------------------------
+POINTER_PARSER = "parse_titles_pointers"
+
+def parse_titles_pointers(data: bytes, bloques: List[Any], pointer_base: Optional[int] = None,
+                          index: Optional[SectionIndex] = None) -> dict:
+    pool = StringPool(data, pointer_base, index)
+    titles_map = {}
+    for b in bloques:
+        title = pool.get(b.get("title_ptr") or 0)
+        if not title:
+            continue
+        titles_map[b["music_id"].lower()] = (title, pool.get(b.get("title2_ptr") or 0) or title)
+    return titles_map
+
+
+# Parsers that give a music_id -> (title, title) map, by their config name.
+# parse_titles_sequential isn't here, it gives a list that's matched to the blocks in order.
+# parse_titles_pointers isn't either, it reads the blocks instead of a part of the file.
+TITLE_PARSERS = {
+    "parse_titles": parse_titles,
+    "parse_titles_reverse": parse_titles_reverse,
+    "parse_titles_supernova": parse_titles_supernova,
+}
+
+
 # ----------------------------
 # Ewport: global (single file) and per song.
 # ----------------------------
@@ -478,7 +627,7 @@ def block_to_package(b: Dict[str, Any], cfg: Dict[str, Any], slpm_name: str, tit
         "artist": "Artist goes here",
         "bpms": [b.get("bpm1", 0), b.get("bpm2", 0)],
         "memory_card_link_id": b.get("memcard_link_id", 0),
-        "difficulties": build_difficulties(b, cfg),
+        "difficulties": build_difficulties(b),
         "groove_radar": build_groove_radar(b, include_single_beginner=include_beginner),
         "_origin": slpm_name,
         "data": {
@@ -494,86 +643,377 @@ def block_to_package(b: Dict[str, Any], cfg: Dict[str, Any], slpm_name: str, tit
         "game_category": "DDR CS"
     }
 
+# ----------------------------
+# Lazy song records.
+# A record only remembers which block of its table it is. The table is a buffer shared by all the records.
+# Numeric fields (radar included) are decoded for ALL the blocks at once, the first time any of them
+# is asked for: one struct with pad bytes ("x") between the fields covers a whole block, and
+# struct.iter_unpack runs it over the table in a single pass (one pass per byte order).
+# Strings and bytes are decoded per record the first time they're asked for, and then cached.
+# Records behave like a read-only dict, so block_to_package and friends don't notice the difference.
+# ----------------------------
+
+class BlockLayout:
+    """Field offsets and types of one config, checked and compiled once (see block_layout)."""
+    __slots__ = ("size", "fields", "radar_reads", "radar_type", "endianness", "batches", "columns")
+
+    def __init__(self, fields: List[List[Any]], size: int, endianness: Optional[Dict[str, str]] = None,
+                 difficulty_scale: str = "1_10"):
+        radar_reads, others = radar_plan(fields, endianness)
+        self.size = size
+        self.radar_reads = radar_reads
+        self.radar_type = radar_typecode(radar_reads)
+        self.endianness = endianness
+        self.fields = {}
+        for name, pos, fsize, ftype in expand_difficulty_fields(list(field_positions(others)), difficulty_scale):
+            if pos + fsize > size:
+                raise ValueError(f"Incomplete block when reading '{name}' (expected {fsize}, got {max(size - pos, 0)})")
+            self.fields[name] = (pos, fsize, ftype)
+        self.batches, self.columns = self.compile_batches()
+
+    def compile_batches(self) -> tuple:
+        """
+        One struct per byte order. Fields reading the same bytes the same way share a column
+        (like the nibbles of one byte). Fields overlapping some other read are left out, they're
+        decoded on their own.
+        Returns ([(struct, number of columns)], {name: (batch, column, bits)}).
+        Radar values are in there too, named by their matrix index.
+        """
+        reads: Dict[tuple, List[tuple]] = {}  # (order, pos, char) -> [(name, bits)]
+        for name, (pos, fsize, ftype) in self.fields.items():
+            reader = field_reader(ftype, fsize, self.endianness)
+            if reader is not None:
+                order, char, bits = reader
+                reads.setdefault((order, pos, char), []).append((name, bits))
+        for idx, pos, fmt, bits in self.radar_reads:
+            reads.setdefault((fmt[0], pos, fmt[1]), []).append((idx, bits))
+
+        batches = []
+        columns = {}
+        for order in BYTE_ORDERS.values():
+            fmt = []
+            end = 0
+            col = 0
+            for (o, pos, char), names in sorted(reads.items(), key=lambda r: r[0][1]):
+                if o != order or pos < end:
+                    continue
+                fmt.append(f"{pos - end}x{char}" if pos > end else char)
+                end = pos + struct.calcsize(char)
+                for name, bits in names:
+                    columns[name] = (len(batches), col, bits)
+                col += 1
+            if col:
+                if self.size > end:
+                    fmt.append(f"{self.size - end}x")
+                batches.append((struct.Struct(order + "".join(fmt)), col))
+
+        radar = {name: columns.pop(name) for name in list(columns) if isinstance(name, int)}
+        if len(radar) == len(self.radar_reads):
+            columns["radar"] = radar
+        # else: some radar value overlaps another field, read_radar_matrix does it per record
+        return batches, columns
+
+    def names(self) -> List[str]:
+        return list(self.fields) + ["radar"]
+
+    def decode(self, data, base: int, name: str) -> Any:
+        if name == "radar":
+            return read_radar_matrix(data, base, self.radar_reads, self.radar_type)
+        pos, size, ftype = self.fields[name]
+        start = base + pos
+        return decode_field(data[start:start+size], ftype, self.endianness)
+
+    @staticmethod
+    def radar_column(batch_columns: List[Any], where: tuple) -> Any:
+        batch, col, bits = where
+        values = batch_columns[batch][col]
+        if bits:
+            shift, mask = bits
+            values = [(v >> shift) & mask for v in values]
+        return values
+
+    def decode_columns(self, data, start: int, count: int) -> Dict[str, Any]:
+        """Every batched field of 'count' blocks starting at 'start', as name -> list of values."""
+        batch_columns = []
+        with memoryview(data) as view, view[start:start + count * self.size] as table:
+            for st, ncols in self.batches:
+                rows = list(st.iter_unpack(table))
+                batch_columns.append(list(zip(*rows)) if rows else [()] * ncols)
+
+        result = {}
+        for name, where in self.columns.items():
+            if name == "radar":
+                # Matrix position -> values of all the blocks. Positions not in the config stay at 0.
+                zeros = (0,) * count
+                sources = [self.radar_column(batch_columns, where[i]) if i in where else zeros for i in range(RADAR_SIZE)]
+                result["radar"] = [array(self.radar_type, values) for values in zip(*sources)] if count else []
+                continue
+            batch, col, bits = where
+            values = batch_columns[batch][col]
+            if bits:
+                shift, mask = bits
+                values = [(v >> shift) & mask for v in values]
+            result[name] = values
+        return result
+
+_block_layouts: Dict[tuple, BlockLayout] = {}
+
+def block_layout(cfg: Dict[str, Any]) -> BlockLayout:
+    size = int(cfg["block_size"])
+    endianness = cfg.get("endianness")
+    scale = cfg.get("difficulty_scale", "1_10")
+    key = (size, tuple(tuple(f) for f in cfg["fields"]), tuple(sorted((endianness or {}).items())), scale)
+    layout = _block_layouts.get(key)
+    if layout is None:
+        layout = _block_layouts[key] = BlockLayout(cfg["fields"], size, endianness, scale)
+    return layout
+
+class SongTable:
+    """The blocks of one song table, inside a shared buffer. Batched columns are decoded on first use."""
+    __slots__ = ("data", "start", "count", "layout", "_columns")
+
+    def __init__(self, data, start: int, count: int, layout: BlockLayout):
+        self.data = data
+        self.start = start
+        self.count = count
+        self.layout = layout
+        self._columns = None
+
+    def columns(self) -> Dict[str, Any]:
+        if self._columns is None:
+            self._columns = self.layout.decode_columns(self.data, self.start, self.count)
+        return self._columns
+
+    def records(self) -> List["SongRecord"]:
+        return [SongRecord(self, i) for i in range(self.count)]
+
+class SongRecord:
+    __slots__ = ("_table", "_index", "_values")
+
+    def __init__(self, table: SongTable, index: int):
+        self._table = table
+        self._index = index
+        self._values = None
+
+    @property
+    def _base(self) -> int:
+        return self._table.start + self._index * self._table.layout.size
+
+    def __getitem__(self, name: str) -> Any:
+        table = self._table
+        if name in table.layout.columns:
+            columns = table._columns
+            if columns is None:
+                columns = table.columns()
+            return columns[name][self._index]
+        layout = table.layout
+        values = self._values
+        if values is None:
+            values = self._values = {}
+        elif name in values:
+            return values[name]
+        if name != "radar" and name not in layout.fields:
+            raise KeyError(name)
+        value = values[name] = layout.decode(self._table.data, self._base, name)
+        return value
+
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: object) -> bool:
+        return name == "radar" or name in self._table.layout.fields
+
+    def keys(self) -> List[str]:
+        return self._table.layout.names()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self._table.layout.fields) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decodes every field. Handy for debugging."""
+        return {name: self[name] for name in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"SongRecord(base={hex(self._base)}, music_id={self.get('music_id')!r})"
+
 # ----------------------------
 # Consecutive block read
+# If the whole file is already in memory, pass it as 'data' and the records will point into it.
+# Otherwise only the song table is read from the file (unless the offsets are addresses,
+# then the whole file is needed to look at its sections). 'index' is its section table, if already parsed.
 # ----------------------------
-def read_consecutive_blocks(file_name: str, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
-    bloques: List[Dict[str, Any]] = []
-    with open(file_name, "rb") as f:
-        start = int(cfg["offset"])
-        end = int(cfg["end_offset"])
-        size = int(cfg["block_size"])
-
-        if end < start:
-            raise ValueError("end_offset cannot be lower than offset.")
-        total = end - start
-        if total % size != 0:
-            print(f"WARNING: block range ({hex(start)}–{hex(end)}) is not an exact multiple of block_size {hex(size)}.")
-
-        num_bloques = total // size
-        f.seek(start)
-
-        for _ in range(num_bloques):
-            data = f.read(size)
-            if not data or len(data) < size:
-                break
-            bloque = parse_block(data, cfg["fields"])
-            bloques.append(bloque)
+def read_consecutive_blocks(file_name: str, cfg: Dict[str, Any], data: bytes = None,
+                            index: Optional[SectionIndex] = None) -> List[SongRecord]:
+    addresses = not (is_file_offset(cfg["offset"]) and is_file_offset(cfg["end_offset"]))
+    if data is None and addresses:
+        with open(file_name, "rb") as f:
+            data = f.read()
+    if index is None and addresses:
+        index = section_index(data)
+
+    start = resolve_offset(cfg["offset"], data, index)
+    end = resolve_offset(cfg["end_offset"], data, index)
+    size = int(cfg["block_size"])
+
+    if end < start:
+        raise ValueError("end_offset cannot be lower than offset.")
+    total = end - start
+    if total % size != 0:
+        warnings.warn(f"block range ({hex(start)}–{hex(end)}) is not an exact multiple of block_size {hex(size)}.")
+
+    num_bloques = total // size
+
+    if data is None:
+        with open(file_name, "rb") as f:
+            f.seek(start)
+            data = f.read(num_bloques * size)
+        base = 0
+    else:
+        base = start
+
+    # Only complete blocks, same as before
+    num_bloques = min(num_bloques, max(len(data) - base, 0) // size)
 
-    return bloques
+    layout = block_layout(cfg)
+    return SongTable(data, base, num_bloques, layout).records()
 
 # ----------------------------
 # External config. reading
 # ----------------------------
+# ----------------------------
+# Layout templates.
+# Games with the same song table layout don't have to repeat it: "_layouts" in config.json has named layouts
+# (block_size, difficulty_scale, endianness and fields), and an entry with "layout": "<name>" gets them.
+# Whatever the entry sets itself wins, and its "field_overrides" replace (or add) fields by name.
+# Keys starting with "_" aren't games, load_config leaves them out.
+# Entries with the same layout share the same fields, so block_layout compiles it once for all of them.
+# ----------------------------
+LAYOUTS_KEY = "_layouts"
+LAYOUT_KEYS = ("block_size", "difficulty_scale", "endianness", "fields")
+
+def is_game_key(key: str) -> bool:
+    return not key.startswith("_")
+
+def apply_field_overrides(fields: List[List[Any]], overrides: List[List[Any]]) -> List[List[Any]]:
+    by_name = {f[0]: f for f in overrides}
+    result = [by_name.get(f[0], f) for f in fields]
+    names = {f[0] for f in fields}
+    return result + [f for f in overrides if f[0] not in names]
+
+def resolve_entry(cfg: Dict[str, Any], layouts: Dict[str, Any], key: str = "?") -> Dict[str, Any]:
+    """The entry with its layout template and field overrides applied. The entry itself isn't changed."""
+    resolved = dict(cfg)
+    name = cfg.get("layout")
+    if name is not None:
+        if name not in layouts:
+            raise ValueError(f"'{key}' uses the layout '{name}', but there's no such layout in '{LAYOUTS_KEY}'")
+        for k in LAYOUT_KEYS:
+            if k in layouts[name]:
+                resolved.setdefault(k, layouts[name][k])
+    if cfg.get("field_overrides"):
+        resolved["fields"] = apply_field_overrides(resolved.get("fields", []), cfg["field_overrides"])
+    return resolved
+
+def resolve_layouts(cfg_all: Dict[str, Any]) -> Dict[str, Any]:
+    """Every game entry, resolved. Layouts and other '_' keys are left out."""
+    layouts = cfg_all.get(LAYOUTS_KEY, {})
+    return {key: resolve_entry(cfg, layouts, key) for key, cfg in cfg_all.items() if is_game_key(key)}
+
 def load_config(path: str) -> Dict[str, Any]:
+    """config.json with the layouts applied: game key -> full config."""
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        return resolve_layouts(json.load(f))
 
 # ----------------------------
-# Main / CLI
+# Input file reading.
+# Either the executable itself, or a disc image (.iso) that contains it.
+# For disc images, the executable is the file named like one of the config keys,
+# and only that file is read from the image.
+# Returns (config key, file contents). Raises KeyError if there's no config for it.
 # ----------------------------
+def load_binary(path: str, cfg_all: Dict[str, Any]) -> Tuple[str, bytes]:
+    if iso9660.is_iso(path):
+        return iso9660.read_matching_file(path, cfg_all.keys())
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Exports data from binary DDR data to a single JSON and a package.json per song"
-    )
-    parser.add_argument("file", help="Binary file path (e.g. SLPM_624.27)")
-    parser.add_argument("--config", default="config.json", help="JSON configuration file path")
-    parser.add_argument("--debug", action="store_true", help="Print debug information")
-    args = parser.parse_args()
-
-    # Load config .json file and throw an error if there's no config for the input file.
-    cfg_all = load_config(args.config)
-    basename = os.path.basename(args.file)
+    basename = os.path.basename(path)
     if basename not in cfg_all:
-        print(
-            f"There's no config set for '{basename}'.\n"
-            f"Existing configurations:\n- " + "\n- ".join(cfg_all.keys())
-        )
-        return
+        raise KeyError(f"There's no config set for '{basename}'.")
+    with open(path, "rb") as f:
+        return basename, f.read()
 
-    cfg = cfg_all[basename]
-
-    # Read all the file in memory (for titles)
-    with open(args.file, "rb") as f:
-        data = f.read()
+@contextmanager
+def map_binary(path: str, cfg_all: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Same as load_binary, but a plain file is memory mapped (read only) for as long as the with block lasts,
+    instead of read. For scans over the whole file. Disc images (and empty files) are read as usual.
+    """
+    if iso9660.is_iso(path) or os.path.getsize(path) == 0:
+        yield load_binary(path, cfg_all)
+        return
+    basename = os.path.basename(path)
+    if basename not in cfg_all:
+        raise KeyError(f"There's no config set for '{basename}'.")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield basename, mm
 
-    # Read binary blocks
-    bloques = read_consecutive_blocks(args.file, cfg)
+# ----------------------------
+# Expands the input paths: folders are replaced by the files inside them that have a config
+# (plus any disc images and arcade song databases). Files are kept as they are.
+# ----------------------------
+MUSICDB_NAME = "musicdb.xml"
+
+def expand_inputs(paths: List[str], cfg_all: Dict[str, Any]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if os.path.isfile(full) and (name in cfg_all or iso9660.is_iso(name) or name.lower() == MUSICDB_NAME):
+                    files.append(full)
+        else:
+            files.append(path)
+    return files
 
+# ----------------------------
+# Which configs need the section table of the file (see binary_sections).
+# ----------------------------
+def is_set(value: Any) -> bool:
+    """False for a config offset that's missing or left empty ("")."""
+    return value is not None and str(value).strip() != ""
+
+def needs_sections(cfg: Dict[str, Any]) -> bool:
+    """True if the config uses addresses or section offsets, or title pointers without a pointer_base."""
+    offsets = [cfg.get(k) for k in ("offset", "end_offset", "titles_offset_start", "titles_offset_end")]
+    if any(is_set(v) and not is_file_offset(v) for v in offsets):
+        return True
+    return cfg.get("titles_parser") == POINTER_PARSER and cfg.get("pointer_base") is None
 
-    # Pick titles parser from the config file
+# ----------------------------
+# Titles for a game: the parser set in the config, only for existing music IDs, plus manual overrides.
+# ----------------------------
+def build_titles_map(data: bytes, cfg: Dict[str, Any], bloques: List[Any], index: Optional[SectionIndex] = None) -> dict:
     titles_map = {}
+    if index is None and needs_sections(cfg):
+        index = section_index(data)
     title_start = cfg.get("titles_offset_start")
     title_end   = cfg.get("titles_offset_end")
-    if isinstance(title_start, int) and isinstance(title_end, int) and title_end > title_start:
-        parser_name = cfg.get("titles_parser", "parse_titles")
-        if parser_name == "parse_titles":
-            titles_map = parse_titles(data, title_start, title_end)
-        elif parser_name == "parse_titles_reverse":
-            titles_map = parse_titles_reverse(data, title_start, title_end)
-        elif parser_name == "parse_titles_supernova":
-            titles_map = parse_titles_supernova(data, title_start, title_end)
+    # Offsets can also be addresses or section relative (see binary_sections). Empty ones mean there's no table.
+    if is_set(title_start) and is_set(title_end):
+        title_start = resolve_offset(title_start, data, index)
+        title_end = resolve_offset(title_end, data, index)
+    parser_name = cfg.get("titles_parser", "parse_titles")
+    if parser_name == POINTER_PARSER:
+        base = cfg.get("pointer_base")
+        titles_map = parse_titles_pointers(data, bloques, parse_number(base) if isinstance(base, str) else base, index)
+    elif isinstance(title_start, int) and isinstance(title_end, int) and title_end > title_start:
+        if parser_name in TITLE_PARSERS:
+            titles_map = TITLE_PARSERS[parser_name](data, title_start, title_end)
         elif parser_name == "parse_titles_sequential":
             titles_list = parse_titles_sequential(data, title_start, title_end)
             # Match titles to blocks in order
@@ -597,51 +1037,431 @@ def main():
         if mid in manual_titles:
             titles_map[mid] = (manual_titles[mid], manual_titles[mid])
 
+    return titles_map
 
-    # Optional DEBUG output. Songs are listed in the orher they appear in the file.
-    if args.debug:
-        for b in bloques:
-            mid = b["music_id"].lower()
-            raw_titles = titles_map.get(mid, ["Title goes here"])
-            # Normalize: tuple → list
-            if isinstance(raw_titles, tuple):
-                raw_titles = list(raw_titles)
-            # Ensure at least 2 values
-            if len(raw_titles) == 1:
-                title, title2 = raw_titles[0], raw_titles[0]
-            else:
-                title, title2 = raw_titles[0], raw_titles[1]
-            print(f"DEBUG short={mid!r}, title={title!r}")
-        #Generate orphaned songs.
-        orphans = [mid for mid, titles in titles_map.items() if titles[0] == "Title goes here"]
-        print("")
-        print(f"Total orphans detected: {len(orphans)}")
-        print("Complete list:", orphans)
-        print("")
-
-    # Build global JSON and packages
-    json_data = []
+# ----------------------------
+# Library API.
+# Use these from other Python code: nothing here prints, and nothing is written unless a sink is called.
+#
+#     for pkg in open_game("SLPM_653.58"):
+#         print(pkg["music_id"], pkg["title"])
+#
+#     cfg_all = load_config("config.json")
+#     packages = list(open_game("ddr_extreme.iso", cfg_all))
+#     write_packages(packages, "out/DDR Extreme JP_packages")
+# ----------------------------
+
+def decode_game(basename: str, cfg: Dict[str, Any], data: bytes) -> Tuple[List[SongRecord], dict]:
+    """Song records and titles of a game. 'basename' is the config key of the game."""
+    # The section table (if the config needs it) is parsed once, for the blocks and the titles
+    index = section_index(data) if needs_sections(cfg) else None
+    # Read binary blocks. They share the buffer with the titles.
+    bloques = read_consecutive_blocks(basename, cfg, data, index)
+    # Pick titles parser from the config file
+    titles_map = build_titles_map(data, cfg, bloques, index)
+    return bloques, titles_map
+
+def iter_packages(basename: str, cfg: Dict[str, Any], data: bytes) -> Iterator[Dict[str, Any]]:
+    """All the packages of a game, in the order they appear in the file."""
+    bloques, titles_map = decode_game(basename, cfg, data)
     for b in bloques:
-        pkg = block_to_package(b, cfg, basename, titles_map)
-        json_data.append(pkg)
+        yield block_to_package(b, cfg, basename, titles_map)
+
+def build_packages(basename: str, cfg: Dict[str, Any], data: bytes) -> List[Dict[str, Any]]:
+    return list(iter_packages(basename, cfg, data))
+
+def open_game(path: str, cfg_all: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Packages of a game file (executable or disc image).
+    If no config is given, config.json is read from the current folder.
+    Raises KeyError right away if there's no config for the file.
+    """
+    if cfg_all is None:
+        cfg_all = load_config("config.json")
+    key, data = load_binary(path, cfg_all)
+    return iter_packages(key, cfg_all[key], data)
 
-    # Package per song
+# ----------------------------
+# Sinks. These are the only functions that write files.
+# ----------------------------
+
+def package_outdir(cfg: Dict[str, Any], basename: str) -> str:
+    """Default output folder of a game, '<game name>_packages'."""
     game_name = cfg.get("game", os.path.splitext(basename)[0])
-    root_outdir = f"{game_name}_packages"
-    os.makedirs(root_outdir, exist_ok=True)
+    return f"{game_name}_packages"
 
-    # Create songs.json file with ALL the packages for the songs in the folders.
+def write_songs_json(packages: Iterable[Dict[str, Any]], root_outdir: str) -> str:
+    """
+    songs.json file with ALL the packages for the songs in the folders, plus songs.idx
+    to find a song in it without reading the whole thing (see catalog_index.py).
+    The file is exactly what json.dump(indent=4) writes, it's just put together one package at a time
+    to know where each one starts and ends. 'packages' is only gone through once, it can be a generator.
+    """
+    os.makedirs(root_outdir, exist_ok=True)
     songs_path = os.path.join(root_outdir, "songs.json")
-    with open(songs_path, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, indent=4, ensure_ascii=False)
 
-    for pkg in json_data:
+    # Text mode would turn "\n" into os.linesep, keep doing that so the file doesn't change
+    def encode(text: str) -> bytes:
+        return text.replace("\n", os.linesep).encode("utf-8")
+
+    spans = []
+    pos = 0
+    with open(songs_path, "wb") as f:
+        for pkg in packages:
+            pos += f.write(encode(",\n    " if spans else "[\n    "))
+            chunk = encode(json.dumps(pkg, indent=4, ensure_ascii=False).replace("\n", "\n    "))
+            spans.append((pkg["music_id"], pos, len(chunk)))
+            pos += f.write(chunk)
+        pos += f.write(encode("\n]" if spans else "[]"))
+    catalog_index.write_index(catalog_index.index_path_for(songs_path), spans, pos)
+    return songs_path
+
+def write_package_folders(packages: Iterable[Dict[str, Any]], root_outdir: str) -> int:
+    """One '<music_id>/package.json' per song."""
+    count = 0
+    for pkg in packages:
         folder = os.path.join(root_outdir, pkg["music_id"])
         os.makedirs(folder, exist_ok=True)
-        with open(os.path.join(folder, "package.json"), "w", encoding="utf-8") as f:
+        path = os.path.join(folder, "package.json")
+        # Left there by a --dedupe export: it's shared with other games, so don't write INTO it.
+        if os.path.exists(path) and os.stat(path).st_nlink > 1:
+            os.remove(path)
+        sidecar = os.path.join(folder, package_store.ORIGIN_SIDECAR)
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+        with open(path, "w", encoding="utf-8") as f:
             json.dump(pkg, f, indent=4, ensure_ascii=False)
+        count += 1
+    return count
 
-    print(f"Created {len(json_data)} blocks to songs.json and the respective song folders to '{root_outdir}/<music_id>/'")
+def write_packages(packages: Iterable[Dict[str, Any]], root_outdir: str, store: str = None) -> int:
+    """
+    Both of the above. Returns the number of packages written.
+    With a 'store', package.json files are hardlinks into it (see package_store.py).
+    """
+    packages = list(packages)
+    write_songs_json(packages, root_outdir)
+    if store:
+        return package_store.write_package_folders_deduped(packages, root_outdir, store)["packages"]
+    return write_package_folders(packages, root_outdir)
+
+# ----------------------------
+# Export of a single game from the CLI: songs.json and a package.json per song.
+# ----------------------------
+
+def print_debug(bloques: List[Any], titles_map: dict):
+    # Songs are listed in the orher they appear in the file.
+    for b in bloques:
+        mid = b["music_id"].lower()
+        raw_titles = titles_map.get(mid, ["Title goes here"])
+        # Normalize: tuple → list
+        if isinstance(raw_titles, tuple):
+            raw_titles = list(raw_titles)
+        # Ensure at least 2 values
+        if len(raw_titles) == 1:
+            title, title2 = raw_titles[0], raw_titles[0]
+        else:
+            title, title2 = raw_titles[0], raw_titles[1]
+        print(f"DEBUG short={mid!r}, title={title!r}")
+    #Generate orphaned songs.
+    orphans = [mid for mid, titles in titles_map.items() if titles[0] == "Title goes here"]
+    print("")
+    print(f"Total orphans detected: {len(orphans)}")
+    print("Complete list:", orphans)
+    print("")
+
+def export_game(basename: str, cfg: Dict[str, Any], data: bytes, debug: bool = False, store: str = None,
+                radars: Dict[str, Any] = None) -> str:
+    bloques, titles_map = decode_game(basename, cfg, data)
+
+    # Optional DEBUG output.
+    if debug:
+        print_debug(bloques, titles_map)
+
+    # Build global JSON and packages, and write them
+    json_data = [block_to_package(b, cfg, basename, titles_map) for b in bloques]
+    if radars:
+        print(f"Filled {fill_zero_radars(json_data, radars)} empty groove radars from the charts")
+    return write_game_packages(json_data, package_outdir(cfg, basename), store)
+
+def write_game_packages(json_data: Iterable[Dict[str, Any]], root_outdir: str, store: str = None) -> str:
+    """
+    songs.json and the song folders of one game, with or without the store. Says what was done.
+    One pass: every package goes to its folder as songs.json gets it, so a generator is never kept in memory.
+    """
+    stats = {"packages": 0, "stored": 0, "kept": 0, "hardlink": 0, "reflink": 0, "copy": 0}
+
+    def to_folders(packages):
+        for pkg in packages:
+            if store:
+                for k, v in package_store.write_package_folders_deduped([pkg], root_outdir, store).items():
+                    stats[k] += v
+            else:
+                stats["packages"] += write_package_folders([pkg], root_outdir)
+            yield pkg
+
+    write_songs_json(to_folders(json_data), root_outdir)
+    if store:
+        print(f"Created {stats['packages']} blocks to songs.json and the respective song folders to '{root_outdir}/<music_id>/'"
+              f" ({stats['stored']} new in '{store}', {stats['kept']} unchanged,"
+              f" {stats['hardlink']} hardlinked, {stats['reflink']} reflinked, {stats['copy']} copied)")
+        return root_outdir
+
+    print(f"Created {stats['packages']} blocks to songs.json and the respective song folders to '{root_outdir}/<music_id>/'")
+    return root_outdir
+
+# ----------------------------
+# Watch mode.
+# Keeps the config and the binaries in memory, and polls config.json and the binaries.
+# When something changes, only the games whose config entry or file changed are exported again.
+# Polling instead of inotify & co. so it works the same everywhere.
+# ----------------------------
+def file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def config_fingerprint(cfg: Dict[str, Any]) -> str:
+    return json.dumps(cfg, sort_keys=True)
+
+def watch(files: List[str], config_path: str, cfg_all: Dict[str, Any], debug: bool = False, interval: float = 0.5,
+          store: str = None, radars: Dict[str, Any] = None):
+    binaries = {}      # path -> (stamp, config key, data)
+    exported = {}      # path -> (stamp, config fingerprint) of the last export
+    failed = {}        # path -> (stamp, config stamp) of the last load that failed. Tried again when one changes.
+    config_stamp = file_stamp(config_path)
+
+    print(f"Watching {config_path} and {len(files)} file(s). Press Ctrl+C to stop.")
+    try:
+        while True:
+            # Reload config.json only when it changes. If it's half-saved (invalid), keep the old one.
+            stamp = file_stamp(config_path)
+            if stamp != config_stamp:
+                config_stamp = stamp
+                try:
+                    cfg_all = load_config(config_path)
+                except Exception as e:
+                    print(f"WARNING: couldn't reload {config_path}, keeping the previous one ({type(e).__name__}: {e})")
+
+            for path in files:
+                stamp = file_stamp(path)
+                if stamp is None:
+                    continue
+                if path.lower().endswith(".xml"):
+                    watch_musicdb(path, stamp, cfg_all, exported, debug, store, radars)
+                    continue
+                if path not in binaries or binaries[path][0] != stamp:
+                    if failed.get(path) == (stamp, config_stamp):
+                        continue
+                    try:
+                        key, data = load_binary(path, cfg_all)
+                    except KeyError as e:
+                        print(f"ERROR: {e.args[0]}")
+                        binaries.pop(path, None)
+                        failed[path] = (stamp, config_stamp)
+                        continue
+                    except Exception as e:
+                        print(f"ERROR reading '{path}': {type(e).__name__}: {e}")
+                        binaries.pop(path, None)
+                        failed[path] = (stamp, config_stamp)
+                        continue
+                    failed.pop(path, None)
+                    binaries[path] = (stamp, key, data)
+                _, key, data = binaries[path]
+
+                cfg = cfg_all.get(key)
+                if cfg is None:
+                    continue
+                state = (stamp, config_fingerprint(cfg))
+                if exported.get(path) == state:
+                    continue
+
+                try:
+                    export_game(key, cfg, data, debug, store, radars)
+                except Exception as e:
+                    # Most likely a config or a file that's still being edited (a bad offset, a size written as text,
+                    # a half-written binary...). Don't die, just wait for the next change.
+                    print(f"ERROR exporting '{path}': {type(e).__name__}: {e}")
+                exported[path] = state
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+def watch_musicdb(path: str, stamp: tuple, cfg_all: Dict[str, Any], exported: Dict[str, tuple], debug: bool = False,
+                  store: str = None, radars: Dict[str, Any] = None):
+    """Same as the games in watch, for a musicdb.xml: streamed again when it or its (optional) config changes."""
+    # Imported here, musicdb imports this module.
+    from musicdb import export_musicdb
+    cfg = cfg_all.get(os.path.basename(path), {})
+    state = (stamp, config_fingerprint(cfg))
+    if exported.get(path) == state:
+        return
+    try:
+        export_musicdb(path, cfg, debug, store, radars)
+    except Exception as e:
+        # Most likely the file is still being written (xml.etree's ParseError...)
+        print(f"ERROR exporting '{path}': {type(e).__name__}: {e}")
+    exported[path] = state
+
+# ----------------------------
+# Main / CLI
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exports data from binary DDR data to a single JSON and a package.json per song"
+    )
+    parser.add_argument("file", nargs="+",
+                        help="Binary file, disc image, arcade musicdb.xml or folder path(s) "
+                             "(e.g. SLPM_624.27, game.iso or a folder full of them)")
+    parser.add_argument("--config", default="config.json", help="JSON configuration file path")
+    parser.add_argument("--debug", action="store_true", help="Print debug information")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and export again whenever the config or a binary file changes")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds for --watch")
+    parser.add_argument("--serve", action="store_true",
+                        help="Start a local HTTP service to query the songs of the given games (see query_service.py)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument("--cache-mb", type=int, default=256, help="Memory limit in MB for the decoded games kept by --serve")
+    parser.add_argument("--scan", action="store_true",
+                        help="Don't export. Look for song and title tables in the given folders, disc images or files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --scan, --excel-library, --ssq-dir and --reconcile (default: one per CPU)")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Write every different package.json once to a store folder and hardlink it into the song folders. "
+                             "'_origin' goes to origin.json")
+    parser.add_argument("--store", default=package_store.DEFAULT_STORE, help="Store folder for --dedupe")
+    parser.add_argument("--ssq-dir", metavar="FOLDER",
+                        help="Folder with the songs' .ssq charts. Groove radars that are 0 are calculated from them")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Don't export. Guess the field offsets of the configured song table and print a draft 'fields' list")
+    parser.add_argument("--find-titles", action="store_true",
+                        help="Don't export. Look for the title table of the configured song table and suggest its offsets and parser")
+    parser.add_argument("--excel-library", metavar="OUT.xlsx",
+                        help="Don't export. Write one Excel workbook with a sheet per game and a summary sheet with all of them")
+    parser.add_argument("--reconcile", metavar="LIBRARY",
+                        help="Don't export. Compare the package.json files of an existing package library with the given games "
+                             "and report empty radars, placeholder titles and different difficulties")
+    parser.add_argument("--apply", action="store_true",
+                        help="With --reconcile, fix the empty radars and placeholder titles in the library package.json files")
+    args = parser.parse_args()
+    store = args.store if args.dedupe else None
+
+    if args.scan:
+        # Imported here, it's only needed for this.
+        from table_scanner import scan, print_candidates
+        for path in args.file:
+            print(f"Scanning '{path}'...")
+            print_candidates(scan(path, args.workers))
+        return
+
+    # Load config .json file
+    cfg_all = load_config(args.config)
+    files = expand_inputs(args.file, cfg_all)
+
+    if args.serve:
+        # Imported here, the service imports this module.
+        from query_service import serve
+        serve(files, args.config, args.port, args.cache_mb)
+        return
+
+    if args.analyze:
+        # Imported here, it needs numpy and the analyzer imports this module.
+        from field_analyzer import propose_fields, difficulty_scale_of, format_fields
+        for path in files:
+            key, data = load_binary(path, cfg_all)
+            cfg = cfg_all[key]
+            index = section_index(data) if needs_sections(cfg) else None
+            start = resolve_offset(cfg["offset"], data, index)
+            end = resolve_offset(cfg["end_offset"], data, index)
+            fields, _ = propose_fields(data, start, end, cfg["block_size"])
+            print(f"{key}: {(end - start) // cfg['block_size']} blocks of {cfg['block_size']} bytes")
+            print(f'"difficulty_scale": "{difficulty_scale_of(fields) or "?"}",')
+            print(format_fields(fields))
+        return
+
+    if args.excel_library:
+        # Imported here, xlsxwriter is only needed for this.
+        from excel_library import write_library
+        t0 = time.perf_counter()
+        games = write_library(files, cfg_all, args.excel_library, args.workers)
+        for name, count in games:
+            print(f"{name}: {count} songs")
+        print(f"Wrote {len(games)} games to '{args.excel_library}' in {time.perf_counter() - t0:.2f}s")
+        return
+
+    if args.find_titles:
+        # Imported here, the detector imports this module.
+        from title_detector import detect_titles
+        for path in files:
+            # Memory mapped: the detector scans the whole file, there's no need to read it all first
+            with map_binary(path, cfg_all) as (key, data):
+                cfg = cfg_all[key]
+                # The detector always needs the section table, parsed once for everything below
+                index = section_index(data)
+                blocks = read_consecutive_blocks(path, cfg, data=data, index=index)
+                music_ids = [b["music_id"] for b in blocks]
+                table = (resolve_offset(cfg["offset"], data, index), resolve_offset(cfg["end_offset"], data, index))
+                t0 = time.perf_counter()
+                found = detect_titles(data, music_ids, table, index)
+                elapsed = time.perf_counter() - t0
+                current = len(build_titles_map(data, {k: v for k, v in cfg.items() if k != "manual_titles"}, blocks, index))
+                print(f"{key}: {len(set(m.lower() for m in music_ids))} music_ids, "
+                      f"{current} with a title with the current config "
+                      f"({cfg.get('titles_parser', 'parse_titles')}, {cfg.get('titles_offset_start')} - {cfg.get('titles_offset_end')})")
+                if found is None:
+                    print("  No title table found (none of the music_ids is in the file as a string)\n")
+                    continue
+                print(f"  Found {found['resolved']}/{found['total']} in {elapsed:.3f}s:")
+                print(f'  "titles_offset_start": "0x{found["titles_offset_start"]:X}",')
+                print(f'  "titles_offset_end": "0x{found["titles_offset_end"]:X}",')
+                print(f'  "titles_parser": "{found["titles_parser"]}"\n')
+        return
+
+    radars = None
+    if args.ssq_dir:
+        # Imported here, it needs numpy
+        from ssq_radar import radars_for_folder
+        radars = radars_for_folder(args.ssq_dir, args.workers)
+        print(f"Groove radars calculated for {len(radars)} songs in '{args.ssq_dir}'")
+
+    if args.reconcile:
+        # Imported here, it imports this module.
+        from reconcile import reconcile
+        t0 = time.perf_counter()
+        stats = reconcile(args.reconcile, files, cfg_all, args.workers, args.apply, radars)
+        print(f"\n{stats['packages']} packages in '{args.reconcile}' ({stats['unreadable']} unreadable, "
+              f"{stats['not_in_games']} not in the given games) checked in {time.perf_counter() - t0:.2f}s: "
+              f"{stats['radars']} empty radars, {stats['titles']} placeholder titles, "
+              f"{stats['difficulties']} different difficulties")
+        if args.apply:
+            print(f"{stats['written']} package.json files updated")
+        return
+
+    if args.watch:
+        watch(files, args.config, cfg_all, args.debug, args.interval, store, radars)
+        return
+
+    for path in files:
+        if path.lower().endswith(".xml"):
+            # Arcade song database, streamed instead of read in memory. The config for it is optional.
+            from musicdb import export_musicdb
+            export_musicdb(path, cfg_all.get(os.path.basename(path), {}), args.debug, store, radars)
+            continue
+        # Read all the file in memory (for titles) and throw an error if there's no config for the input file.
+        try:
+            key, data = load_binary(path, cfg_all)
+        except KeyError as e:
+            print(
+                f"{e.args[0]}\n"
+                f"Existing configurations:\n- " + "\n- ".join(cfg_all.keys())
+            )
+            # The other files are still exported
+            continue
+        export_game(key, cfg_all[key], data, args.debug, store, radars)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,20 +3,23 @@ import os
 import json
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,QHBoxLayout, QSpacerItem, QSizePolicy,
-    QPushButton, QFileDialog, QMessageBox, QTabWidget,QTableWidget,QTableWidgetItem, QLabel,QFileDialog
+    QPushButton, QFileDialog, QMessageBox, QTabWidget,QTableWidget,QTableWidgetItem, QLabel,QFileDialog, QLineEdit
 )
 from PySide6.QtGui import QFont, QColor
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThread, Signal
 
 import xlsxwriter
 
 from config_editor import ConfigEditorTab
+from excel_library import add_formats, column_formats
+from song_index import SongIndex
+from query_service import GameCache
 
 
 # Importing functions from the CLI module
 from EXOM_PE_CLI import (
-    load_config, parse_titles, parse_titles_reverse, parse_titles_supernova,
-    parse_titles_sequential,read_consecutive_blocks, block_to_package, build_difficulties
+    load_config, load_binary, decode_game, block_to_package, build_difficulties,
+    package_outdir, write_packages, file_stamp, config_fingerprint
 )
 
 # Background colors for difficulties. Shamelessly taken from Remywiki.
@@ -28,6 +31,80 @@ DIFF_COLORS = {
     "challenge": QColor("#DDAAFF") 
 }
 
+# Memory for the decoded games kept open. The least recently viewed ones are unloaded past this.
+CACHE_MB = 512
+
+class GameLoader(QThread):
+    """
+    Reads and decodes one game without freezing the window: records, titles, the values shown
+    in the table and the search indexes. Several of these can run at once.
+    """
+    loaded = Signal(str, object)
+    failed = Signal(str, str)
+
+    def __init__(self, path, cfg_all, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.cfg_all = cfg_all
+
+    def run(self):
+        try:
+            key, data = load_binary(self.path, self.cfg_all)
+        except KeyError:
+            self.failed.emit(self.path, f"There's no config for '{os.path.basename(self.path)}'")
+            return
+        except (OSError, ValueError) as e:
+            self.failed.emit(self.path, f"'{os.path.basename(self.path)}' couldn't be read\n{e}")
+            return
+
+        cfg = self.cfg_all[key]
+        # A bad config (wrong offsets, unknown types...) fails here. Anything that gets out of run() is lost
+        # in the thread and the tab would say "loading..." forever, so it's reported like the rest.
+        try:
+            bloques, titles_map, songs = self.decode(key, cfg, data)
+        except Exception as e:
+            self.failed.emit(self.path, f"'{os.path.basename(self.path)}' couldn't be decoded with the config for '{key}'\n"
+                                        f"{type(e).__name__}: {e}")
+            return
+
+        self.loaded.emit(self.path, {
+            "key": key, "config": cfg, "data": data, "bloques": bloques, "titles_map": titles_map,
+            "songs": songs, "index": SongIndex(songs),
+            # What it costs to keep this game around: the file itself and the decoded values, more or less
+            "size": len(data) + len(json.dumps(songs)),
+        })
+
+    @staticmethod
+    def decode(key, cfg, data):
+        # Read binary blocks and titles, same as the CLI does.
+        # The records point into 'data', fields are only decoded when needed.
+        bloques, titles_map = decode_game(key, cfg, data)
+
+        # Plain values for the table and the search indexes
+        songs = []
+        for b in bloques:
+            mid = b["music_id"]
+            raw_titles = titles_map.get(mid, ["Title goes here"])
+            if isinstance(raw_titles, tuple):
+                raw_titles = list(raw_titles)
+            songs.append({"music_id": mid, "title": raw_titles[0], "bpm1": b.get("bpm1", 0), "bpm2": b.get("bpm2", 0),
+                          "difficulties": build_difficulties(b)})
+        return bloques, titles_map, songs
+
+
+class OpenGame:
+    """A game with a tab in the Export tab. Its decoded data lives in the shared cache."""
+    __slots__ = ("path", "key", "table", "state", "hidden_rows", "loading")
+
+    def __init__(self, path, table):
+        self.path = path
+        self.key = None
+        self.table = table
+        self.state = None        # (file stamp, config fingerprint) it was decoded with
+        self.hidden_rows = set()
+        self.loading = False
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -51,7 +128,7 @@ class MainWindow(QMainWindow):
         self.lbl_game = QLabel("File: **NO FILE LOADED**")
         layout.addWidget(self.lbl_game)
 
-        self.btn_load = QPushButton("Load binary file")
+        self.btn_load = QPushButton("Load binary file(s)")
         self.btn_load.setObjectName("load_button"),
         self.btn_load.clicked.connect(self.load_file)
 
@@ -76,143 +153,239 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(self.btn_export_excel) 
         layout.addLayout(button_layout)
 
-        # Song table
-        self.song_table = QTableWidget()
-        self.song_table.setColumnCount(13)
-        self.song_table.setHorizontalHeaderLabels([
-            "ID", "Title", "BPM",
-            "SP Beg", "SP Lgt", "SP Std", "SP Hvy", "SP Chl",
-            "DP Beg", "DP Lgt", "DP Std", "DP Hvy", "DP Chl"
-        ])
-        self.song_table.setFont(QFont("Segoe UI", 10)) 
-        layout.addWidget(self.song_table)
-
-        # Ajdjust column widths
-        self.song_table.setColumnWidth(0, 47)   # ID
-        self.song_table.setColumnWidth(1, 408)  # Title
-        self.song_table.setColumnWidth(2, 68)   # BPM
-        for c in range(3, 13):
-            self.song_table.setColumnWidth(c, 45) # Difficulties
+        # Filter box. Disabled until the indexes of the shown game are ready.
+        filter_layout = QHBoxLayout()
+        self.filter_box = QLineEdit()
+        self.filter_box.setPlaceholderText("Filter: music_id or title words, bpm:150-200, sp:9, dp.heavy>=10...")
+        self.filter_box.setClearButtonEnabled(True)
+        self.filter_box.setEnabled(False)
+        self.filter_box.textChanged.connect(self.apply_filter)
+        self.lbl_matches = QLabel("")
+        filter_layout.addWidget(self.filter_box)
+        filter_layout.addWidget(self.lbl_matches)
+        layout.addLayout(filter_layout)
+
+        # One song table per open game. Switching tabs just shows another table, nothing is decoded again.
+        self.game_tabs = QTabWidget()
+        self.game_tabs.setTabsClosable(True)
+        self.game_tabs.currentChanged.connect(self.show_game)
+        self.game_tabs.tabCloseRequested.connect(self.close_game)
+        layout.addWidget(self.game_tabs)
 
         self.tab_extract.setLayout(layout)
 
         # State
+        self.cfg_all = {}
+        self.games = {}          # path -> OpenGame, in tab order
+        self.loaders = set()     # Running GameLoaders
+        # Decoded games, shared by all the tabs. The least recently viewed ones are thrown away when it's full.
+        self.cache = GameCache(CACHE_MB * 1024 * 1024, on_evict=self.game_evicted)
         self.current_file = None
+        self.current_key = None
         self.current_config = None
         self.titles_map = {}
         self.bloques = []
+        self.song_index = None
+
+    @property
+    def song_table(self):
+        game = self.current_game()
+        return game.table if game else None
+
+    def new_song_table(self):
+        table = QTableWidget()
+        table.setColumnCount(13)
+        table.setHorizontalHeaderLabels([
+            "ID", "Title", "BPM",
+            "SP Beg", "SP Lgt", "SP Std", "SP Hvy", "SP Chl",
+            "DP Beg", "DP Lgt", "DP Std", "DP Hvy", "DP Chl"
+        ])
+        table.setFont(QFont("Segoe UI", 10)) 
+
+        # Ajdjust column widths
+        table.setColumnWidth(0, 47)   # ID
+        table.setColumnWidth(1, 408)  # Title
+        table.setColumnWidth(2, 68)   # BPM
+        for c in range(3, 13):
+            table.setColumnWidth(c, 45) # Difficulties
+        return table
+
+    # ----------------------------
+    # Loading. Every file is decoded in its own thread.
+    # ----------------------------
 
     def load_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Choose binary file")
-        if not file_path:
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Choose binary file(s)", filter="Game files (*);;Disc images (*.iso)"
+        )
+        if not file_paths:
             return
 
         # Load config.json
         try:
-            cfg_all = load_config("config.json")
+            self.cfg_all = load_config("config.json")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"config.json couldn't be read\n{e}")
             return
-        
-        # If a file is loaded and there's no config for it in the json, yell at the user
-        basename = os.path.basename(file_path)
-        if basename not in cfg_all:
-            QMessageBox.warning(self, "Game not found",
-                                f"There's no config for '{basename}'")
+
+        for file_path in file_paths:
+            game = self.games.get(file_path)
+            if game is None:
+                game = OpenGame(file_path, self.new_song_table())
+                self.games[file_path] = game
+                self.game_tabs.addTab(game.table, os.path.basename(file_path))
+            # Already open: decoded again only if the file or its config changed
+            elif self.cached_entry(game) is not None:
+                continue
+            self.start_loading(game)
+
+        self.game_tabs.setCurrentWidget(self.games[file_paths[-1]].table)
+
+    def start_loading(self, game):
+        if game.loading:
+            return
+        game.loading = True
+        self.set_tab_text(game, f"{os.path.basename(game.path)} (loading...)")
+        loader = GameLoader(game.path, self.cfg_all, self)
+        loader.loaded.connect(self.game_loaded)
+        loader.failed.connect(self.game_failed)
+        loader.finished.connect(lambda: self.loaders.discard(loader))
+        loader.finished.connect(loader.deleteLater)
+        self.loaders.add(loader)
+        loader.start()
+
+    def game_loaded(self, path, entry):
+        game = self.games.get(path)
+        if game is None:
+            # Closed while it was loading
+            return
+        game.loading = False
+        game.key = entry["key"]
+        game.state = (file_stamp(path), config_fingerprint(entry["config"]))
+        self.cache.put(path, game.state, entry, entry["size"])
+        self.fill_table(game, entry["songs"])
+        self.set_tab_text(game, entry["key"])
+        if game is self.current_game():
+            self.show_game()
+
+    def game_failed(self, path, message):
+        game = self.games.get(path)
+        if game is not None:
+            game.loading = False
+            self.close_game(self.game_tabs.indexOf(game.table))
+        QMessageBox.warning(self, "Game not loaded", message)
+
+    def game_evicted(self, path):
+        # Memory cap reached: keep the tab, drop the rows. It's loaded again when viewed.
+        game = self.games.get(path)
+        if game is not None:
+            game.table.setRowCount(0)
+            game.hidden_rows = set()
+            game.state = None
+            self.set_tab_text(game, f"{game.key or os.path.basename(path)} (unloaded)")
+            if game is self.current_game():
+                self.show_game()
+
+    def cached_entry(self, game):
+        """The decoded game, if it's in the cache and still matches its file and config."""
+        if game.state is None or game.key not in self.cfg_all:
+            return None
+        state = (file_stamp(game.path), config_fingerprint(self.cfg_all[game.key]))
+        return self.cache.get(game.path, state)
+
+    def set_tab_text(self, game, text):
+        self.game_tabs.setTabText(self.game_tabs.indexOf(game.table), text)
+
+    def current_game(self):
+        table = self.game_tabs.currentWidget()
+        for game in self.games.values():
+            if game.table is table:
+                return game
+        return None
+
+    def closeEvent(self, event):
+        # Qt doesn't like threads still running when the window goes away. Loading is quick, just wait.
+        for loader in list(self.loaders):
+            loader.wait()
+        super().closeEvent(event)
+
+    def close_game(self, index):
+        table = self.game_tabs.widget(index)
+        for path, game in list(self.games.items()):
+            if game.table is table:
+                del self.games[path]
+                self.cache.discard(path)
+        self.game_tabs.removeTab(index)
+        table.deleteLater()
+        if not self.games:
+            self.show_game()
+
+    # ----------------------------
+    # Showing the selected game
+    # ----------------------------
+
+    def show_game(self, *_):
+        game = self.current_game()
+        entry = self.cached_entry(game) if game else None
+
+        if entry is None:
+            self.current_file = self.current_key = self.current_config = None
+            self.titles_map, self.bloques, self.song_index = {}, [], None
+            self.btn_makepkg.setEnabled(False)
+            self.btn_export_excel.setEnabled(False)
+            self.filter_box.setEnabled(False)
+            self.lbl_matches.setText("Loading..." if game else "")
+            if game is None:
+                self.lbl_game.setText("File: **NO FILE LOADED**")
+            else:
+                self.lbl_game.setText(f"File: <b>{os.path.basename(game.path)}</b> - Loading...")
+                self.start_loading(game)
             return
 
-        self.current_file = file_path
-        self.current_config = cfg_all[basename]
+        self.current_file = game.path
+        self.current_key = entry["key"]
+        self.current_config = entry["config"]
+        self.titles_map = entry["titles_map"]
+        self.bloques = entry["bloques"]
+        self.song_index = entry["index"]
 
-        # Once a valid file is open, show file name and respective gane name...
-        game_name = self.current_config.get("game", basename)
-        self.lbl_game.setText(f"File: <b>{basename}</b> - Game: <b>{game_name}</b>")
+        # Show file name and respective gane name...
+        game_name = self.current_config.get("game", self.current_key)
+        self.lbl_game.setText(f"File: <b>{self.current_key}</b> - Game: <b>{game_name}</b>")
 
-        # ...and the Export to Excel button
+        # ...and the buttons
         self.btn_makepkg.setEnabled(True)
         self.btn_export_excel.setEnabled(True)
+        self.filter_box.setEnabled(True)
+        self.apply_filter(self.filter_box.text())
 
-        # Read the entire file to do stuff
-        with open(file_path, "rb") as f:
-            data = f.read()
-
-        # Read binary blocks
-        bloques = read_consecutive_blocks(file_path, self.current_config)
-
-        # Parse titles
-        ts, te = self.current_config.get("titles_offset_start"), self.current_config.get("titles_offset_end")
-        titles_map = {}
-        if isinstance(ts, int) and isinstance(te, int) and te > ts:
-            parser_name = self.current_config.get("titles_parser", "parse_titles")
-            if parser_name == "parse_titles":
-                titles_map = parse_titles(data, ts, te)
-            elif parser_name == "parse_titles_reverse":
-                titles_map = parse_titles_reverse(data, ts, te)
-            elif parser_name == "parse_titles_supernova":
-                titles_map = parse_titles_supernova(data, ts, te)
-            elif parser_name == "parse_titles_sequential":
-                titles_list = parse_titles_sequential(data, ts, te)
-                titles_map = {}
-                for i, b in enumerate(bloques):
-                    mid = b["music_id"].lower()
-                    if i < len(titles_list):
-                        titles_map[mid] = (titles_list[i], titles_list[i])
-                    else:
-                        titles_map[mid] = ("Title goes here", "Title goes here")
-
-
-        # Filter titles only for valid IDs
-        valid_ids = {b["music_id"] for b in bloques}
-        titles_map = {k: v for k, v in titles_map.items() if k in valid_ids}
-
-        # Manual Overrides
-        manual_titles = self.current_config.get("manual_titles", {})
-        for b in bloques:
-            mid = b["music_id"]
-            if mid in manual_titles:
-                titles_map[mid] = (manual_titles[mid], manual_titles[mid])
+    def fill_table(self, game, songs):
+        table = game.table
+        game.hidden_rows = set()
+        table.setRowCount(len(songs))
 
-        # Show table with the good stuff
-        self.song_table.setRowCount(len(bloques))
-        for row, b in enumerate(bloques):
-            mid = b["music_id"]
-            raw_titles = titles_map.get(mid, ["Title goes here"])
-            if isinstance(raw_titles, tuple):
-                raw_titles = list(raw_titles)
-            title = raw_titles[0]
+        # Font for ID
+        id_font = QFont("Courier New", 10)
+        id_font.setBold(True)
 
-            bpm1, bpm2 = b.get("bpm1", 0), b.get("bpm2", 0)
+        # Show table with the good stuff
+        for row, song in enumerate(songs):
+            bpm1, bpm2 = song["bpm1"], song["bpm2"]
             bpm_str = str(bpm1) if bpm1 == bpm2 else f"{bpm2}-{bpm1}" # BPM1 is the MAX one, so we show BPM2 first.
 
-            diffs = build_difficulties(b, self.current_config)
-            sp = diffs["single"]
-            dp = diffs["double"]
-
             # ID, title and BPM
-            self.song_table.setItem(row, 0, QTableWidgetItem(mid))
-            self.song_table.setItem(row, 1, QTableWidgetItem(title))
-            self.song_table.setItem(row, 2, QTableWidgetItem(bpm_str))
+            id_item = QTableWidgetItem(song["music_id"])
+            id_item.setFont(id_font)
+            table.setItem(row, 0, id_item)
+            table.setItem(row, 1, QTableWidgetItem(song["title"]))
+            table.setItem(row, 2, QTableWidgetItem(bpm_str))
 
             # SP With colors
-            self._fill_diffs(sp, row, 3)
+            self._fill_diffs(table, song["difficulties"]["single"], row, 3)
             # DP with colors
-            self._fill_diffs(dp, row, 8)
-
-            # Adjust font for ID
-            id_font = QFont("Courier New", 10)
-            id_font.setBold(True)
+            self._fill_diffs(table, song["difficulties"]["double"], row, 8)
 
-            for r in range(self.song_table.rowCount()):
-                item = self.song_table.item(r, 0)
-                if item:
-                    item.setFont(id_font)
-
-        # Save state
-        self.titles_map = titles_map
-        self.bloques = bloques
-        self.btn_makepkg.setEnabled(True)
-
-    def _fill_diffs(self, d, row, col_start):
+    def _fill_diffs(self, table, d, row, col_start):
         levels = ["beginner", "light", "standard", "heavy", "challenge"]
 
         for i, lvl in enumerate(levels):
@@ -225,7 +398,22 @@ class MainWindow(QMainWindow):
             font.setBold(True)
             item.setFont(font)
             item.setForeground(QColor("#000000"))  # text color. Let's make sure it's black.
-            self.song_table.setItem(row, col_start + i, item)
+            table.setItem(row, col_start + i, item)
+
+    # ----------------------------
+    # Filter. The same text applies to every tab.
+    # ----------------------------
+
+    def apply_filter(self, text):
+        game = self.current_game()
+        if self.song_index is None or game is None:
+            return
+        hidden = self.song_index.all_rows - self.song_index.search(text)
+        # Only touch the rows that change
+        for r in hidden ^ game.hidden_rows:
+            game.table.setRowHidden(r, r in hidden)
+        game.hidden_rows = hidden
+        self.lbl_matches.setText(f"{len(self.song_index) - len(hidden)} of {len(self.song_index)} songs")
 
     def create_pkgs(self):
         # There is NO way to see this message since the buttons are disabled until a *valid* vile is open.
@@ -234,22 +422,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "No file loaded.")
             return
 
-        basename = os.path.basename(self.current_file)
-        json_data = []
-        for b in self.bloques:
-            pkg = block_to_package(b, self.current_config, basename, self.titles_map)
-            json_data.append(pkg)
+        basename = self.current_key
+        json_data = [block_to_package(b, self.current_config, basename, self.titles_map) for b in self.bloques]
 
-        outdir = f"{self.current_config.get('game', basename)}_packages"
-        os.makedirs(outdir, exist_ok=True)
-        with open(os.path.join(outdir, "songs.json"), "w", encoding="utf-8") as f:
-            json.dump(json_data, f, indent=4, ensure_ascii=False)
-
-        for pkg in json_data:
-            folder = os.path.join(outdir, pkg["music_id"])
-            os.makedirs(folder, exist_ok=True)
-            with open(os.path.join(folder, "package.json"), "w", encoding="utf-8") as f:
-                json.dump(pkg, f, indent=4, ensure_ascii=False)
+        outdir = package_outdir(self.current_config, basename)
+        write_packages(json_data, outdir)
 
         QMessageBox.information(self, "Done!",
                                 f"Created {len(json_data)} packages to '{outdir}'")
@@ -267,17 +444,9 @@ class MainWindow(QMainWindow):
         workbook = xlsxwriter.Workbook(file_path)
         worksheet = workbook.add_worksheet("Songs")
 
-        # Formats
-        header_fmt = workbook.add_format({"bold": True, "align": "left", "bg_color": "#366092", "font_color": "white"})
-        txt_fmt = workbook.add_format({"bold": False, "align": "left"})
-        # Colors per difficulty, same as in the GUI
-        diff_formats = {
-            "beginner": workbook.add_format({"bold": True, "align": "center", "bg_color": "#81E9FF"}),
-            "light": workbook.add_format({"bold": True, "align": "center", "bg_color": "#FFFFAA"}),
-            "standard": workbook.add_format({"bold": True, "align": "center", "bg_color": "#FFAAAA"}),
-            "heavy": workbook.add_format({"bold": True, "align": "center", "bg_color": "#00FF7F"}),
-            "challenge": workbook.add_format({"bold": True, "align": "center", "bg_color": "#DDAAFF"})
-        }
+        # Formats, same as the library export (colors per difficulty, same as in the GUI)
+        formats = add_formats(workbook)
+        header_fmt = formats["header"]
 
         # Column widths 
 
@@ -294,27 +463,15 @@ class MainWindow(QMainWindow):
         headers = [self.song_table.horizontalHeaderItem(c).text() for c in range(self.song_table.columnCount())]
         for col, h in enumerate(headers):
             worksheet.write(0, col, h, header_fmt)
+        # Difficulty columns get their color. Picked once per column, not per cell.
+        col_formats = column_formats(formats, headers)
 
         # Save lines
         for r in range(self.song_table.rowCount()):
             for c in range(self.song_table.columnCount()):
                 item = self.song_table.item(r, c)
                 text = item.text() if item else ""
-
-                # Detect difficulty column, to set color
-                col_name = headers[c].lower()
-                if "beg" in col_name:
-                    fmt = diff_formats["beginner"]
-                elif "lgt" in col_name:
-                    fmt = diff_formats["light"]
-                elif "std" in col_name:
-                    fmt = diff_formats["standard"]
-                elif "hvy" in col_name:
-                    fmt = diff_formats["heavy"]
-                elif "chl" in col_name:
-                    fmt = diff_formats["challenge"]
-                else:
-                    fmt = txt_fmt
+                fmt = col_formats[c]
 
                 # Store values as numbers when possible, so Excel doesn't bother with "number stored as text" when you open the file.
                 try:
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import platform
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+# ----------------------------
+# GUI benchmarks.
+# Runs the real MainWindow with Qt's "offscreen" platform (no display needed) on synthetic games of
+# any size, and times what the user waits for:
+# - load: "Load binary file(s)" until the song table is filled (decode in the loader thread + fill_table)
+# - fill_table / _fill_diffs: filling the table again, and how much of that is the difficulty cells
+# - sort: sorting the filled table by title and by a difficulty column
+# - filter: typing a search in the filter box
+# - excel: "Export to Excel"
+# Every size runs --repeat times, the median is kept. Peak memory is measured on one more run:
+# Python allocations with tracemalloc (Qt's own memory isn't in there) and the process max RSS.
+#
+#   python benchmarks/gui_benchmark.py --sizes 100 1000 10000 --out gui_results.json
+# ----------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox  # noqa: E402
+import PySide6  # noqa: E402
+
+import EXOM_PE_GUI  # noqa: E402
+
+DEFAULT_SIZES = [100, 1000, 10000]
+LEVELS = ("beginner", "light", "standard", "heavy", "challenge")
+BLOCK_SIZE = 20
+TABLE_OFFSET = 0x100
+FILTER_TEXT = "song 1 sp.heavy>=5"
+
+
+# ----------------------------
+# Synthetic games: a song table (music_id, BPMs, 1-20 difficulties) and a title table (parse_titles format)
+# ----------------------------
+
+def make_game(folder: str, songs: int) -> str:
+    """Writes BENCH_<songs>.BIN and its config to config.json in 'folder'. Returns the file path."""
+    key = f"BENCH_{songs}.BIN"
+    music_ids = [f"b{i:04x}" if songs <= 0x10000 else f"{i:05x}" for i in range(songs)]
+
+    table = bytearray()
+    for i, mid in enumerate(music_ids):
+        block = bytearray(BLOCK_SIZE)
+        block[0:5] = mid.encode("ascii")
+        struct.pack_into("<HH", block, 6, 120 + i % 100, 100 + i % 50)
+        for lvl in range(10):
+            block[10 + lvl] = (i + lvl * 3) % 19 + 1 if lvl % 5 else (i % 4)
+        table += block
+
+    titles = bytearray()
+    for i, mid in enumerate(music_ids):
+        titles += mid.encode("ascii") + b"\x00\x00\x00" + f"Song {i} Benchmark Mix".encode("ascii") + b"\x00\x00\x00"
+
+    titles_start = TABLE_OFFSET + len(table)
+    with open(os.path.join(folder, key), "wb") as f:
+        f.write(bytes(TABLE_OFFSET) + table + titles)
+
+    fields = [["music_id", "0x0", 5, "string"], ["bpm1", "0x6", 2, "u16_le"], ["bpm2", "0x8", 2, "u16_le"]]
+    for m, mode in enumerate(("single", "double")):
+        for l, level in enumerate(LEVELS):
+            fields.append([f"{mode}_{level}", hex(10 + m * 5 + l), 1, "u8"])
+    config_path = os.path.join(folder, "config.json")
+    cfg_all = {}
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            cfg_all = json.load(f)
+    cfg_all[key] = {
+        "game": f"Benchmark {songs}",
+        "offset": TABLE_OFFSET,
+        "end_offset": titles_start,
+        "block_size": BLOCK_SIZE,
+        "titles_offset_start": titles_start,
+        "titles_offset_end": titles_start + len(titles),
+        "titles_parser": "parse_titles",
+        "difficulty_scale": "1_20",
+        "fields": fields,
+    }
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(cfg_all, f, indent=4)
+    return os.path.join(folder, key)
+
+
+# ----------------------------
+# Scenario
+# ----------------------------
+
+def wait_loaded(app: QApplication, window, path: str):
+    game = window.games[path]
+    while game.loading:
+        app.processEvents()
+        time.sleep(0.0005)
+    app.processEvents()
+
+
+def run_once(app: QApplication, path: str, folder: str) -> Dict[str, float]:
+    """One full pass over a fresh window. Returns seconds per step."""
+    times = {}
+    window = EXOM_PE_GUI.MainWindow()
+    QFileDialog.getOpenFileNames = staticmethod(lambda *a, **k: ([path], ""))
+    QFileDialog.getSaveFileName = staticmethod(lambda *a, **k: (os.path.join(folder, "bench.xlsx"), ""))
+
+    t0 = time.perf_counter()
+    window.load_file()
+    wait_loaded(app, window, path)
+    times["load"] = time.perf_counter() - t0
+
+    game = window.games[path]
+    songs = window.cached_entry(game)["songs"]
+
+    # Again, with _fill_diffs timed on its own
+    fill_diffs = window._fill_diffs
+    spent = [0.0]
+
+    def timed_fill_diffs(*args):
+        t = time.perf_counter()
+        fill_diffs(*args)
+        spent[0] += time.perf_counter() - t
+
+    window._fill_diffs = timed_fill_diffs
+    t0 = time.perf_counter()
+    window.fill_table(game, songs)
+    times["fill_table"] = time.perf_counter() - t0
+    times["fill_diffs"] = spent[0]
+    window._fill_diffs = fill_diffs
+
+    table = game.table
+    t0 = time.perf_counter()
+    table.sortItems(1)
+    table.sortItems(5)
+    times["sort"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    window.filter_box.setText(FILTER_TEXT)
+    window.filter_box.setText("")
+    times["filter"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    window.export_to_excel()
+    times["excel"] = time.perf_counter() - t0
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return times
+
+
+def max_rss_kb() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KB everywhere else
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def bench_size(app: QApplication, songs: int, repeat: int, folder: str) -> Dict[str, Any]:
+    path = make_game(folder, songs)
+    runs = [run_once(app, path, folder) for _ in range(repeat)]
+    result: Dict[str, Any] = {"songs": songs, "runs": repeat}
+    for step in runs[0]:
+        result[f"{step}_s"] = round(statistics.median(r[step] for r in runs), 6)
+
+    tracemalloc.start()
+    run_once(app, path, folder)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_python_kb"] = peak // 1024
+    result["max_rss_kb"] = max_rss_kb()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the GUI song table and Excel export on synthetic games")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Songs per synthetic game")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (the median is kept)")
+    parser.add_argument("--out", default="gui_benchmark.json", help="JSON file for the results")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    QMessageBox.information = staticmethod(lambda *a, **k: None)
+    QMessageBox.warning = staticmethod(lambda *a, **k: None)
+    QMessageBox.critical = staticmethod(lambda *a, **k: None)
+
+    results: List[Dict[str, Any]] = []
+    cwd = os.getcwd()
+    out_path = os.path.abspath(args.out)
+    with tempfile.TemporaryDirectory() as folder:
+        # The GUI reads config.json from the current folder
+        os.chdir(folder)
+        try:
+            for songs in args.sizes:
+                result = bench_size(app, songs, args.repeat, folder)
+                results.append(result)
+                print(", ".join(f"{k}={v}" for k, v in result.items()), flush=True)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "benchmark": "gui",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pyside6": PySide6.__version__,
+        "platform": platform.platform(),
+        "qt_platform": os.environ["QT_QPA_PLATFORM"],
+        "results": results,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to '{out_path}'")
+
+
+if __name__ == "__main__":
+    main()
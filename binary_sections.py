@@ -0,0 +1,235 @@
+import struct
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+# ----------------------------
+# Section tables of PE (ddr.dll) and ELF (PS2 executables) files.
+# Lets the config use addresses as they're shown in a disassembler instead of raw file offsets:
+# - 1564272 or "0x17DE70"  -> file offset, same as always
+# - "va:0x0017DF70"        -> virtual address
+# - ".data+0x1A40"         -> offset inside a section
+# The section table is parsed once per decode: decode_game gets it with section_index and hands it to the
+# block and title readers (the 'index' argument of resolve_offset and StringPool).
+# ----------------------------
+
+# Sections where the song and title tables live. Byte scans can be limited to these.
+DATA_SECTIONS = (".data", ".rdata", ".rodata", ".sdata")
+
+
+class Section:
+    __slots__ = ("name", "vaddr", "vsize", "offset", "raw_size")
+
+    def __init__(self, name: str, vaddr: int, vsize: int, offset: int, raw_size: int):
+        self.name = name
+        self.vaddr = vaddr
+        self.vsize = vsize
+        self.offset = offset
+        self.raw_size = raw_size
+
+    def __repr__(self) -> str:
+        return f"Section({self.name!r}, vaddr={hex(self.vaddr)}, offset={hex(self.offset)}, size={hex(self.raw_size)})"
+
+
+class SectionIndex:
+    def __init__(self, kind: Optional[str], sections: List[Section], size: int):
+        self.kind = kind          # "pe", "elf" or None (unknown format)
+        self.sections = sections
+        self.size = size          # file size
+
+    def find(self, name: str) -> Section:
+        for s in self.sections:
+            if s.name == name:
+                return s
+        raise ValueError(f"There's no '{name}' section in this file")
+
+    def va_to_offset(self, va: int) -> int:
+        for s in self.sections:
+            if s.vaddr <= va < s.vaddr + max(s.vsize, s.raw_size):
+                rel = va - s.vaddr
+                if rel >= s.raw_size:
+                    raise ValueError(f"Address {hex(va)} is in '{s.name}' but that part isn't stored in the file")
+                return s.offset + rel
+        raise ValueError(f"Address {hex(va)} isn't inside any section")
+
+    def offset_to_va(self, offset: int) -> Optional[int]:
+        for s in self.sections:
+            if s.offset <= offset < s.offset + s.raw_size:
+                return s.vaddr + (offset - s.offset)
+        return None
+
+    def data_ranges(self, names=DATA_SECTIONS) -> List[Tuple[int, int]]:
+        """
+        File ranges (start, end) of the data sections.
+        If the file has no section table (or no data sections), the whole file.
+        """
+        ranges = [(s.offset, s.offset + s.raw_size) for s in self.sections if s.name in names and s.raw_size]
+        return sorted(ranges) or [(0, self.size)]
+
+
+def parse_pe(data) -> List[Section]:
+    pe = struct.unpack_from("<I", data, 0x3C)[0]
+    if bytes(data[pe:pe + 4]) != b"PE\x00\x00":
+        raise ValueError("Invalid PE header")
+    num_sections, = struct.unpack_from("<H", data, pe + 6)
+    opt_size, = struct.unpack_from("<H", data, pe + 20)
+    opt = pe + 24
+    magic, = struct.unpack_from("<H", data, opt)
+    if magic == 0x20B:  # PE32+
+        image_base, = struct.unpack_from("<Q", data, opt + 24)
+    else:
+        image_base, = struct.unpack_from("<I", data, opt + 28)
+
+    sections = []
+    table = opt + opt_size
+    for i in range(num_sections):
+        pos = table + i * 40
+        name = bytes(data[pos:pos + 8]).rstrip(b"\x00").decode("ascii", errors="ignore")
+        vsize, rva, raw_size, raw_ptr = struct.unpack_from("<IIII", data, pos + 8)
+        sections.append(Section(name, image_base + rva, vsize, raw_ptr, raw_size))
+    return sections
+
+
+def parse_elf(data) -> List[Section]:
+    if data[4] != 1:
+        raise ValueError("Only 32-bit ELF files are supported")
+    end = "<" if data[5] == 1 else ">"
+    phoff, shoff = struct.unpack_from(end + "II", data, 0x1C)
+    phentsize, phnum, shentsize, shnum, shstrndx = struct.unpack_from(end + "HHHHH", data, 0x2A)
+
+    sections = []
+    if shoff and shnum:
+        headers = [struct.unpack_from(end + "IIIIII", data, shoff + i * shentsize) for i in range(shnum)]
+        str_off = headers[shstrndx][4] if shstrndx < shnum else 0
+        for sh_name, sh_type, _, sh_addr, sh_offset, sh_size in headers:
+            if sh_type == 0:
+                continue
+            name_end = data.find(b"\x00", str_off + sh_name)
+            name = bytes(data[str_off + sh_name:name_end]).decode("ascii", errors="ignore") if str_off else ""
+            # SHT_NOBITS (.bss & co.) takes no space in the file
+            raw_size = 0 if sh_type == 8 else sh_size
+            sections.append(Section(name, sh_addr, sh_size, sh_offset, raw_size))
+
+    if not sections:
+        # Stripped executable (common on PS2): use the loadable segments instead.
+        for i in range(phnum):
+            p_type, p_offset, p_vaddr, _, p_filesz, p_memsz = struct.unpack_from(end + "IIIIII", data, phoff + i * phentsize)
+            if p_type == 1:  # PT_LOAD
+                sections.append(Section(f"segment{i}", p_vaddr, p_memsz, p_offset, p_filesz))
+    return sections
+
+
+def parse_sections(data) -> SectionIndex:
+    head = bytes(data[:4])
+    if head[:2] == b"MZ":
+        return SectionIndex("pe", parse_pe(data), len(data))
+    if head == b"\x7fELF":
+        return SectionIndex("elf", parse_elf(data), len(data))
+    return SectionIndex(None, [], len(data))
+
+
+# Cache by buffer identity, with a WEAK reference to the buffer: the entry goes away with it, so the cache never
+# keeps a whole file in memory after the GUI (or anyone) has let it go.
+# bytes can't be weakly referenced, so they aren't cached here. Whoever reads a bytes buffer more than once
+# (decode_game, --find-titles) gets the index once and passes it along.
+_indexes: Dict[int, Tuple[weakref.ref, SectionIndex]] = {}
+
+def _forget(key: int, ref: weakref.ref):
+    entry = _indexes.get(key)
+    if entry is not None and entry[0] is ref:
+        del _indexes[key]
+
+def section_index(data) -> SectionIndex:
+    entry = _indexes.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+    index = parse_sections(data)
+    try:
+        ref = weakref.ref(data, lambda r, key=id(data): _forget(key, r))
+    except TypeError:
+        return index
+    _indexes[id(data)] = (ref, index)
+    return index
+
+
+def resolve_offset(value: Any, data, index: Optional[SectionIndex] = None) -> int:
+    """
+    Turns a config offset into a file offset. See the top of this file for the accepted formats.
+    Plain numbers don't need the file at all, so 'data' is only used for the other formats.
+    'index' is the section table of 'data', if the caller already has it.
+    """
+    if isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if text.lower().startswith("va:"):
+        return (index or section_index(data)).va_to_offset(int(text[3:], 0))
+    if text.startswith(".") or "+" in text:
+        name, _, rel = text.partition("+")
+        section = (index or section_index(data)).find(name.strip())
+        rel = int(rel, 0) if rel.strip() else 0
+        if rel >= section.raw_size:
+            raise ValueError(f"Offset {text} is past the end of '{section.name}'")
+        return section.offset + rel
+    return parse_number(text)
+
+
+def parse_number(text: str) -> int:
+    text = text.strip()
+    return int(text, 16) if text.lower().startswith("0x") else int(text)
+
+
+def is_file_offset(value: Any) -> bool:
+    """True if the offset can be used without looking at the file (a plain number)."""
+    if isinstance(value, int):
+        return True
+    try:
+        parse_number(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+# ----------------------------
+# Strings by address (title pointers, see parse_titles_pointers in the CLI).
+# 'base' is the address the file is loaded at: file offset = address - base. Without it, the address is
+# looked up in the section table, like "va:" offsets. Every string is read once per pool (one pool per decode).
+# ----------------------------
+MAX_STRING = 512
+
+
+class StringPool:
+    def __init__(self, data, base: Optional[int] = None, index: Optional[SectionIndex] = None):
+        self.data = data
+        self.base = base
+        self.index = (index or section_index(data)) if base is None else None
+        self.strings: Dict[int, Optional[str]] = {}
+
+    def to_offset(self, address: int) -> int:
+        if self.index is not None:
+            return self.index.va_to_offset(address)
+        offset = address - self.base
+        if not 0 <= offset < len(self.data):
+            raise ValueError(f"Address {hex(address)} is outside the file (base {hex(self.base)})")
+        return offset
+
+    def get(self, address: int) -> Optional[str]:
+        """The NUL terminated string at 'address'. None for a null pointer or one that points outside the file."""
+        if address in self.strings:
+            return self.strings[address]
+        text = None
+        if address:
+            try:
+                offset = self.to_offset(address)
+            except ValueError:
+                offset = None
+            if offset is not None:
+                end = self.data.find(b"\x00", offset, offset + MAX_STRING)
+                raw = bytes(self.data[offset:end if end >= 0 else offset + MAX_STRING])
+                raw = raw.replace(b"\r", b" ")
+                # Same as the title tables
+                try:
+                    text = raw.decode("utf-8").strip()
+                except UnicodeDecodeError:
+                    text = raw.decode("latin-1").strip()
+        self.strings[address] = text
+        return text
+
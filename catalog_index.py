@@ -0,0 +1,121 @@
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# ----------------------------
+# Random access index for songs.json.
+# songs.json is pretty printed and can get big, and build scripts usually want ONE song.
+# Next to it, the exporter writes 'songs.idx': a hash table on disk, music_id -> (byte offset, length)
+# of that song's package inside songs.json. Looking a song up reads one or two slots of the index
+# and then only that package from songs.json, however big the file is.
+#
+# Layout (little endian):
+#   header: magic "SIDX", version (u16), reserved (u16), slot count (u32), entry count (u32),
+#           size of songs.json when the index was written (u64)
+#   slots:  music_id (16 bytes, NUL padded), offset (u64), length (u32). Empty slots have an empty music_id.
+# Slot count is a power of two, at least twice the entries. Collisions go to the next slot.
+# The same music_id can be there more than once (every match is returned).
+# ----------------------------
+
+MAGIC = b"SIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQ")
+SLOT = struct.Struct("<16sQI")
+MAX_ID = 16
+
+
+def index_path_for(songs_path: str) -> str:
+    return os.path.splitext(songs_path)[0] + ".idx"
+
+
+def slot_of(music_id: bytes, slots: int) -> int:
+    return zlib.crc32(music_id) & (slots - 1)
+
+
+def write_index(index_path: str, spans: Iterable[Tuple[str, int, int]], songs_size: int):
+    """'spans' are (music_id, byte offset, length) of every package inside songs.json."""
+    spans = [(mid.encode("utf-8")[:MAX_ID], offset, length) for mid, offset, length in spans]
+    slots = 1
+    while slots < 2 * len(spans) or slots < 8:
+        slots *= 2
+
+    table = bytearray(SLOT.size * slots)
+    for mid, offset, length in spans:
+        i = slot_of(mid, slots)
+        while table[i * SLOT.size] != 0:
+            i = (i + 1) & (slots - 1)
+        SLOT.pack_into(table, i * SLOT.size, mid, offset, length)
+
+    tmp = f"{index_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, slots, len(spans), songs_size))
+        f.write(table)
+    os.replace(tmp, index_path)
+
+
+class SongsCatalog:
+    """
+    Reader for songs.json + songs.idx. Only the index header is read when it's opened.
+
+        with SongsCatalog("DDR Extreme JP_packages/songs.json") as songs:
+            pkg = songs.get("sync")
+    """
+
+    def __init__(self, songs_path: str, index_path: Optional[str] = None):
+        self.songs_path = songs_path
+        self.index_path = index_path or index_path_for(songs_path)
+        self.songs = open(songs_path, "rb")
+        self.index = open(self.index_path, "rb")
+        magic, version, _, self.slots, self.count, songs_size = HEADER.unpack(self.index.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"'{self.index_path}' is not a songs.json index")
+        if songs_size != os.fstat(self.songs.fileno()).st_size:
+            self.close()
+            raise ValueError(f"'{self.index_path}' doesn't match '{songs_path}' anymore, export again")
+
+    def spans(self, music_id: str) -> List[Tuple[int, int]]:
+        """(offset, length) inside songs.json of every package with this music_id."""
+        mid = music_id.encode("utf-8")[:MAX_ID]
+        padded = mid.ljust(MAX_ID, b"\x00")
+        i = slot_of(mid, self.slots)
+        found = []
+        for _ in range(self.slots):
+            self.index.seek(HEADER.size + i * SLOT.size)
+            slot_id, offset, length = SLOT.unpack(self.index.read(SLOT.size))
+            if slot_id[0] == 0:
+                break
+            if slot_id == padded:
+                found.append((offset, length))
+            i = (i + 1) & (self.slots - 1)
+        return found
+
+    def read_span(self, offset: int, length: int) -> Dict[str, Any]:
+        self.songs.seek(offset)
+        return json.loads(self.songs.read(length).decode("utf-8"))
+
+    def get_all(self, music_id: str) -> List[Dict[str, Any]]:
+        return [self.read_span(offset, length) for offset, length in sorted(self.spans(music_id))]
+
+    def get(self, music_id: str) -> Optional[Dict[str, Any]]:
+        """The first package with this music_id in songs.json, or None."""
+        spans = self.spans(music_id)
+        return self.read_span(*min(spans)) if spans else None
+
+    def __contains__(self, music_id: str) -> bool:
+        return bool(self.spans(music_id))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self.songs.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,44 +1,36 @@
 import json
+import mmap
+import os
+import struct
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,QTableWidget, QTableWidgetItem, QHeaderView,
-    QPushButton, QComboBox, QLineEdit, QMessageBox, QFileDialog, QInputDialog, QLabel, QSpacerItem, QSizePolicy
+    QPushButton, QComboBox, QLineEdit, QMessageBox, QFileDialog, QInputDialog, QLabel, QSpacerItem, QSizePolicy,
+    QTabWidget
 )
 
 from PySide6.QtCore import Qt
 
+from EXOM_PE_CLI import (field_positions, decode_field, build_titles_map, load_binary, is_game_key, resolve_entry,
+                         LAYOUTS_KEY, DIFFICULTY_NIBBLES)
+from binary_sections import resolve_offset
+from config_writer import ConfigFile
+from hex_view import HexView
+import iso9660
+
+# How many blocks are shown in the preview
+PREVIEW_BLOCKS = 16
 
-# This class is used to save the config.json in a compact way. Has to be defined before anything else.
-class CompactJSONEncoder(json.JSONEncoder):
-    def __init__(self, *args, **kwargs):
-        kwargs['indent'] = 4
-        kwargs['ensure_ascii'] = False
-        super().__init__(*args, **kwargs)
-
-    def iterencode(self, o, _one_shot=False):
-        yield self.encode(o)
-
-    def encode(self, o):
-        # Serializaction
-        if isinstance(o, list):
-            # Other lists, indented
-            return "[\n" + ",\n".join("        " + self.encode(el) for el in o) + "\n]"
-        elif isinstance(o, dict):
-            # For dicts, respect indent.
-            items = []
-            for k, v in o.items():
-                if k == "fields"  and isinstance(v, list) and v and isinstance(v[0], list):
-                    # I want to see one field per line.
-                    compact_list = lambda lst: "[" + ",".join(json.dumps(x, ensure_ascii=False) for x in lst) + "]"
-                    field_str = "[\n" + ",\n".join("        " + compact_list(el) for el in v) + "\n    ]"
-                    items.append(f"{json.dumps(k)}: {field_str}")
-                else:
-                    items.append(f"{json.dumps(k)}: {self.encode(v)}")
-            result= "{\n" + ",\n".join("    " + i for i in items) + "\n    }"
-        else:
-            result= json.dumps(o, ensure_ascii=False)
 
-        # Prettify 
-        return result.replace("    },\n    \"SL","},\n\n\"SL").replace("\"\n],","\"\n    ],").replace("    }\n    }","}\n\n}")
+# Offsets are usually plain numbers, but they can also be addresses ("va:0x...") or
+# section relative (".data+0x...") so keep those as text.
+def offset_value(text):
+    text = text.strip()
+    if not text:
+        return 0
+    try:
+        return int(text)
+    except ValueError:
+        return text
 
 # We define the fields we need so we don't have to type them multiple times.    
 FIELDS_DEF=[
@@ -47,11 +39,11 @@ FIELDS_DEF=[
             ("bpm2",2,"u16_le"),
             ("memcard_link_id",2,"u16_le"),
 
-            # These are used with the old difficulty scale (1-10)
+            # Old configs for the 1-10 scale: 4 bytes, one nibble per level. Only shown if the game still has them.
             ("single_difficulties",4,"bytes"),
             ("double_difficulties",4,"bytes"),
 
-            # These are used with the new difficulty scale from DDR X onwards (1-20)
+            # One per level: a whole byte from DDR X onwards (1-20), a nibble before that (1-10)
             ("single_beginner",1,"u8"),
             ("single_light",1,"u8"),
             ("single_standard",1,"u8"),
@@ -178,7 +170,7 @@ class ConfigEditorTab(QWidget):
         self.cmb_titles_parser = QComboBox()
         self.cmb_titles_parser.addItems([
             "parse_titles", "parse_titles_reverse",
-            "parse_titles_supernova", "parse_titles_sequential"
+            "parse_titles_supernova", "parse_titles_sequential", "parse_titles_pointers"
         ])
 
         # Third  row
@@ -196,7 +188,45 @@ class ConfigEditorTab(QWidget):
         self.fields_table.setHorizontalHeaderLabels(["Field name", "Offset (hex)", "Byte size", "Type"])
         self.fields_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(QLabel("Fields"))
-        layout.addWidget(self.fields_table)
+
+        # Preview: same rows as the fields table, one column per block of the song table.
+        # The last row is a sample of the titles.
+        self.btn_preview = QPushButton("Load binary for preview")
+        self.btn_preview.setObjectName("preview_cfg")
+        self.lbl_preview = QLabel("No preview file")
+        self.preview_table = QTableWidget()
+        self.preview_table.setRowCount(len(FIELDS_DEF) + 1)
+        self.preview_table.setColumnCount(PREVIEW_BLOCKS)
+        self.preview_table.setHorizontalHeaderLabels([f"#{i}" for i in range(PREVIEW_BLOCKS)])
+        self.preview_table.setVerticalHeaderLabels([name for name, _, _ in FIELDS_DEF] + ["title"])
+        self.preview_table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        # Hex view of the same file. Clicking a byte sets the offset of the selected field.
+        self.hex_view = HexView()
+        self.btn_goto_table = QPushButton("Go to song table")
+        self.btn_goto_table.setObjectName("goto_table")
+        hex_tab = QWidget()
+        hex_layout = QVBoxLayout()
+        hex_layout.setContentsMargins(0, 0, 0, 0)
+        hex_layout.addWidget(self.btn_goto_table)
+        hex_layout.addWidget(self.hex_view)
+        hex_tab.setLayout(hex_layout)
+
+        self.preview_tabs = QTabWidget()
+        self.preview_tabs.addTab(self.preview_table, "Preview")
+        self.preview_tabs.addTab(hex_tab, "Hex")
+
+        preview_top = QHBoxLayout()
+        preview_top.addWidget(self.btn_preview)
+        preview_top.addWidget(self.lbl_preview)
+        preview_layout = QVBoxLayout()
+        preview_layout.addLayout(preview_top)
+        preview_layout.addWidget(self.preview_tabs)
+
+        fields_layout = QHBoxLayout()
+        fields_layout.addWidget(self.fields_table, 1)
+        fields_layout.addLayout(preview_layout, 1)
+        layout.addLayout(fields_layout)
 
         self.fields_table.setRowCount(len(FIELDS_DEF))
         for r, (name, length, dtype) in enumerate(FIELDS_DEF):
@@ -205,8 +235,7 @@ class ConfigEditorTab(QWidget):
             self.fields_table.setItem(r, 1, QTableWidgetItem(""))           # Offset (editable)
             self.fields_table.setItem(r, 2, QTableWidgetItem(str(length)))  # Size in bytes (auto)
             self.fields_table.item(r, 2).setFlags(Qt.ItemIsEnabled)         # Block editiong
-            self.fields_table.setItem(r, 3, QTableWidgetItem(dtype))        # Type (auto)
-            self.fields_table.item(r, 3).setFlags(Qt.ItemIsEnabled)         # Block editiong
+            self.fields_table.setItem(r, 3, QTableWidgetItem(dtype))        # Type (editable: u16_be, s8, nibble_hi, bits:4:4...)
 
         # Update visibility of fields based on difficulty scale
         self.cmb_difficulty.currentTextChanged.connect(self.update_fields_visibility)
@@ -226,7 +255,11 @@ class ConfigEditorTab(QWidget):
 
         # Internal state
         self.cfg_data = {}
+        self.cfg_file = None        # ConfigFile of the loaded config.json
         self.current_key = None
+        self.preview_file = None
+        self.preview_data = None    # mmap (or bytes, for disc images) of the preview file
+        self.loading = False        # True while the widgets are being filled, to avoid updating the preview 60 times
 
         # Connections
         self.btn_load_cfg.clicked.connect(self.load_config_file)
@@ -236,6 +269,19 @@ class ConfigEditorTab(QWidget):
         self.cmb_configs.currentIndexChanged.connect(self.load_selected_config)
         self.btn_save.clicked.connect(self.save_changes)
 
+        # Preview connections. Editing one offset only decodes that field again.
+        self.btn_preview.clicked.connect(self.load_preview_file)
+        self.fields_table.itemChanged.connect(self.preview_field_changed)
+        self.txt_offset.textChanged.connect(self.refresh_preview)
+        self.txt_block_size.textChanged.connect(self.refresh_preview)
+        self.txt_titles_start.textChanged.connect(self.refresh_preview_titles)
+        self.txt_titles_end.textChanged.connect(self.refresh_preview_titles)
+        self.cmb_titles_parser.currentTextChanged.connect(self.refresh_preview_titles)
+        self.txt_end_offset.textChanged.connect(self.update_hex_highlights)
+        self.fields_table.currentCellChanged.connect(self.update_hex_highlights)
+        self.hex_view.byte_clicked.connect(self.hex_byte_clicked)
+        self.btn_goto_table.clicked.connect(self.goto_song_table)
+
     def load_config_file(self, path=None):
         if not path:
             path, _ = QFileDialog.getOpenFileName(
@@ -245,15 +291,18 @@ class ConfigEditorTab(QWidget):
             return
 
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                self.cfg_data = json.load(f)
+            # Kept open (so to speak): saving only rewrites the game that changed
+            self.cfg_file = ConfigFile(path)
+            self.cfg_data = json.loads(self.cfg_file.text)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"I couldn't read config.json:\n{e}")
             return
 
+        # "_layouts" and friends aren't games
+        games = [k for k in self.cfg_data if is_game_key(k)]
         self.cmb_configs.clear()
-        self.cmb_configs.addItems(self.cfg_data.keys())
-        QMessageBox.information(self, "Success!", f"{len(self.cfg_data)} configurations found.")
+        self.cmb_configs.addItems(games)
+        QMessageBox.information(self, "Success!", f"{len(games)} configurations found.")
 
         # Now we're sure that the config is loaded, enable the buttons
         self.btn_new.setEnabled(True)
@@ -264,20 +313,20 @@ class ConfigEditorTab(QWidget):
     def update_fields_visibility(self, scale):
         for r in range(self.fields_table.rowCount()):
             name = self.fields_table.item(r, 0).text()
-            if scale == "1_10":
-                if name in ["single_difficulties", "double_difficulties"]:
-                    self.fields_table.setRowHidden(r, False)
-                elif name.startswith("single_") or name.startswith("double_"):
-                    self.fields_table.setRowHidden(r, True)
-                else:
-                    self.fields_table.setRowHidden(r, False)
-            elif scale == "1_20":
-                if name in ["single_difficulties", "double_difficulties"]:
-                    self.fields_table.setRowHidden(r, True)
-                elif name.startswith("single_") or name.startswith("double_"):
-                    self.fields_table.setRowHidden(r, False)
-                else:
-                    self.fields_table.setRowHidden(r, False)
+            offset = self.fields_table.item(r, 1).text().strip() if self.fields_table.item(r, 1) else ""
+            if name in ["single_difficulties", "double_difficulties"]:
+                # Old 1-10 configs only
+                self.fields_table.setRowHidden(r, not (scale == "1_10" and offset))
+                continue
+            self.fields_table.setRowHidden(r, False)
+            level = name.partition("_")[2]
+            if not offset and name.startswith(("single_", "double_")) and level in DIFFICULTY_NIBBLES:
+                # Levels that aren't set yet get the type of the scale
+                self.fields_table.item(r, 3).setText(DIFFICULTY_NIBBLES[level][1] if scale == "1_10" else "u8")
+
+        # Same rows in the preview
+        for r in range(self.fields_table.rowCount()):
+            self.preview_table.setRowHidden(r, self.fields_table.isRowHidden(r))
 
 
     def load_selected_config(self):
@@ -285,13 +334,16 @@ class ConfigEditorTab(QWidget):
         if not key:
             return
         self.current_key = key
+        self.loading = True
         cfg = self.cfg_data.get(key, {})
 
         # Force default values if missing
         cfg.setdefault("titles_offset_start", 0)
         cfg.setdefault("titles_offset_end", 0)
-        cfg.setdefault("difficulty_scale", "1_10")
         cfg.setdefault("titles_parser", "parse_titles")
+        # Entries with a layout template show the template's values (and their own overrides)
+        cfg = resolve_entry(cfg, self.layouts(), key)
+        cfg.setdefault("difficulty_scale", "1_10")
 
         # Update widgets for "header" fields
         self.txt_game.setText(cfg.get("game", ""))
@@ -309,62 +361,279 @@ class ConfigEditorTab(QWidget):
         for r, (fname, length, dtype) in enumerate(FIELDS_DEF):
             self.fields_table.setItem(r, 0, QTableWidgetItem(fname))
             self.fields_table.item(r, 0).setFlags(Qt.ItemIsEnabled)
-            self.fields_table.setItem(r, 2, QTableWidgetItem(str(length)))
-            self.fields_table.item(r, 2).setFlags(Qt.ItemIsEnabled)
-            self.fields_table.setItem(r, 3, QTableWidgetItem(dtype))
-            self.fields_table.item(r, 3).setFlags(Qt.ItemIsEnabled)
 
             # Buscar si este campo existe en el JSON
             offset = ""
             for f in cfg.get("fields", []):
                 if f[0] == fname:
                     offset = f[1]  # usar el offset del JSON
+                    if len(f) == 4:
+                        # Keep the size and type of the config too (u16_be, nibbles...)
+                        length, dtype = f[2], f[3]
                     break
             self.fields_table.setItem(r, 1, QTableWidgetItem(offset))
+            self.fields_table.setItem(r, 2, QTableWidgetItem(str(length)))
+            self.fields_table.item(r, 2).setFlags(Qt.ItemIsEnabled)
+            self.fields_table.setItem(r, 3, QTableWidgetItem(dtype))
 
         self.update_fields_visibility(self.cmb_difficulty.currentText())
 
+        self.loading = False
+        self.refresh_preview()
+
+
+    # ----------------------------
+    # Live preview.
+    # The preview file stays memory mapped, and only the first PREVIEW_BLOCKS blocks are decoded.
+    # Editing an offset decodes just that field again, so it's instant no matter how big the table is.
+    # ----------------------------
+
+    def load_preview_file(self, path=None):
+        if not path:
+            path, _ = QFileDialog.getOpenFileName(
+                self, "Choose binary file for preview", filter="Game files (*);;Disc images (*.iso)"
+            )
+        if not path:
+            return
+
+        try:
+            if iso9660.is_iso(path):
+                _, data = load_binary(path, self.cfg_data)
+            else:
+                with open(path, "rb") as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.critical(self, "Error", f"I couldn't open the file for the preview:\n{e}")
+            return
+
+        self.hex_view.set_data(data)
+        self.close_preview()
+        self.preview_file = path
+        self.preview_data = data
+        self.lbl_preview.setText(f"Preview: <b>{os.path.basename(path)}</b>")
+        self.refresh_preview()
+        self.goto_song_table()
+
+    def close_preview(self):
+        if isinstance(self.preview_data, mmap.mmap):
+            self.preview_data.close()
+        self.preview_data = None
+
+    def preview_blocks(self):
+        """(start offset, block size, blocks to show) or None if the header fields aren't usable (yet)."""
+        try:
+            start = resolve_offset(offset_value(self.txt_offset.text()), self.preview_data)
+            size = int(self.txt_block_size.text())
+        except ValueError:
+            return None
+        if size <= 0 or start < 0:
+            return None
+        count = min(PREVIEW_BLOCKS, max(len(self.preview_data) - start, 0) // size)
+        return start, size, count
+
+    def refresh_preview(self):
+        if self.preview_data is None or self.loading:
+            return
+        blocks = self.preview_blocks()
+        for r in range(len(FIELDS_DEF)):
+            self.update_preview_row(r, blocks)
+        self.refresh_preview_titles()
+        self.update_hex_highlights()
+
+    def preview_field_changed(self, item):
+        if item.column() not in (1, 3) or self.loading or self.preview_data is None:
+            return
+        self.update_preview_row(item.row(), self.preview_blocks())
+        self.update_hex_highlights()
+        # Titles are looked up by music_id
+        if self.fields_table.item(item.row(), 0).text() == "music_id":
+            self.refresh_preview_titles()
+
+    def update_preview_row(self, r, blocks):
+        values = [""] * PREVIEW_BLOCKS
+        name = self.fields_table.item(r, 0).text()
+        offset = self.fields_table.item(r, 1).text().strip() if self.fields_table.item(r, 1) else ""
+        length = int(self.fields_table.item(r, 2).text())
+        dtype = self.fields_table.item(r, 3).text()
+
+        if blocks and offset:
+            try:
+                _, pos, size, dtype = next(field_positions([[name, offset, length, dtype]]))
+            except ValueError:
+                pos = None  # Still typing
+            if pos is not None:
+                start, block_size, count = blocks
+                key = self.cmb_configs.currentText()
+                endianness = resolve_entry(self.cfg_data.get(key, {}), self.layouts(), key).get("endianness")
+                for i in range(count):
+                    base = start + i * block_size + pos
+                    chunk = self.preview_data[base:base + size]
+                    if len(chunk) == size:
+                        try:
+                            value = decode_field(chunk, dtype, endianness)
+                        except (ValueError, struct.error):
+                            values = ["?"] * PREVIEW_BLOCKS  # Type doesn't fit the size
+                            break
+                        values[i] = value.hex(" ") if isinstance(value, bytes) else str(value)
+
+        for i, text in enumerate(values):
+            self.preview_table.setItem(r, i, QTableWidgetItem(text))
+
+    def refresh_preview_titles(self):
+        if self.preview_data is None or self.loading:
+            return
+        id_row = [name for name, _, _ in FIELDS_DEF].index("music_id")
+        ids = [self.preview_table.item(id_row, i).text().lower() if self.preview_table.item(id_row, i) else ""
+               for i in range(PREVIEW_BLOCKS)]
+
+        cfg = {
+            "titles_offset_start": offset_value(self.txt_titles_start.text()),
+            "titles_offset_end": offset_value(self.txt_titles_end.text()),
+            "titles_parser": self.cmb_titles_parser.currentText(),
+            "manual_titles": self.cfg_data.get(self.current_key, {}).get("manual_titles", {}),
+        }
+        blocks = [{"music_id": mid} for mid in ids]
+        if cfg["titles_parser"] == "parse_titles_pointers":
+            cfg["pointer_base"] = self.cfg_data.get(self.current_key, {}).get("pointer_base")
+            self.add_preview_pointers(blocks)
+        try:
+            titles_map = build_titles_map(self.preview_data, cfg, [b for b in blocks if b["music_id"]])
+        except (ValueError, IndexError):
+            titles_map = {}
+
+        title_row = len(FIELDS_DEF)
+        for i, mid in enumerate(ids):
+            titles = titles_map.get(mid)
+            self.preview_table.setItem(title_row, i, QTableWidgetItem(titles[0] if titles else ""))
+
+    def add_preview_pointers(self, blocks):
+        """Title pointers of the preview blocks. They aren't in the fields table, they come from the saved config."""
+        where = self.preview_blocks()
+        if where is None:
+            return
+        start, block_size, count = where
+        key = self.cmb_configs.currentText()
+        resolved = resolve_entry(self.cfg_data.get(key, {}), self.layouts(), key)
+        for name, pos, size, dtype in field_positions(f for f in resolved.get("fields", []) if f[0].endswith("_ptr")):
+            for i, b in enumerate(blocks[:count]):
+                base = start + i * block_size + pos
+                b[name] = decode_field(self.preview_data[base:base + size], dtype, resolved.get("endianness"))
+
+    # ----------------------------
+    # Hex view
+    # ----------------------------
+
+    def field_range(self, r):
+        """(offset in block, size) of a row of the fields table, or None if it has no valid offset."""
+        offset = self.fields_table.item(r, 1).text().strip() if self.fields_table.item(r, 1) else ""
+        if not offset:
+            return None
+        try:
+            _, pos, size, _ = next(field_positions([["", offset, int(self.fields_table.item(r, 2).text()), ""]]))
+        except ValueError:
+            return None
+        return pos, size
 
+    def update_hex_highlights(self, *args):
+        if self.preview_data is None or self.loading:
+            return
+        blocks = self.preview_blocks()
+        if blocks is None:
+            self.hex_view.set_table(0, 0, 0)
+            return
+        start, block_size, _ = blocks
+        try:
+            end = resolve_offset(offset_value(self.txt_end_offset.text()), self.preview_data)
+        except ValueError:
+            end = start
+        if end <= start:
+            # No end yet, show the first blocks at least
+            end = start + block_size * PREVIEW_BLOCKS
+        self.hex_view.set_table(start, end, block_size)
+
+        fields = []
+        for r in range(self.fields_table.rowCount()):
+            rng = self.field_range(r)
+            if rng and not self.fields_table.isRowHidden(r):
+                fields.append(rng)
+        current = self.fields_table.currentRow()
+        self.hex_view.set_fields(fields, self.field_range(current) if current >= 0 else None)
+
+    def hex_byte_clicked(self, offset):
+        r = self.fields_table.currentRow()
+        blocks = self.preview_blocks()
+        if r < 0 or blocks is None or offset < blocks[0]:
+            return
+        start, block_size, _ = blocks
+        # Relative to the block it's in, written like the rest of the config
+        self.fields_table.item(r, 1).setText(f"0x{(offset - start) % block_size:02X}")
+        self.update_hex_highlights()
+
+    def goto_song_table(self):
+        blocks = self.preview_blocks() if self.preview_data is not None else None
+        if blocks:
+            self.hex_view.goto(blocks[0])
+
+    def layouts(self):
+        return self.cfg_data.get(LAYOUTS_KEY, {})
 
     def save_changes(self):
         if not self.current_key:
             return
 
         cfg = self.cfg_data.get(self.current_key, {})
+        template = self.layouts().get(cfg.get("layout"))
 
         # Update values
         cfg["game"] = self.txt_game.text()
-        cfg["offset"] = int(self.txt_offset.text()) if self.txt_offset.text() else 0
-        cfg["end_offset"] = int(self.txt_end_offset.text()) if self.txt_end_offset.text() else 0
+        cfg["offset"] = offset_value(self.txt_offset.text())
+        cfg["end_offset"] = offset_value(self.txt_end_offset.text())
         cfg["block_size"] = int(self.txt_block_size.text()) if self.txt_block_size.text() else 0
-        cfg["titles_offset_start"] = int(self.txt_titles_start.text()) if self.txt_titles_start.text() else 0
-        cfg["titles_offset_end"] = int(self.txt_titles_end.text()) if self.txt_titles_end.text() else 0
+        cfg["titles_offset_start"] = offset_value(self.txt_titles_start.text())
+        cfg["titles_offset_end"] = offset_value(self.txt_titles_end.text())
         cfg["titles_parser"] = self.cmb_titles_parser.currentText()
         cfg["difficulty_scale"] = self.cmb_difficulty.currentText()
 
         # Reconstruct fields
+        old_fields = resolve_entry(cfg, self.layouts(), self.current_key).get("fields", [])
+        old_names = {f[0] for f in old_fields}
         new_fields = []
         for r in range(self.fields_table.rowCount()):
             if self.fields_table.isRowHidden(r):
                 continue
             name = self.fields_table.item(r, 0).text()
             offset = self.fields_table.item(r, 1).text().strip()
+            if not offset and name not in old_names:
+                # An empty offset the game doesn't have either is just a field it doesn't read
+                continue
             length = int(self.fields_table.item(r, 2).text())
             dtype = self.fields_table.item(r, 3).text()
             new_fields.append([name, offset, length, dtype])
-        cfg["fields"] = new_fields
+        # Fields the table doesn't show (title pointers...) are kept as they are
+        shown = {name for name, _, _ in FIELDS_DEF}
+        new_fields += [f for f in old_fields if f[0] not in shown]
+        # In the order the game had them, new ones at the end
+        order = {f[0]: i for i, f in enumerate(old_fields)}
+        new_fields.sort(key=lambda f: order.get(f[0], len(order)))
+
+        if template is None:
+            cfg["fields"] = new_fields
+        else:
+            # Only what's different from the layout template is saved
+            for k in ("block_size", "difficulty_scale"):
+                if cfg[k] == template.get(k):
+                    cfg.pop(k)
+            template_fields = {f[0]: f for f in template.get("fields", [])}
+            overrides = [f for f in new_fields if template_fields.get(f[0]) != f]
+            if overrides:
+                cfg["field_overrides"] = overrides
+            else:
+                cfg.pop("field_overrides", None)
 
         # OCD moment: Reorder "header" fields. We want them at the top.
-        ordered_cfg = {
-            "game": cfg.get("game"),
-            "offset": cfg.get("offset"),
-            "end_offset": cfg.get("end_offset"),
-            "block_size": cfg.get("block_size"),
-            "titles_offset_start": cfg.get("titles_offset_start"),
-            "titles_offset_end": cfg.get("titles_offset_end"),
-            "titles_parser": cfg.get("titles_parser"),
-            "difficulty_scale": cfg.get("difficulty_scale"),
-        }
+        header = ["game", "offset", "end_offset", "layout", "block_size", "titles_offset_start", "titles_offset_end",
+                  "titles_parser", "difficulty_scale"]
+        ordered_cfg = {k: cfg[k] for k in header if k in cfg}
 
         # Add the rest of the important data (manual_titles, why_is_this, fields, etc.)
         for k, v in cfg.items():
@@ -374,9 +643,12 @@ class ConfigEditorTab(QWidget):
         # Save the informacion in unr order.
         self.cfg_data[self.current_key] = ordered_cfg
 
-        # Write file
-        with open("config.json", "w", encoding="utf-8") as f:
-            json.dump(self.cfg_data, f, cls=CompactJSONEncoder)
+        # Write file. Only this game's entry (plus any new / copied / deleted ones) is written again.
+        try:
+            self.cfg_file.sync(self.cfg_data, self.current_key)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"I couldn't write {self.cfg_file.path}:\n{e}")
+            return
 
         QMessageBox.information(self, "Done!", f"Config '{self.current_key}' updated.")
 
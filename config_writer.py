@@ -0,0 +1,169 @@
+import json
+import os
+from typing import Any, Dict, Tuple
+
+# ----------------------------
+# config.json writer.
+# Saving a game in the Config Editor used to encode the WHOLE config again and write it. Now only that game's
+# entry is encoded, and it replaces the old one in the file text. Where every entry starts and ends is found
+# once when the file is loaded (json's raw_decode, entry by entry) and then kept up to date after each change.
+# Everything else in the file stays exactly as it was: other entries, blank lines, CRLF...
+# The file is written to a temporary file first and then renamed, so a crash never leaves half a config.
+# ----------------------------
+
+
+# This class is used to save the config.json in a compact way.
+class CompactJSONEncoder(json.JSONEncoder):
+    def __init__(self, *args, **kwargs):
+        kwargs['indent'] = 4
+        kwargs['ensure_ascii'] = False
+        super().__init__(*args, **kwargs)
+
+    def iterencode(self, o, _one_shot=False):
+        yield self.encode(o)
+
+    def encode(self, o):
+        if isinstance(o, dict):
+            # The whole config: one entry after another, a blank line between them
+            entries = [f"{json.dumps(k, ensure_ascii=False)}: {self.encode_entry(v)}" for k, v in o.items()]
+            return "{\n" + ",\n\n".join(entries) + "\n}"
+        return self.encode_value(o)
+
+    def encode_entry(self, o):
+        """One top level entry. Its closing brace goes at the start of the line."""
+        result = self.encode_value(o)
+        if isinstance(o, dict) and result.endswith("\n    }"):
+            result = result[:-len("    }")] + "}"
+        return result
+
+    def encode_value(self, o):
+        # Serializaction
+        if isinstance(o, list):
+            # Other lists, indented
+            return "[\n" + ",\n".join("        " + self.encode_value(el) for el in o) + "\n]"
+        elif isinstance(o, dict):
+            # For dicts, respect indent.
+            items = []
+            for k, v in o.items():
+                if k in ("fields", "field_overrides") and isinstance(v, list) and v and isinstance(v[0], list):
+                    # I want to see one field per line.
+                    compact_list = lambda lst: "[" + ",".join(json.dumps(x, ensure_ascii=False) for x in lst) + "]"
+                    field_str = "[\n" + ",\n".join("        " + compact_list(el) for el in v) + "\n    ]"
+                    items.append(f"{json.dumps(k)}: {field_str}")
+                else:
+                    items.append(f"{json.dumps(k)}: {self.encode_value(v)}")
+            result= "{\n" + ",\n".join("    " + i for i in items) + "\n    }"
+        else:
+            result= json.dumps(o, ensure_ascii=False)
+
+        # Prettify
+        return result.replace("\"\n],","\"\n    ],")
+
+
+def skip_ws(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def entry_spans(text: str) -> Dict[str, Tuple[int, int]]:
+    """key -> (start, end) of the value of every top level entry in the text."""
+    decoder = json.JSONDecoder()
+    pos = skip_ws(text, 0)
+    if text[pos:pos + 1] != "{":
+        raise ValueError("config.json must be a JSON object")
+    spans = {}
+    pos = skip_ws(text, pos + 1)
+    while text[pos:pos + 1] != "}":
+        key, pos = decoder.raw_decode(text, pos)
+        pos = skip_ws(text, pos)
+        if text[pos:pos + 1] != ":":
+            raise ValueError(f"Expected ':' after {key!r} at character {pos}")
+        start = skip_ws(text, pos + 1)
+        _, end = decoder.raw_decode(text, start)
+        spans[key] = (start, end)
+        pos = skip_ws(text, end)
+        if text[pos:pos + 1] == ",":
+            pos = skip_ws(text, pos + 1)
+        elif text[pos:pos + 1] != "}":
+            raise ValueError(f"Expected ',' or '}}' after {key!r} at character {pos}")
+    return spans
+
+
+class ConfigFile:
+    """
+    A config.json on disk, updated one entry at a time.
+
+        cfg_file = ConfigFile("config.json")
+        cfg_file.set("SLPM_653.58", cfg)     # written right away
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        # Worked on with "\n", the file's own newlines go back in when it's written
+        self.text = text.replace("\r\n", "\n")
+        self.spans = entry_spans(self.text)
+        self.encoder = CompactJSONEncoder()
+
+    def splice(self, start: int, end: int, new: str):
+        """Replaces text[start:end] and moves the entries after it."""
+        self.text = self.text[:start] + new + self.text[end:]
+        delta = len(new) - (end - start)
+        if delta:
+            self.spans = {k: (s + delta, e + delta) if s >= end else (s, e) for k, (s, e) in self.spans.items()}
+
+    def set(self, key: str, value: Any, write: bool = True):
+        """Replaces (or adds, at the end) one entry."""
+        encoded = self.encoder.encode_entry(value)
+        if key in self.spans:
+            start, end = self.spans[key]
+            self.splice(start, end, encoded)
+            self.spans[key] = (start, start + len(encoded))
+        else:
+            close = self.text.rstrip().rfind("}")
+            # Same separation as the rest of the entries
+            prefix = ",\n\n" if self.spans else "\n"
+            head = f"{prefix}{json.dumps(key, ensure_ascii=False)}: "
+            last_end = max((e for _, e in self.spans.values()), default=None)
+            start = last_end if last_end is not None else close
+            self.splice(start, start, head + encoded)
+            self.spans[key] = (start + len(head), start + len(head) + len(encoded))
+        if write:
+            self.write()
+
+    def remove(self, key: str, write: bool = True):
+        if key not in self.spans:
+            return
+        start, end = self.spans.pop(key)
+        # From the end of the previous entry (or the opening brace) to the end of this one, comma included
+        before = [e for s, e in self.spans.values() if e <= start]
+        if before:
+            cut_start, cut_end = max(before), end
+        else:
+            cut_start = self.text.find("{") + 1
+            after = skip_ws(self.text, end)
+            cut_end = after + 1 if self.text[after:after + 1] == "," else end
+        self.splice(cut_start, cut_end, "")
+        if write:
+            self.write()
+
+    def sync(self, cfg_data: Dict[str, Any], key: str):
+        """
+        Writes 'key' and whatever entries were added or deleted in 'cfg_data' since the last write.
+        Entries that are in both aren't encoded again.
+        """
+        for k in [k for k in self.spans if k not in cfg_data]:
+            self.remove(k, write=False)
+        for k in [k for k in cfg_data if k not in self.spans and k != key]:
+            self.set(k, cfg_data[k], write=False)
+        self.set(key, cfg_data[key], write=False)
+        self.write()
+
+    def write(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline=self.newline) as f:
+            f.write(self.text)
+        os.replace(tmp, self.path)
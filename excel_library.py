@@ -0,0 +1,171 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import xlsxwriter
+
+from EXOM_PE_CLI import build_difficulties, decode_game, load_binary
+
+# ----------------------------
+# One Excel workbook for a whole library: a sheet per game, same columns as the GUI table,
+# plus a "Summary" sheet with the songs of every game one after the other.
+# - Games are decoded in parallel (one process each), only the plain row values come back.
+# - The workbook is written in xlsxwriter's constant_memory mode: every row goes to disk as soon as
+#   it's done, so memory doesn't grow with the library. Rows are always written in order because of that.
+# - Cell formats are created once and picked per column once, not per cell.
+# ----------------------------
+
+LEVELS = ("beginner", "light", "standard", "heavy", "challenge")
+HEADERS = ["ID", "Title", "BPM",
+           "SP Beg", "SP Lgt", "SP Std", "SP Hvy", "SP Chl",
+           "DP Beg", "DP Lgt", "DP Std", "DP Hvy", "DP Chl"]
+# Same colors as the GUI
+DIFF_COLORS = {"beginner": "#81E9FF", "light": "#FFFFAA", "standard": "#FFAAAA", "heavy": "#00FF7F", "challenge": "#DDAAFF"}
+# Excel doesn't allow these in sheet names, and names are 31 characters max
+BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+MAX_SHEET_NAME = 31
+
+
+def add_formats(workbook) -> Dict[str, Any]:
+    """All the cell formats, created once per workbook."""
+    formats = {
+        "header": workbook.add_format({"bold": True, "align": "left", "bg_color": "#366092", "font_color": "white"}),
+        "text": workbook.add_format({"bold": False, "align": "left"}),
+    }
+    for lvl, color in DIFF_COLORS.items():
+        formats[lvl] = workbook.add_format({"bold": True, "align": "center", "bg_color": color})
+    return formats
+
+
+def column_formats(formats: Dict[str, Any], headers: List[str]) -> List[Any]:
+    """The format of every column, from its header (difficulty columns get their color)."""
+    by_abbr = {"beg": "beginner", "lgt": "light", "std": "standard", "hvy": "heavy", "chl": "challenge"}
+    result = []
+    for h in headers:
+        level = next((lvl for abbr, lvl in by_abbr.items() if abbr in h.lower()), None)
+        result.append(formats[level] if level else formats["text"])
+    return result
+
+
+def setup_sheet(sheet, formats: Dict[str, Any], headers: List[str], first_col: int = 0):
+    # ID, Title, BPM, then the difficulties
+    if first_col:
+        sheet.set_column(0, first_col - 1, 24)
+    sheet.set_column(first_col, first_col, 7)
+    sheet.set_column(first_col + 1, first_col + 1, 65)
+    sheet.set_column(first_col + 2, first_col + 2, 8)
+    sheet.set_column(first_col + 3, first_col + 12, 6)
+    sheet.write_row(0, 0, headers, formats["header"])
+    sheet.freeze_panes(1, 0)
+
+
+def write_song_row(sheet, row: int, values: List[Any], col_formats: List[Any]):
+    for col, value in enumerate(values):
+        # Numbers as numbers, so Excel doesn't bother with "number stored as text"
+        if isinstance(value, int):
+            sheet.write_number(row, col, value, col_formats[col])
+        else:
+            sheet.write_string(row, col, value, col_formats[col])
+
+
+def sheet_name(name: str, taken: set) -> str:
+    base = BAD_SHEET_CHARS.sub("_", name)[:MAX_SHEET_NAME] or "Game"
+    candidate, n = base, 2
+    while candidate.lower() in taken:
+        suffix = f" ({n})"
+        candidate = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+        n += 1
+    taken.add(candidate.lower())
+    return candidate
+
+
+# ----------------------------
+# Decoding, in the worker processes
+# ----------------------------
+
+def song_row(mid: str, title: str, bpm1: int, bpm2: int, diffs: Dict[str, Dict[str, int]]) -> List[Any]:
+    # BPM1 is the MAX one, so BPM2 goes first
+    bpm = bpm1 if bpm1 == bpm2 else f"{bpm2}-{bpm1}"
+    row = [mid, title, bpm]
+    for mode in ("single", "double"):
+        row += [diffs[mode].get(lvl, 0) or "-" for lvl in LEVELS]
+    return row
+
+
+def musicdb_rows(path: str, cfg_all: Dict[str, Any]) -> Tuple[str, str, List[List[Any]]]:
+    """Same as game_rows, for a musicdb.xml. The config for it is optional."""
+    # Imported here, it imports the CLI module too
+    from musicdb import iter_musicdb_packages
+    key = os.path.basename(path)
+    cfg = cfg_all.get(key, {})
+    rows = [song_row(p["music_id"], p["title"], p["bpms"][0], p["bpms"][1], p["difficulties"])
+            for p in iter_musicdb_packages(path, cfg)]
+    return key, cfg.get("game", os.path.splitext(key)[0]), rows
+
+
+def game_rows(task: Tuple[str, Dict[str, Any]]) -> Optional[Tuple[str, str, List[List[Any]]]]:
+    """(config key, game name, table rows) of a game file, or None if there's no config for it."""
+    path, cfg_all = task
+    if path.lower().endswith(".xml"):
+        return musicdb_rows(path, cfg_all)
+    try:
+        key, data = load_binary(path, cfg_all)
+    except KeyError:
+        return None
+    cfg = cfg_all[key]
+    bloques, titles_map = decode_game(key, cfg, data)
+
+    rows = []
+    for b in bloques:
+        mid = b["music_id"]
+        raw_titles = titles_map.get(mid, ["Title goes here"])
+        rows.append(song_row(mid, raw_titles[0], b.get("bpm1", 0), b.get("bpm2", 0), build_difficulties(b)))
+    return key, cfg.get("game", key), rows
+
+
+def game_task(task: Tuple[str, Dict[str, Any]]) -> Tuple[Optional[tuple], Optional[str]]:
+    """game_rows in a worker: (result, None), or (None, what went wrong). One bad game doesn't stop the rest."""
+    try:
+        return game_rows(task), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def write_library(files: List[str], cfg_all: Dict[str, Any], out_path: str, workers: int = None) -> List[Tuple[str, int]]:
+    """
+    Writes the workbook. Returns (game name, songs) of every game in it.
+    Files without a config, or that can't be decoded, are skipped (and said so).
+    """
+    workbook = xlsxwriter.Workbook(out_path, {"constant_memory": True})
+    formats = add_formats(workbook)
+    game_formats = column_formats(formats, HEADERS)
+    summary_formats = [formats["text"]] + game_formats
+
+    taken = {"summary"}
+    summary = workbook.add_worksheet("Summary")
+    setup_sheet(summary, formats, ["Game"] + HEADERS, first_col=1)
+    summary_row = 1
+    games = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() gives the results in the same order as the files, the summary is written as they come
+        tasks = [(path, cfg_all) for path in files]
+        for (path, _), (result, error) in zip(tasks, pool.map(game_task, tasks)):
+            if error is not None:
+                print(f"Skipped '{path}': {error}")
+                continue
+            if result is None:
+                print(f"Skipped '{path}': there's no config for it")
+                continue
+            key, name, rows = result
+            sheet = workbook.add_worksheet(sheet_name(name, taken))
+            setup_sheet(sheet, formats, HEADERS)
+            for i, values in enumerate(rows, start=1):
+                write_song_row(sheet, i, values, game_formats)
+                write_song_row(summary, summary_row, [name] + values, summary_formats)
+                summary_row += 1
+            games.append((name, len(rows)))
+
+    workbook.close()
+    return games
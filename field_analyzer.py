@@ -0,0 +1,209 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from EXOM_PE_CLI import RADAR_KEYS, nibble_difficulty_fields
+
+# ----------------------------
+# Field offset discovery.
+# Once 'offset' and 'block_size' of a song table are known, this looks at ALL the blocks at once
+# (as a 2D byte matrix: one row per block, one column per byte) and guesses where the fields are:
+# - music_id: the leading run of lowercase ASCII / NUL bytes.
+# - bpm1/bpm2: two neighbouring u16 values that look like BPMs (bpm1 is the max one).
+# - Difficulties: 4+4 bytes of nibbles <= 10 (old 1-10 scale), or 5+5 bytes <= 20 (1-20 scale).
+# - Groove radar: a run of 45 small u16 values, neighbours correlated.
+# It's a starting point for the Config Editor, not the final truth. Always check with the preview.
+# ----------------------------
+
+MIN_BPM = 30
+MAX_BPM = 1100
+MAX_RADAR = 400
+
+# Radar fields in the order every config so far has them: per metric, single light..challenge,
+# double light..challenge, single beginner.
+RADAR_ORDER = [
+    f"{metric}_{mode}_{level}"
+    for metric in ("voltage", "stream", "air", "chaos", "freeze")
+    for mode, level in [("single", "light"), ("single", "standard"), ("single", "heavy"), ("single", "challenge"),
+                        ("double", "light"), ("double", "standard"), ("double", "heavy"), ("double", "challenge"),
+                        ("single", "beginner")]
+]
+assert set(RADAR_ORDER) <= set(RADAR_KEYS)
+
+LEVELS = ("beginner", "light", "standard", "heavy", "challenge")
+
+
+def block_matrix(data, start: int, end: int, block_size: int) -> np.ndarray:
+    """All the blocks of the table as a (blocks × block_size) uint8 matrix. No copy."""
+    count = (end - start) // block_size
+    return np.frombuffer(data, dtype=np.uint8, count=count * block_size, offset=start).reshape(count, block_size)
+
+
+def u16_matrix(m: np.ndarray) -> np.ndarray:
+    """u16 little endian value starting at every byte column (the last column pairs with 0)."""
+    lo = m.astype(np.uint16)
+    hi = np.zeros_like(lo)
+    hi[:, :-1] = lo[:, 1:]
+    return lo | (hi << 8)
+
+
+def column_stats(m: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per byte column statistics, all vectorized."""
+    u16 = u16_matrix(m)
+    hi_nibble = m >> 4
+    lo_nibble = m & 0x0F
+    return {
+        "min": m.min(axis=0),
+        "max": m.max(axis=0),
+        "nonzero": (m != 0).mean(axis=0),
+        "ascii_lower": ((m >= 97) & (m <= 122) | (m >= 48) & (m <= 57) | (m == 0)).mean(axis=0),
+        "u16_min": u16.min(axis=0),
+        "u16_max": u16.max(axis=0),
+        "u16_nonzero": (u16 != 0).mean(axis=0),
+        "u16_bpm": ((u16 >= MIN_BPM) & (u16 <= MAX_BPM)).mean(axis=0),
+        "hi_nibble_max": hi_nibble.max(axis=0),
+        "lo_nibble_max": lo_nibble.max(axis=0),
+        # Correlation of every u16 column with the one 2 bytes later
+        "u16_corr_next": neighbour_correlation(u16.astype(np.float64), 2),
+    }
+
+
+def neighbour_correlation(values: np.ndarray, step: int) -> np.ndarray:
+    std = values.std(axis=0)
+    safe = np.where(std == 0, 1, std)
+    z = (values - values.mean(axis=0)) / safe
+    corr = np.zeros(values.shape[1])
+    corr[:-step] = (z[:, :-step] * z[:, step:]).mean(axis=0)
+    # Constant columns don't correlate with anything
+    corr[:-step][(std[:-step] == 0) | (std[step:] == 0)] = 0
+    return corr
+
+
+# ----------------------------
+# Guessers. Each one returns config fields ([name, "0x..", size, type]) or an empty list.
+# 'taken' keeps track of the bytes already assigned so guesses don't overlap.
+# ----------------------------
+
+def guess_music_id(m: np.ndarray, stats, taken: np.ndarray) -> List[list]:
+    ascii_cols = stats["ascii_lower"] >= 0.99
+    length = 0
+    while length < len(ascii_cols) and ascii_cols[length] and stats["nonzero"][length] > 0.5:
+        length += 1
+    if length < 4:
+        return []
+    taken[:length] = True
+    return [["music_id", "0x00", length, "string"]]
+
+
+def guess_bpms(m: np.ndarray, stats, taken: np.ndarray) -> List[list]:
+    u16 = u16_matrix(m)
+    best = None
+    for pos in range(0, m.shape[1] - 3, 2):
+        if taken[pos:pos + 4].any():
+            continue
+        if stats["u16_bpm"][pos] < 0.9 or stats["u16_bpm"][pos + 2] < 0.9:
+            continue
+        # bpm1 is the max BPM, so it's never lower than bpm2
+        order = (u16[:, pos] >= u16[:, pos + 2]).mean()
+        same = (u16[:, pos] == u16[:, pos + 2]).mean()
+        score = order + same
+        if order > 0.95 and (best is None or score > best[0]):
+            best = (score, pos)
+    if best is None:
+        return []
+    pos = best[1]
+    taken[pos:pos + 4] = True
+    return [["bpm1", f"0x{pos:02X}", 2, "u16_le"], ["bpm2", f"0x{pos + 2:02X}", 2, "u16_le"]]
+
+
+def guess_difficulties_1_10(m: np.ndarray, stats, taken: np.ndarray) -> List[list]:
+    # Nibbles <= 10 everywhere, and something actually set, in two 4-byte groups in a row
+    ok = (stats["hi_nibble_max"] <= 10) & (stats["lo_nibble_max"] <= 10)
+    for pos in range(0, m.shape[1] - 7):
+        group = slice(pos, pos + 8)
+        if taken[group].any() or not ok[group].all():
+            continue
+        # Byte 0 and 1 of each group have light/standard/heavy/challenge, they must be used
+        if min(stats["nonzero"][pos], stats["nonzero"][pos + 1]) < 0.5:
+            continue
+        taken[group] = True
+        return nibble_difficulty_fields("single", pos) + nibble_difficulty_fields("double", pos + 4)
+    return []
+
+
+def guess_difficulties_1_20(m: np.ndarray, stats, taken: np.ndarray) -> List[list]:
+    ok = stats["max"] <= 20
+    for pos in range(0, m.shape[1] - 9):
+        group = slice(pos, pos + 10)
+        if taken[group].any() or not ok[group].all():
+            continue
+        # light <= standard <= heavy for most songs, in both modes
+        single = m[:, pos + 1:pos + 4].astype(np.int16)
+        double = m[:, pos + 6:pos + 9].astype(np.int16)
+        ordered = min((np.diff(single, axis=1) >= 0).all(axis=1).mean(), (np.diff(double, axis=1) >= 0).all(axis=1).mean())
+        if ordered < 0.8 or stats["nonzero"][pos + 2] < 0.5:
+            continue
+        taken[group] = True
+        return ([[f"single_{lvl}", f"0x{pos + i:02X}", 1, "u8"] for i, lvl in enumerate(LEVELS)]
+                + [[f"double_{lvl}", f"0x{pos + 5 + i:02X}", 1, "u8"] for i, lvl in enumerate(LEVELS)])
+    return []
+
+
+def guess_radar(m: np.ndarray, stats, taken: np.ndarray) -> List[list]:
+    run = len(RADAR_ORDER) * 2
+    small = (stats["u16_max"] <= MAX_RADAR)
+    best = None
+    for pos in range(0, m.shape[1] - run + 1, 2):
+        if taken[pos:pos + run].any():
+            continue
+        cols = np.arange(pos, pos + run, 2)
+        if small[cols].mean() < 0.95 or stats["u16_nonzero"][cols].mean() < 0.2:
+            continue
+        # Inside a metric, light->standard->heavy of the same mode go together.
+        # Columns that are always 0 are padding around the run, not radar values.
+        score = small[cols].mean() + stats["u16_corr_next"][cols].mean() + stats["u16_nonzero"][cols].mean()
+        if best is None or score > best[0]:
+            best = (score, pos)
+    if best is None:
+        return []
+    pos = best[1]
+    taken[pos:pos + run] = True
+    return [[name, f"0x{pos + i * 2:02X}", 2, "u16_le"] for i, name in enumerate(RADAR_ORDER)]
+
+
+def propose_fields(data, start: int, end: int, block_size: int) -> Tuple[List[list], Dict[str, Any]]:
+    """
+    Draft 'fields' list for a song table, plus the per column statistics it was built from.
+    Fields that couldn't be guessed are left out.
+    """
+    m = block_matrix(data, start, end, block_size)
+    if m.shape[0] < 2:
+        raise ValueError("At least 2 blocks are needed to say anything useful")
+    stats = column_stats(m)
+    taken = np.zeros(block_size, dtype=bool)
+
+    fields = guess_music_id(m, stats, taken)
+    fields += guess_bpms(m, stats, taken)
+    # Radar before difficulties: radar values are bigger, difficulties are easy to find in what's left
+    radar = guess_radar(m, stats, taken)
+    diffs = guess_difficulties_1_20(m, stats, taken) or guess_difficulties_1_10(m, stats, taken)
+    fields += diffs + radar
+    return fields, stats
+
+
+def difficulty_scale_of(fields: List[list]) -> Optional[str]:
+    types = {f[0]: f[-1] for f in fields}
+    if "single_difficulties" in types or types.get("single_light", "").startswith("nibble"):
+        return "1_10"
+    if "single_light" in types:
+        return "1_20"
+    return None
+
+
+def format_fields(fields: List[list]) -> str:
+    """Same layout as config.json, one field per line, ready to paste."""
+    lines = [
+        "[" + ",".join(f'"{x}"' if isinstance(x, str) else str(x) for x in field) + "]"
+        for field in fields
+    ]
+    return '"fields": [\n        ' + ",\n        ".join(lines) + "\n    ]"
@@ -0,0 +1,168 @@
+from PySide6.QtWidgets import QAbstractScrollArea
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPainter
+from PySide6.QtCore import Qt, Signal
+
+# ----------------------------
+# Hex/ASCII viewer for the Config Editor.
+# Works on any buffer (a memory mapped file, usually) and only draws the rows that are visible,
+# so opening a multi megabyte ddr.dll is instant.
+# It can highlight the song table and the configured field columns, and tells you which byte was clicked.
+# ----------------------------
+
+BYTES_PER_ROW = 16
+
+TABLE_COLOR = QColor("#E8F0FF")      # Bytes inside the song table
+FIELD_COLOR = QColor("#FFE28A")      # Bytes of a configured field
+SELECTED_COLOR = QColor("#FF9F40")   # Bytes of the selected field
+BLOCK_START_COLOR = QColor("#366092")
+
+
+class HexView(QAbstractScrollArea):
+    # Absolute file offset of the clicked byte
+    byte_clicked = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.data = None
+        self.table = None           # (start, end, block size)
+        self.fields = []            # [(offset in block, size)]
+        self.selected_field = None  # (offset in block, size)
+
+        self.setFont(QFont("Courier New", 10))
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    # ----------------------------
+    # Data and highlights
+    # ----------------------------
+
+    def set_data(self, data):
+        self.data = data
+        self.update_scrollbar()
+        self.verticalScrollBar().setValue(0)
+        self.viewport().update()
+
+    def set_table(self, start, end, block_size):
+        self.table = (start, end, block_size) if block_size and block_size > 0 and end > start else None
+        self.viewport().update()
+
+    def set_fields(self, fields, selected=None):
+        self.fields = fields
+        self.selected_field = selected
+        self.viewport().update()
+
+    def goto(self, offset):
+        self.verticalScrollBar().setValue(offset // BYTES_PER_ROW)
+
+    # ----------------------------
+    # Geometry
+    # ----------------------------
+
+    def metrics(self):
+        fm = QFontMetrics(self.font())
+        return fm.horizontalAdvance("0"), fm.height()
+
+    def columns(self):
+        """x positions of the address, hex and ASCII columns."""
+        char_w, _ = self.metrics()
+        addr_x = 4
+        hex_x = addr_x + char_w * 10
+        ascii_x = hex_x + char_w * (BYTES_PER_ROW * 3 + 1)
+        return addr_x, hex_x, ascii_x
+
+    def visible_rows(self):
+        _, line_h = self.metrics()
+        return max(1, self.viewport().height() // line_h)
+
+    def total_rows(self):
+        return (len(self.data) + BYTES_PER_ROW - 1) // BYTES_PER_ROW if self.data is not None else 0
+
+    def update_scrollbar(self):
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, self.total_rows() - self.visible_rows()))
+        bar.setPageStep(self.visible_rows())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbar()
+
+    def byte_color(self, offset):
+        if not self.table:
+            return None
+        start, end, block_size = self.table
+        if not start <= offset < end:
+            return None
+        rel = (offset - start) % block_size
+        if self.selected_field and self.selected_field[0] <= rel < self.selected_field[0] + self.selected_field[1]:
+            return SELECTED_COLOR
+        for pos, size in self.fields:
+            if pos <= rel < pos + size:
+                return FIELD_COLOR
+        return TABLE_COLOR
+
+    # ----------------------------
+    # Painting. Only the visible rows are read and drawn.
+    # ----------------------------
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().base())
+        if self.data is None:
+            return
+
+        char_w, line_h = self.metrics()
+        addr_x, hex_x, ascii_x = self.columns()
+        first = self.verticalScrollBar().value()
+        size = len(self.data)
+        ascent = QFontMetrics(self.font()).ascent()
+
+        for i in range(self.visible_rows() + 1):
+            row_start = (first + i) * BYTES_PER_ROW
+            if row_start >= size:
+                break
+            y = i * line_h
+            chunk = self.data[row_start:row_start + BYTES_PER_ROW]
+
+            painter.setPen(BLOCK_START_COLOR)
+            painter.drawText(addr_x, y + ascent, f"{row_start:08X}")
+
+            for j, byte in enumerate(chunk):
+                offset = row_start + j
+                color = self.byte_color(offset)
+                hx = hex_x + j * 3 * char_w
+                ax = ascii_x + j * char_w
+                if color is not None:
+                    painter.fillRect(hx, y, char_w * 2, line_h, color)
+                    painter.fillRect(ax, y, char_w, line_h, color)
+                # Mark where every block starts
+                if self.table and color is not None and (offset - self.table[0]) % self.table[2] == 0:
+                    painter.setPen(BLOCK_START_COLOR)
+                    painter.drawLine(hx - 1, y, hx - 1, y + line_h)
+                painter.setPen(self.palette().text().color())
+                painter.drawText(hx, y + ascent, f"{byte:02X}")
+                painter.drawText(ax, y + ascent, chr(byte) if 32 <= byte < 127 else ".")
+
+    # ----------------------------
+    # Clicks
+    # ----------------------------
+
+    def offset_at(self, x, y):
+        if self.data is None:
+            return None
+        char_w, line_h = self.metrics()
+        _, hex_x, ascii_x = self.columns()
+        row = self.verticalScrollBar().value() + int(y // line_h)
+        if hex_x <= x < ascii_x - char_w:
+            col = int((x - hex_x) // (3 * char_w))
+        elif ascii_x <= x < ascii_x + BYTES_PER_ROW * char_w:
+            col = int((x - ascii_x) // char_w)
+        else:
+            return None
+        offset = row * BYTES_PER_ROW + min(col, BYTES_PER_ROW - 1)
+        return offset if offset < len(self.data) else None
+
+    def mousePressEvent(self, event):
+        pos = event.position()
+        offset = self.offset_at(pos.x(), pos.y())
+        if offset is not None:
+            self.byte_clicked.emit(offset)
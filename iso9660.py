@@ -0,0 +1,185 @@
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ----------------------------
+# Minimal ISO 9660 reader.
+# Enough to find a file on a disc image and read only that file, without extracting anything.
+# Supports plain .iso images (2048 bytes per sector) and raw 2352-byte images (MODE1 / MODE2 Form 1),
+# since some CD-based games are dumped that way.
+# ----------------------------
+
+SECTOR_SIZE = 2048
+PVD_SECTOR = 16
+
+# (raw sector size, offset of the user data inside a raw sector)
+SECTOR_FORMATS = [
+    (2048, 0),   # Plain ISO
+    (2352, 24),  # MODE2 Form 1
+    (2352, 16),  # MODE1
+]
+
+
+class IsoEntry:
+    __slots__ = ("name", "path", "lba", "size", "is_dir")
+
+    def __init__(self, name: str, path: str, lba: int, size: int, is_dir: bool):
+        self.name = name
+        self.path = path
+        self.lba = lba
+        self.size = size
+        self.is_dir = is_dir
+
+    def __repr__(self) -> str:
+        return f"IsoEntry({self.path!r}, lba={self.lba}, size={self.size})"
+
+
+class IsoImage:
+    """
+    Opened disc image. Only the volume descriptor and the directory sectors are read when opening.
+    Use as a context manager, or call close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            self.raw_sector, self.data_offset = self._detect_format()
+            pvd = self.read_sectors(PVD_SECTOR, 1)
+            self.root = self._parse_record(pvd, 156, "")
+        except Exception:
+            self.f.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def _detect_format(self) -> Tuple[int, int]:
+        for raw, off in SECTOR_FORMATS:
+            self.f.seek(PVD_SECTOR * raw + off)
+            head = self.f.read(6)
+            if head[:1] == b"\x01" and head[1:6] == b"CD001":
+                return raw, off
+        raise ValueError(f"'{self.path}' doesn't look like an ISO 9660 image")
+
+    def read_sectors(self, lba: int, count: int) -> bytes:
+        if self.raw_sector == SECTOR_SIZE:
+            self.f.seek(lba * SECTOR_SIZE)
+            return self.f.read(count * SECTOR_SIZE)
+        # Raw image: strip the sync/header/EDC of every sector
+        out = bytearray()
+        for i in range(count):
+            self.f.seek((lba + i) * self.raw_sector + self.data_offset)
+            out += self.f.read(SECTOR_SIZE)
+        return bytes(out)
+
+    @staticmethod
+    def _parse_record(buf: bytes, pos: int, parent: str) -> IsoEntry:
+        # Directory record layout (both-endian fields, we use the little endian half):
+        # 0: record length, 2: extent LBA, 10: data length, 25: flags, 32: name length, 33: name
+        lba = struct.unpack_from("<I", buf, pos + 2)[0]
+        size = struct.unpack_from("<I", buf, pos + 10)[0]
+        flags = buf[pos + 25]
+        name_len = buf[pos + 32]
+        raw_name = buf[pos + 33:pos + 33 + name_len]
+        # Drop the ";1" version and the trailing dot of names without extension
+        name = raw_name.decode("ascii", errors="ignore").split(";")[0].rstrip(".")
+        path = f"{parent}/{name}" if parent else name
+        return IsoEntry(name, path, lba, size, bool(flags & 0x02))
+
+    def list_dir(self, entry: Optional[IsoEntry] = None) -> List[IsoEntry]:
+        entry = entry or self.root
+        count = (entry.size + SECTOR_SIZE - 1) // SECTOR_SIZE
+        buf = self.read_sectors(entry.lba, count)
+        parent = entry.path if entry is not self.root else ""
+        entries = []
+        pos = 0
+        while pos < len(buf):
+            rec_len = buf[pos]
+            if rec_len == 0:
+                # Records never cross sector boundaries, the rest of this sector is padding
+                pos = (pos // SECTOR_SIZE + 1) * SECTOR_SIZE
+                continue
+            name_len = buf[pos + 32]
+            # Skip the "." and ".." entries
+            if not (name_len == 1 and buf[pos + 33] in (0, 1)):
+                entries.append(self._parse_record(buf, pos, parent))
+            pos += rec_len
+        return entries
+
+    def walk(self) -> Iterator[IsoEntry]:
+        """Every file in the image, root directory first."""
+        pending = [self.root]
+        while pending:
+            current = pending.pop(0)
+            for entry in self.list_dir(current):
+                if entry.is_dir:
+                    pending.append(entry)
+                else:
+                    yield entry
+
+    def find(self, names: Iterable[str]) -> Optional[IsoEntry]:
+        """
+        First file whose name matches one of 'names' (case insensitive).
+        The root directory is checked first, that's where the executables are.
+        """
+        wanted = {n.upper(): n for n in names}
+        for entry in self.walk():
+            if entry.name.upper() in wanted:
+                return entry
+        return None
+
+    def read_file(self, entry: IsoEntry) -> bytes:
+        """
+        Reads a single file. On plain images only that extent is memory mapped,
+        the rest of the image is never touched.
+        """
+        if entry.size == 0:
+            return b""
+        if self.raw_sector != SECTOR_SIZE:
+            count = (entry.size + SECTOR_SIZE - 1) // SECTOR_SIZE
+            return self.read_sectors(entry.lba, count)[:entry.size]
+
+        start = entry.lba * SECTOR_SIZE
+        aligned = start - start % mmap.ALLOCATIONGRANULARITY
+        delta = start - aligned
+        with mmap.mmap(self.f.fileno(), delta + entry.size, access=mmap.ACCESS_READ, offset=aligned) as mm:
+            return mm[delta:delta + entry.size]
+
+
+def is_iso(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == ".iso"
+
+
+def matching_name(iso_path: str, names: Iterable[str]) -> Optional[str]:
+    """
+    The name (as written in 'names') read_matching_file would read, or None if there's no match.
+    Only the directories are read, not the file.
+    """
+    names = list(names)
+    by_upper: Dict[str, str] = {n.upper(): n for n in names}
+    with IsoImage(iso_path) as iso:
+        entry = iso.find(names)
+    return None if entry is None else by_upper[entry.name.upper()]
+
+
+def read_matching_file(iso_path: str, names: Iterable[str]) -> Tuple[str, bytes]:
+    """
+    Looks for a file named like one of 'names' (i.e. the config keys) inside the image.
+    Returns (the matching name, as written in 'names', file contents).
+    Raises KeyError if there's no match.
+    """
+    names = list(names)
+    by_upper: Dict[str, str] = {n.upper(): n for n in names}
+    with IsoImage(iso_path) as iso:
+        entry = iso.find(names)
+        if entry is None:
+            raise KeyError(f"None of the configured files were found inside '{iso_path}'")
+        return by_upper[entry.name.upper()], iso.read_file(entry)
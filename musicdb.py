@@ -0,0 +1,126 @@
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from EXOM_PE_CLI import (RADAR_LEVELS, RADAR_MODES, block_to_package, fill_zero_radars, package_outdir,
+                         write_game_packages)
+
+# ----------------------------
+# Arcade song databases (musicdb.xml).
+# Arcade releases after X3 don't have a song table in ddr.dll anymore, the songs are in an XML file:
+#
+#   <mdb>
+#     <music>
+#       <mcode __type="u32">38000</mcode>
+#       <basename>sync</basename>
+#       <title>SYNC</title>
+#       <artist>...</artist>
+#       <bpmmax __type="u16">180</bpmmax>
+#       <bpmmin __type="u16">90</bpmmin>
+#       <diffLv __type="u8" __count="10">1 3 5 7 0 0 3 5 7 0</diffLv>
+#       ...
+#     </music>
+#     ...
+#   </mdb>
+#
+# The file is read with iterparse: every <music> is turned into a record as soon as it's closed,
+# and then thrown away, so memory stays the same however big the database is.
+# The records have the same keys as the song table ones, so block_to_package does the rest.
+# There's no groove radar in musicdb.xml, it stays at 0 (unless it's calculated from the charts, see ssq_radar.py).
+# ----------------------------
+
+# diffLv: single beginner..challenge, then double beginner..challenge
+DIFF_ORDER = [f"{mode}_{level}" for mode in RADAR_MODES for level in RADAR_LEVELS]
+# Encodings expat reads by itself. Anything else (shift_jis...) is decoded by Python first.
+EXPAT_ENCODINGS = {"utf-8", "utf8", "utf-16", "utf16", "iso-8859-1", "latin-1", "latin1", "us-ascii", "ascii"}
+XML_ENCODING = re.compile(rb"""<\?xml[^>]*encoding=["']([A-Za-z0-9_.-]+)["']""")
+
+
+def open_xml(path: str):
+    """The file, ready for iterparse whatever its declared encoding is."""
+    f = open(path, "rb")
+    m = XML_ENCODING.match(f.read(200))
+    f.seek(0)
+    encoding = m.group(1).decode("ascii").lower() if m else "utf-8"
+    if encoding in EXPAT_ENCODINGS:
+        return f
+    # iterparse takes text too, the declaration is ignored then
+    return io.TextIOWrapper(f, encoding=encoding, errors="replace")
+
+
+def to_int(text: Optional[str]) -> int:
+    try:
+        return int((text or "0").strip())
+    except ValueError:
+        return 0
+
+
+def music_to_record(music: ET.Element) -> Dict[str, Any]:
+    """A <music> entry as a song record (same keys as the ones from a song table)."""
+    values = {child.tag: (child.text or "").strip() for child in music}
+    record = {
+        "music_id": values.get("basename", ""),
+        "title": values.get("title", ""),
+        "artist": values.get("artist", ""),
+        # BPM1 is the MAX one, like in the song tables
+        "bpm1": to_int(values.get("bpmmax")),
+        "bpm2": to_int(values.get("bpmmin")),
+        # There's no memory card link ID in the arcade (mcode is the arcade song number, something else)
+        "memcard_link_id": 0,
+    }
+    levels = values.get("diffLv", "").split()
+    for key, value in zip(DIFF_ORDER, levels):
+        record[key] = to_int(value)
+    return record
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Song records of a musicdb.xml, one at a time."""
+    with open_xml(path) as source:
+        context = iter(ET.iterparse(source, events=("start", "end")))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end" or elem.tag != "music":
+                continue
+            record = music_to_record(elem)
+            # Done with it: drop it from the root too, or the whole tree ends up in memory anyway
+            elem.clear()
+            root.clear()
+            if record["music_id"]:
+                yield record
+
+
+def iter_musicdb_packages(path: str, cfg: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Packages of a musicdb.xml, same structure as the ones from a game executable."""
+    basename = os.path.basename(path)
+    for record in iter_records(path):
+        mid = record["music_id"].lower()
+        pkg = block_to_package(record, cfg, basename, {mid: (record["title"], record["title"])})
+        if record["artist"]:
+            pkg["artist"] = record["artist"]
+        yield pkg
+
+
+def export_musicdb(path: str, cfg: Dict[str, Any], debug: bool = False, store: str = None,
+                   radars: Dict[str, Any] = None) -> str:
+    """
+    Same as export_game, for a musicdb.xml. 'cfg' can be empty, the game name is the file name then.
+    Packages go from the XML to the files one at a time, they're never all in memory.
+    """
+    basename = os.path.basename(path)
+    filled = [0]
+
+    def prepared(packages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for pkg in packages:
+            if debug:
+                print(f"DEBUG short={pkg['music_id']!r}, title={pkg['title']!r}")
+            if radars:
+                filled[0] += fill_zero_radars([pkg], radars)
+            yield pkg
+
+    outdir = write_game_packages(prepared(iter_musicdb_packages(path, cfg)), package_outdir(cfg, basename), store)
+    if radars:
+        print(f"Filled {filled[0]} empty groove radars from the charts")
+    return outdir
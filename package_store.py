@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, Tuple
+
+# ----------------------------
+# Content addressed package store.
+# The same song is in a lot of games, and its package.json is exactly the same in all of them
+# except for "_origin". With this, the package (without "_origin") is written ONCE to
+#   <store>/<first 2 chars of the hash>/<sha256>.json
+# and every '<game>_packages/<music_id>/package.json' is a hardlink to it.
+# "_origin" goes to a tiny sidecar next to it, 'origin.json'.
+#
+# If hardlinks aren't possible (different drive, FAT32...), a reflink (copy on write clone) is tried,
+# and if that doesn't work either, the file is just copied.
+# ----------------------------
+
+DEFAULT_STORE = ".package_store"
+ORIGIN_SIDECAR = "origin.json"
+
+# Linux ioctl to clone a file (btrfs, XFS...). Not available anywhere else.
+FICLONE = 0x40049409
+
+
+def package_bytes(pkg: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """The shared part of a package as file contents, and the per game part."""
+    shared = {k: v for k, v in pkg.items() if k != "_origin"}
+    sidecar = {"_origin": pkg["_origin"]} if "_origin" in pkg else {}
+    return json.dumps(shared, indent=4, ensure_ascii=False).encode("utf-8"), sidecar
+
+
+def store_blob(store: str, content: bytes) -> Tuple[str, bool]:
+    """Writes the content to the store if it isn't there yet. Returns its path, and if it was written now."""
+    digest = hashlib.sha256(content).hexdigest()
+    path = os.path.join(store, digest[:2], f"{digest}.json")
+    if os.path.exists(path):
+        return path, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return path, True
+
+
+def reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst)
+    return False
+
+
+def link_into(blob: str, dst: str) -> str:
+    """
+    Makes 'dst' the same file as 'blob'. Returns how: "kept" (it already was), "hardlink", "reflink" or "copy".
+    The old file is replaced in one go, so a half done export never leaves a broken package.json.
+    """
+    try:
+        if os.path.samefile(blob, dst):
+            return "kept"
+    except OSError:
+        pass
+
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        os.link(blob, tmp)
+        how = "hardlink"
+    except OSError:
+        if reflink(blob, tmp):
+            how = "reflink"
+        else:
+            shutil.copyfile(blob, tmp)
+            how = "copy"
+    os.replace(tmp, dst)
+    return how
+
+
+def write_package_folders_deduped(packages: Iterable[Dict[str, Any]], root_outdir: str,
+                                  store: str = DEFAULT_STORE) -> Dict[str, int]:
+    """
+    Same folders as write_package_folders, but package.json comes from the store and "_origin"
+    goes to the sidecar. Returns how many packages were linked/copied/already there, and how many
+    new files went into the store.
+    """
+    stats = {"packages": 0, "stored": 0, "kept": 0, "hardlink": 0, "reflink": 0, "copy": 0}
+    for pkg in packages:
+        content, sidecar = package_bytes(pkg)
+        blob, new = store_blob(store, content)
+        stats["stored"] += new
+
+        folder = os.path.join(root_outdir, pkg["music_id"])
+        os.makedirs(folder, exist_ok=True)
+        stats[link_into(blob, os.path.join(folder, "package.json"))] += 1
+        with open(os.path.join(folder, ORIGIN_SIDECAR), "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, indent=4, ensure_ascii=False)
+        stats["packages"] += 1
+    return stats
+
+
+def read_package(folder: str) -> Dict[str, Any]:
+    """package.json of a deduplicated folder with its "_origin" back in place."""
+    with open(os.path.join(folder, "package.json"), "r", encoding="utf-8") as f:
+        pkg = json.load(f)
+    sidecar = os.path.join(folder, ORIGIN_SIDECAR)
+    if os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            pkg.update(json.load(f))
+    return pkg
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from EXOM_PE_CLI import load_config, load_binary, build_packages, config_fingerprint, file_stamp
+import iso9660
+
+# ----------------------------
+# Local query service.
+# Keeps config.json and the decoded games in memory, so scripts can ask for songs over HTTP
+# instead of running the CLI again and again.
+#
+# Endpoints (all GET, all answer JSON):
+# - /games                  -> configured games being served (nothing is decoded for this one)
+# - /songs?game=<key>       -> every package of a game. <key> is the config key, e.g. SLPM_653.58
+# - /packages?music_id=<id> -> the packages of a music_id in every game, as [{"game", "_origin", "package"}]
+#
+# Decoded games are kept in an LRU cache limited by (approximate) memory.
+# An entry is thrown away when its file changes (mtime/size) or its config entry changes.
+# ----------------------------
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 256
+
+
+class GameCache:
+    """
+    LRU of decoded games, limited by (approximate) memory.
+    By default the size of an entry is the size of its packages as JSON. The GUI uses this too.
+    'on_evict' is called with the path of every entry thrown away to make room.
+    """
+
+    def __init__(self, max_bytes: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (state, size, value)
+        self.lock = threading.Lock()
+        self.on_evict = on_evict
+
+    def get(self, path: str, state: tuple) -> Optional[List[Dict[str, Any]]]:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            if entry[0] != state:
+                # File or config changed since it was decoded
+                self._drop(path)
+                return None
+            self.entries.move_to_end(path)
+            return entry[2]
+
+    def put(self, path: str, state: tuple, packages: Any, size: Optional[int] = None):
+        if size is None:
+            size = len(json.dumps(packages, ensure_ascii=False))
+        evicted = []
+        with self.lock:
+            if path in self.entries:
+                self._drop(path)
+            self.entries[path] = (state, size, packages)
+            self.used += size
+            # Evict the least recently used games, but always keep the one we just added
+            while self.used > self.max_bytes and len(self.entries) > 1:
+                oldest = next(iter(self.entries))
+                self._drop(oldest)
+                evicted.append(oldest)
+        if self.on_evict:
+            for old in evicted:
+                self.on_evict(old)
+
+    def discard(self, path: str):
+        with self.lock:
+            if path in self.entries:
+                self._drop(path)
+
+    def _drop(self, path: str):
+        state, size, _ = self.entries.pop(path)
+        self.used -= size
+
+
+class QueryService:
+    def __init__(self, files: List[str], config_path: str, cache_bytes: int):
+        self.files = files
+        self.config_path = config_path
+        self.cache = GameCache(cache_bytes)
+        self.lock = threading.Lock()
+        self.config_stamp = None
+        self.cfg_all: Dict[str, Any] = {}
+        # path -> (file stamp, config key) so images aren't opened every time. Handler threads share it,
+        # it's guarded by the cache's lock.
+        self.keys: Dict[str, tuple] = {}
+        self._reload_config()
+
+    def _reload_config(self):
+        with self.lock:
+            stamp = file_stamp(self.config_path)
+            if stamp != self.config_stamp:
+                self.cfg_all = load_config(self.config_path)
+                self.config_stamp = stamp
+
+    def _key_for(self, path: str, stamp: tuple) -> Optional[str]:
+        with self.cache.lock:
+            known = self.keys.get(path)
+        if known and known[0] == stamp:
+            return known[1]
+        basename = os.path.basename(path)
+        if basename in self.cfg_all:
+            key = basename
+        elif iso9660.is_iso(path):
+            # Only the directories of the image are read, the executable is read when the game is decoded
+            try:
+                key = iso9660.matching_name(path, self.cfg_all.keys())
+            except (OSError, ValueError):
+                key = None
+        else:
+            key = None
+        with self.cache.lock:
+            self.keys[path] = (stamp, key)
+        return key
+
+    def games(self) -> List[Dict[str, Any]]:
+        self._reload_config()
+        result = []
+        for path in self.files:
+            stamp = file_stamp(path)
+            key = self._key_for(path, stamp) if stamp else None
+            if key:
+                result.append({"key": key, "game": self.cfg_all[key].get("game", key), "path": path})
+        return result
+
+    def packages_for(self, path: str) -> Optional[List[Dict[str, Any]]]:
+        self._reload_config()
+        stamp = file_stamp(path)
+        if stamp is None:
+            return None
+        key = self._key_for(path, stamp)
+        if key is None:
+            return None
+        cfg = self.cfg_all[key]
+        state = (stamp, config_fingerprint(cfg))
+
+        packages = self.cache.get(path, state)
+        if packages is None:
+            key, data = load_binary(path, self.cfg_all)
+            packages = build_packages(key, cfg, data)
+            self.cache.put(path, state, packages)
+        return packages
+
+    def songs(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        for game in self.games():
+            if game["key"] == key:
+                return self.packages_for(game["path"])
+        return None
+
+    def find_music_id(self, music_id: str) -> List[Dict[str, Any]]:
+        music_id = music_id.lower()
+        found = []
+        for game in self.games():
+            for pkg in self.packages_for(game["path"]) or []:
+                if pkg["music_id"] == music_id:
+                    found.append({"game": game["game"], "_origin": game["key"], "package": pkg})
+        return found
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service: QueryService = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/games":
+                self._reply(200, self.service.games())
+            elif url.path == "/songs" and "game" in params:
+                songs = self.service.songs(params["game"])
+                if songs is None:
+                    self._reply(404, {"error": f"Unknown game '{params['game']}'"})
+                else:
+                    self._reply(200, songs)
+            elif url.path == "/packages" and "music_id" in params:
+                self._reply(200, self.service.find_music_id(params["music_id"]))
+            else:
+                self._reply(404, {"error": "Unknown request. Use /games, /songs?game=<key> or /packages?music_id=<id>"})
+        except (OSError, ValueError, KeyError) as e:
+            self._reply(500, {"error": str(e)})
+
+    def _reply(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Quiet, please. Scripts hammer this thing.
+        pass
+
+
+def serve(files: List[str], config_path: str, port: int = DEFAULT_PORT, cache_mb: int = DEFAULT_CACHE_MB):
+    QueryHandler.service = QueryService(files, config_path, cache_mb * 1024 * 1024)
+    # Only localhost, this is not meant to be exposed anywhere.
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving {len(files)} file(s) on http://127.0.0.1:{port}/ Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        server.server_close()
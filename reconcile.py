@@ -0,0 +1,173 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from EXOM_PE_CLI import fill_zero_radars, iter_packages, load_binary
+from package_store import read_package
+
+# ----------------------------
+# Reconciliation of an existing package library (an Omnimix tree: '<anything>/<music_id>/package.json')
+# against the games, decoded again.
+# 1. Every package.json of the library is read in parallel (worker processes, only the fields that are compared
+#    come back) and indexed by music_id. Deduplicated folders (--dedupe) get their "_origin" from origin.json.
+# 2. The games are decoded, their packages are indexed by music_id too.
+# 3. Every library package is compared with the same song in the game it came from ("_origin"), or in the first
+#    game that has it if that one isn't there. Three things are reported:
+#    - radars that are all 0 in the library and not in the game
+#    - placeholder titles ("Title goes here") the game has a real title for
+#    - difficulties that aren't the same
+# With apply, radars and titles are fixed in place. Only the files that change are written (temporary file,
+# then renamed over it). A hardlinked package.json (--dedupe) becomes a file of its own, so the other games that
+# shared it aren't touched. Difficulties are only reported: a different difficulty is usually a different game.
+# ----------------------------
+
+PLACEHOLDER = "Title goes here"
+PACKAGE_NAME = "package.json"
+COMPARED_KEYS = ("music_id", "title", "title2", "difficulties", "groove_radar", "_origin")
+
+
+def find_packages(library: str) -> List[str]:
+    paths = []
+    for root, _, names in os.walk(library):
+        if PACKAGE_NAME in names:
+            paths.append(os.path.join(root, PACKAGE_NAME))
+    paths.sort()
+    return paths
+
+
+def read_entry(path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(path, compared fields of its package) or (path, None) if it can't be read."""
+    try:
+        pkg = read_package(os.path.dirname(path))
+    except (OSError, ValueError):
+        return path, None
+    if not isinstance(pkg, dict) or not pkg.get("music_id"):
+        return path, None
+    return path, {k: pkg[k] for k in COMPARED_KEYS if k in pkg}
+
+
+def index_library(library: str, workers: int = None) -> Tuple[Dict[str, List[Tuple[str, Dict[str, Any]]]], List[str]]:
+    """{music_id: [(path, package), ...]} of the library, and the files that couldn't be read."""
+    index: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    broken = []
+    paths = find_packages(library)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, entry in pool.map(read_entry, paths, chunksize=64):
+            if entry is None:
+                broken.append(path)
+            else:
+                index.setdefault(str(entry["music_id"]).lower(), []).append((path, entry))
+    return index, broken
+
+
+def iter_source_packages(path: str, cfg_all: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    if path.lower().endswith(".xml"):
+        # Imported here, same as in the CLI
+        from musicdb import iter_musicdb_packages
+        yield from iter_musicdb_packages(path, cfg_all.get(os.path.basename(path), {}))
+        return
+    key, data = load_binary(path, cfg_all)
+    yield from iter_packages(key, cfg_all[key], data)
+
+
+def index_sources(files: List[str], cfg_all: Dict[str, Any], radars: Dict[str, Any] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """{music_id: [package, ...]} of the games, in the order the files were given."""
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for path in files:
+        packages = list(iter_source_packages(path, cfg_all))
+        if radars:
+            fill_zero_radars(packages, radars)
+        for pkg in packages:
+            index.setdefault(pkg["music_id"], []).append(pkg)
+    return index
+
+
+def pick_source(entry: Dict[str, Any], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The game package the library one came from, or the first one."""
+    origin = entry.get("_origin")
+    return next((s for s in sources if s.get("_origin") == origin), sources[0])
+
+
+def compare(entry: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    """What's different. Empty if nothing is."""
+    diff: Dict[str, Any] = {}
+
+    radars = []
+    for mode, levels in (entry.get("groove_radar") or {}).items():
+        for level, radar in levels.items():
+            new = source.get("groove_radar", {}).get(mode, {}).get(level)
+            if new and not any(radar.values()) and any(new.values()):
+                radars.append((mode, level, new))
+    if radars:
+        diff["radars"] = radars
+
+    titles = {}
+    for k in ("title", "title2"):
+        if entry.get(k) == PLACEHOLDER and source.get(k) not in (None, "", PLACEHOLDER):
+            titles[k] = source[k]
+    if titles:
+        diff["titles"] = titles
+
+    difficulties = {}
+    for mode, levels in (source.get("difficulties") or {}).items():
+        for level, value in levels.items():
+            old = (entry.get("difficulties") or {}).get(mode, {}).get(level)
+            if old != value:
+                difficulties[f"{mode}_{level}"] = (old, value)
+    if difficulties:
+        diff["difficulties"] = difficulties
+    return diff
+
+
+def apply_diff(path: str, diff: Dict[str, Any]) -> bool:
+    """Writes the radar and title fixes to a package.json. False if there was nothing to change."""
+    with open(path, "r", encoding="utf-8") as f:
+        pkg = json.load(f)
+    before = json.dumps(pkg, sort_keys=True)
+    for mode, level, radar in diff.get("radars", []):
+        pkg.setdefault("groove_radar", {}).setdefault(mode, {})[level] = dict(radar)
+    pkg.update(diff.get("titles", {}))
+    if json.dumps(pkg, sort_keys=True) == before:
+        return False
+
+    # Same format as the export. A new file and a rename, never written INTO: it may be hardlinked
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pkg, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, path)
+    return True
+
+
+def reconcile(library: str, files: List[str], cfg_all: Dict[str, Any], workers: int = None, apply: bool = False,
+              radars: Dict[str, Any] = None) -> Dict[str, int]:
+    """Prints the differences (and fixes them with 'apply'). Returns the counts."""
+    library_index, broken = index_library(library, workers)
+    sources = index_sources(files, cfg_all, radars)
+    stats = {"packages": sum(len(v) for v in library_index.values()), "unreadable": len(broken), "not_in_games": 0,
+             "radars": 0, "titles": 0, "difficulties": 0, "written": 0}
+
+    for path in broken:
+        print(f"{path}: can't be read")
+    for music_id in sorted(library_index):
+        if music_id not in sources:
+            stats["not_in_games"] += len(library_index[music_id])
+            continue
+        for path, entry in library_index[music_id]:
+            source = pick_source(entry, sources[music_id])
+            diff = compare(entry, source)
+            if not diff:
+                continue
+            where = f"{os.path.relpath(path, library)} ({source['_origin']})"
+            for mode, level, _ in diff.get("radars", []):
+                print(f"{where}: empty groove radar {mode} {level}")
+            for k, title in diff.get("titles", {}).items():
+                print(f"{where}: placeholder {k} -> {title!r}")
+            for k, (old, new) in diff.get("difficulties", {}).items():
+                print(f"{where}: difficulty {k} is {old}, {new} in the game")
+            stats["radars"] += len(diff.get("radars", []))
+            stats["titles"] += len(diff.get("titles", {}))
+            stats["difficulties"] += len(diff.get("difficulties", {}))
+            if apply and ("radars" in diff or "titles" in diff):
+                stats["written"] += apply_diff(path, diff)
+    return stats
@@ -0,0 +1,147 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# ----------------------------
+# Search indexes for the song list.
+# Built once per loaded file (in the background, see the GUI), then every keystroke of the filter box
+# is answered from the indexes instead of looking at every row again:
+# - Short pieces: every 1 and 2 letter piece of music_id and title -> rows. That's the exact answer for
+#   words of 1 or 2 letters.
+# - Trigrams: every 3 letter piece of music_id and title -> rows. Words of 3+ letters only check the rows
+#   that have all of their trigrams.
+# Either way a word matches anywhere in the music_id or the title, however long it is.
+# - Numbers: sorted (value, row) lists for BPM and every difficulty, ranges found with bisect.
+#
+# Filter syntax: words (all must match the music_id or the title), plus numeric filters:
+#   bpm:150  bpm:150-200  bpm>=180  sp:9  dp.heavy>=10  sp.chl:8-10
+# 'sp'/'dp' alone matches any level of that mode. Levels can be full names or the table abbreviations.
+# ----------------------------
+
+LEVELS = ("beginner", "light", "standard", "heavy", "challenge")
+LEVEL_ALIASES = {"beg": "beginner", "lgt": "light", "std": "standard", "hvy": "heavy", "chl": "challenge"}
+MODES = {"sp": "single", "dp": "double"}
+
+NUMERIC_FILTER = re.compile(r"^([a-z.]+)(:|>=|<=|>|<|=)(\d+)(?:-(\d+))?$")
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def short_pieces(text: str) -> Set[str]:
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SongIndex:
+    """
+    'songs' is one dict per table row: music_id, title, bpm1, bpm2 and difficulties
+    ({"single": {level: value}, "double": {...}}, like build_difficulties gives).
+    """
+
+    def __init__(self, songs: Iterable[Dict[str, Any]]):
+        self.texts: List[Tuple[str, str]] = []          # row -> (music_id, title), lowercase
+        self.short: Dict[str, Set[int]] = {}            # 1 and 2 letter pieces -> rows
+        self.trigrams: Dict[str, Set[int]] = {}
+        self.numbers: Dict[str, List[Tuple[int, int]]] = {}  # key -> sorted (value, row)
+
+        for row, song in enumerate(songs):
+            mid = song["music_id"].lower()
+            title = (song.get("title") or "").lower()
+            self.texts.append((mid, title))
+            for piece in short_pieces(mid) | short_pieces(title):
+                self.short.setdefault(piece, set()).add(row)
+            for gram in trigrams(mid) | trigrams(title):
+                self.trigrams.setdefault(gram, set()).add(row)
+
+            # BPM range: a song with a 75-150 change shows up for bpm:100 too
+            bpm_hi = max(song.get("bpm1", 0), song.get("bpm2", 0))
+            bpm_lo = min(song.get("bpm1", 0), song.get("bpm2", 0)) or bpm_hi
+            self.numbers.setdefault("bpm_lo", []).append((bpm_lo, row))
+            self.numbers.setdefault("bpm_hi", []).append((bpm_hi, row))
+            for mode_key, mode in MODES.items():
+                for lvl in LEVELS:
+                    value = song["difficulties"][mode].get(lvl, 0)
+                    if value:
+                        self.numbers.setdefault(f"{mode_key}.{lvl}", []).append((value, row))
+
+        for values in self.numbers.values():
+            values.sort()
+        self.all_rows = set(range(len(self.texts)))
+
+    def __len__(self):
+        return len(self.texts)
+
+    # ----------------------------
+    # Lookups, each one gives a set of rows
+    # ----------------------------
+
+    def rows_with_text(self, word: str) -> Set[int]:
+        if len(word) < 3:
+            return set(self.short.get(word, ()))
+        candidates = None
+        for gram in trigrams(word):
+            rows = self.trigrams.get(gram)
+            if not rows:
+                return set()
+            candidates = set(rows) if candidates is None else candidates & rows
+        # Trigrams say "maybe", the text says "yes"
+        return {row for row in candidates if word in self.texts[row][0] or word in self.texts[row][1]}
+
+    def rows_in_range(self, key: str, lo: int, hi: int) -> Set[int]:
+        values = self.numbers.get(key, [])
+        start = bisect_left(values, (lo, -1))
+        end = bisect_right(values, (hi, len(self.texts)))
+        return {row for _, row in values[start:end]}
+
+    def rows_for_number(self, field: str, lo: int, hi: int) -> Optional[Set[int]]:
+        if field == "bpm":
+            # Ranges overlap: the song's lowest BPM <= hi and its highest BPM >= lo
+            return self.rows_in_range("bpm_lo", 0, hi) & self.rows_in_range("bpm_hi", lo, 1 << 30)
+        mode, _, level = field.partition(".")
+        if mode not in MODES:
+            return None
+        if not level:
+            rows: Set[int] = set()
+            for lvl in LEVELS:
+                rows |= self.rows_in_range(f"{mode}.{lvl}", lo, hi)
+            return rows
+        level = LEVEL_ALIASES.get(level, level)
+        if level not in LEVELS:
+            return None
+        return self.rows_in_range(f"{mode}.{level}", lo, hi)
+
+    # ----------------------------
+    # Filter box
+    # ----------------------------
+
+    def search(self, query: str) -> Set[int]:
+        """Rows matching every term of the query. An empty query matches everything."""
+        result = self.all_rows
+        for term in query.lower().split():
+            rows = self.term_rows(term)
+            result = result & rows
+            if not result:
+                break
+        return result
+
+    def term_rows(self, term: str) -> Set[int]:
+        m = NUMERIC_FILTER.match(term)
+        if m:
+            field, op, value, upper = m.group(1), m.group(2), int(m.group(3)), m.group(4)
+            lo, hi = value, value
+            if upper is not None:
+                hi = int(upper)
+            elif op == ">=":
+                hi = 1 << 30
+            elif op == ">":
+                lo, hi = value + 1, 1 << 30
+            elif op == "<=":
+                lo = 0
+            elif op == "<":
+                lo, hi = 0, value - 1
+            rows = self.rows_for_number(field, lo, hi)
+            if rows is not None:
+                return rows
+        # Not a numeric filter we know: plain text (music_ids like "max300" are text too)
+        return self.rows_with_text(term)
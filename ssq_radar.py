@@ -0,0 +1,206 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from EXOM_PE_CLI import RADAR_METRICS
+
+# ----------------------------
+# Groove radar from the step charts (.ssq files).
+# Some games (and some songs) have no radar values at all in the executable, they're exported as 0.
+# With the charts at hand, the values can be calculated instead, for all the notes of a chart at once.
+#
+# .ssq layout (little endian): chunks, one after the other, until a chunk of size 0:
+#   size (i32, header included), kind (i16), param (i16), then:
+#   kind 1, tempo: param = ticks per second. count (i32), measure offsets[count] (i32), ticks[count] (i32).
+#                  4096 offset units per measure (1024 per beat). A stop is two entries with the same offset.
+#   kind 3, steps: param = chart, low byte 0x14 single / 0x18 double, high byte the difficulty.
+#                  count (i32), offsets[count] (i32), steps[count] (u8: one bit per arrow, 2nd player on the
+#                  high nibble). A step of 0 is a freeze end: its arrows and kind (u8, u8, kind 1 = freeze)
+#                  come after the steps, one pair per 0 step, in order.
+#   Other kinds (background changes, lamps...) are skipped.
+#
+# The formulas are the ones the community worked out for DDR X, close to the official values but not always
+# exactly the same (chaos especially). They only fill radars that are 0, never replace real ones.
+# ----------------------------
+
+CHUNK = struct.Struct("<iHH")
+KIND_TEMPO = 1
+KIND_STEPS = 3
+UNITS_PER_BEAT = 1024
+CHART_MODES = {0x14: "single", 0x18: "double"}
+CHART_LEVELS = {1: "light", 2: "standard", 3: "heavy", 4: "beginner", 6: "challenge"}
+FREEZE = 1
+
+# How far off the beat a note is: notes per beat of its rhythm -> chaos weight
+QUANT_WEIGHTS = ((1, 0), (2, 2), (3, 4), (4, 4), (6, 6), (8, 6), (12, 8), (16, 8))
+OFFBEAT_WEIGHT = 10      # Anything finer than 16ths / 48ths
+
+
+def read_chunks(data: bytes) -> List[Tuple[int, int, bytes]]:
+    """(kind, param, body) of every chunk."""
+    chunks = []
+    pos = 0
+    while pos + CHUNK.size <= len(data):
+        size, kind, param = CHUNK.unpack_from(data, pos)
+        if size <= 0:
+            break
+        chunks.append((kind, param, data[pos + CHUNK.size:pos + size]))
+        pos += size
+    return chunks
+
+
+def parse_tempo(param: int, body: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """(measure offsets, seconds) of the tempo points."""
+    count, = struct.unpack_from("<i", body, 0)
+    values = np.frombuffer(body, dtype="<i4", count=2 * count, offset=4)
+    return values[:count].astype(np.float64), values[count:].astype(np.float64) / param
+
+
+def parse_steps(body: bytes) -> Dict[str, np.ndarray]:
+    count, = struct.unpack_from("<i", body, 0)
+    offsets = np.frombuffer(body, dtype="<i4", count=count, offset=4).astype(np.int64)
+    steps = np.frombuffer(body, dtype=np.uint8, count=count, offset=4 + 4 * count)
+    # Arrows and kind of every 0 step, right after the steps
+    zeros = int((steps == 0).sum())
+    extra = np.frombuffer(body, dtype=np.uint8, count=2 * zeros, offset=4 + 5 * count).reshape(zeros, 2) \
+        if len(body) >= 4 + 5 * count + 2 * zeros else np.zeros((0, 2), dtype=np.uint8)
+    return {"offsets": offsets, "steps": steps, "extra": extra}
+
+
+def parse_ssq(data: bytes) -> Tuple[Optional[Tuple[np.ndarray, np.ndarray]], Dict[Tuple[str, str], Dict[str, np.ndarray]]]:
+    """Tempo points and the charts of a .ssq file, by (mode, level)."""
+    tempo = None
+    charts = {}
+    for kind, param, body in read_chunks(data):
+        if kind == KIND_TEMPO and tempo is None:
+            tempo = parse_tempo(param, body)
+        elif kind == KIND_STEPS:
+            mode = CHART_MODES.get(param & 0xFF)
+            level = CHART_LEVELS.get(param >> 8)
+            if mode and level:
+                charts[(mode, level)] = parse_steps(body)
+    return tempo, charts
+
+
+def to_seconds(offsets: np.ndarray, tempo: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Time of every offset. After the last tempo point, the last tempo goes on."""
+    t_off, t_sec = tempo
+    seconds = np.interp(offsets, t_off, t_sec)
+    if len(t_off) >= 2 and t_off[-1] > t_off[-2]:
+        slope = (t_sec[-1] - t_sec[-2]) / (t_off[-1] - t_off[-2])
+        after = offsets > t_off[-1]
+        seconds[after] = t_sec[-1] + (offsets[after] - t_off[-1]) * slope
+    return seconds
+
+
+def popcount(steps: np.ndarray) -> np.ndarray:
+    return np.unpackbits(steps[:, None], axis=1).sum(axis=1)
+
+
+def quant_weights(offsets: np.ndarray) -> np.ndarray:
+    """Chaos weight of every note, from its position inside the beat."""
+    pos = (offsets % UNITS_PER_BEAT) / UNITS_PER_BEAT
+    weights = np.full(len(offsets), OFFBEAT_WEIGHT, dtype=np.float64)
+    # Finest rhythm first, the coarser ones overwrite it: an 8th is on the 16th grid too
+    for per_beat, weight in reversed(QUANT_WEIGHTS):
+        on_grid = np.abs(pos * per_beat - np.round(pos * per_beat)) < 0.01
+        weights[on_grid] = weight
+    return weights
+
+
+def freeze_beats(chart: Dict[str, np.ndarray]) -> float:
+    """Beats with a freeze arrow held, from the arrow it starts on to its end."""
+    offsets, steps, extra = chart["offsets"], chart["steps"], chart["extra"]
+    ends = np.flatnonzero(steps == 0)[:len(extra)]
+    is_freeze = extra[:len(ends), 1] == FREEZE
+    ends, arrows = ends[is_freeze], extra[:len(ends)][is_freeze, 0]
+    held = np.zeros(len(ends))
+    for bit in range(8):
+        mask = 1 << bit
+        on_arrow = np.flatnonzero(steps & mask)
+        ending = (arrows & mask) != 0
+        if not len(on_arrow) or not ending.any():
+            continue
+        # The freeze starts on the last step of that arrow before its end
+        starts = np.searchsorted(on_arrow, ends[ending]) - 1
+        ok = starts >= 0
+        length = np.zeros(ending.sum())
+        length[ok] = offsets[ends[ending][ok]] - offsets[on_arrow[starts[ok]]]
+        held[ending] = np.maximum(held[ending], length)
+    return held.sum() / UNITS_PER_BEAT
+
+
+def scaled(value: float, knee: float, low_div: float, high_add: float, high_div: float) -> int:
+    """The radar curves: linear up to 'knee', flatter after it."""
+    return int(round(value / low_div if value <= knee else (value + high_add) * 100 / high_div))
+
+
+def chart_radar(chart: Dict[str, np.ndarray], tempo: Tuple[np.ndarray, np.ndarray]) -> Dict[str, int]:
+    offsets, steps = chart["offsets"], chart["steps"]
+    notes = steps != 0
+    note_offsets = offsets[notes]
+    if len(note_offsets) < 2:
+        return dict.fromkeys(RADAR_METRICS, 0)
+
+    seconds = to_seconds(note_offsets.astype(np.float64), tempo)
+    length = max(seconds[-1] - seconds[0], 1.0)
+    beats = note_offsets / UNITS_PER_BEAT
+    total_beats = max(beats[-1] - beats[0], 1.0)
+    avg_bpm = total_beats * 60 / length
+    arrows = popcount(steps[notes])
+
+    # Stream: notes per minute
+    stream = len(note_offsets) * 60 / length
+    # Voltage: most notes in 4 beats, as notes per minute at the average BPM
+    peak = (np.searchsorted(beats, beats + 4, side="left") - np.arange(len(beats))).max()
+    voltage = peak * avg_bpm / 4
+    # Air: jumps per minute
+    air = (arrows >= 2).sum() * 60 / length
+    # Freeze: held beats per 10000 beats
+    freeze = freeze_beats(chart) / total_beats * 10000
+    # Chaos: off beat notes (the further off, the more), jumps count per arrow, over the length. Faster songs weigh more
+    chaos = (quant_weights(note_offsets) * arrows).sum() * avg_bpm / 120 * 100 / length
+
+    return {
+        "voltage": scaled(voltage, 600, 6, 594, 1194),
+        "stream": scaled(stream, 300, 3, -139, 161),
+        "air": scaled(air, 55, 0.55, 36, 91),
+        "chaos": scaled(chaos, 2000, 20, 21605, 23605),
+        "freeze": scaled(freeze, 3500, 35, 2484, 5984),
+    }
+
+
+def ssq_radars(path: str) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """{mode: {level: radar}} of every chart in a .ssq file. Empty if it has no tempo."""
+    with open(path, "rb") as f:
+        tempo, charts = parse_ssq(f.read())
+    result: Dict[str, Dict[str, Dict[str, int]]] = {}
+    if tempo is None:
+        return result
+    for (mode, level), chart in charts.items():
+        result.setdefault(mode, {})[level] = chart_radar(chart, tempo)
+    return result
+
+
+def _folder_task(path: str) -> Tuple[str, Dict[str, Any]]:
+    music_id = os.path.splitext(os.path.basename(path))[0].lower()
+    try:
+        return music_id, ssq_radars(path)
+    except (OSError, ValueError, struct.error):
+        return music_id, {}
+
+
+def radars_for_folder(folder: str, workers: int = None) -> Dict[str, Dict[str, Any]]:
+    """{music_id: {mode: {level: radar}}} for every '<music_id>.ssq' in a folder (and the ones inside it)."""
+    paths = []
+    for root, _, names in os.walk(folder):
+        paths += [os.path.join(root, n) for n in sorted(names) if n.lower().endswith(".ssq")]
+    result = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for music_id, radars in pool.map(_folder_task, paths, chunksize=16):
+            if radars:
+                result[music_id] = radars
+    return result
@@ -0,0 +1,215 @@
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+import iso9660
+
+# ----------------------------
+# Whole disc scan.
+# Some games keep their song data in overlay files, not in the main executable.
+# This walks a whole folder or disc image looking for:
+# - Song tables: records with a fixed size (stride) that start with a short name (music_id).
+# - Title tables: lots of short names stored as strings, close to each other.
+#
+# Files are read in fixed size chunks (memory mapped), with some overlap between chunks so
+# nothing is lost at the borders. Chunks are spread across worker processes, so memory use
+# doesn't depend on how big the image is.
+# ----------------------------
+
+CHUNK_SIZE = 4 * 1024 * 1024
+# Enough to see a few records of even the biggest tables (ddr.dll uses 672 bytes) on both sides of a border
+OVERLAP = 64 * 1024
+
+MIN_STRIDE = 64
+MAX_STRIDE = 1024
+MIN_RECORDS = 16          # Fewer than this in a row is probably just a coincidence
+MAX_TITLE_GAP = 256       # Max distance between two short names of the same title table
+
+# Short name at the start of a record: 4-6 lowercase letters/digits, not preceded by another one,
+# followed by a NUL.
+RECORD_NAME = re.compile(rb"(?<![a-z0-9])[a-z0-9]{4,6}\x00")
+# Short name as a string on its own: NUL, name, NUL.
+STRING_NAME = re.compile(rb"\x00([a-z0-9]{4,5})\x00")
+
+
+# ----------------------------
+# What to scan
+# A source is (file to open, where the data starts inside it, size, name to show).
+# For disc images each file inside is a source, so offsets are reported per file.
+# ----------------------------
+
+def iter_sources(path: str) -> Iterator[Tuple[str, int, int, str]]:
+    if os.path.isdir(path):
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                full = os.path.join(root, name)
+                size = os.path.getsize(full)
+                if size:
+                    yield full, 0, size, full
+    elif iso9660.is_iso(path):
+        with iso9660.IsoImage(path) as iso:
+            if iso.raw_sector != iso9660.SECTOR_SIZE:
+                # Raw sectors aren't contiguous, scan the image as it is
+                yield path, 0, os.path.getsize(path), path
+                return
+            for entry in iso.walk():
+                if entry.size:
+                    yield path, entry.lba * iso9660.SECTOR_SIZE, entry.size, f"{path}:/{entry.path}"
+    else:
+        yield path, 0, os.path.getsize(path), path
+
+
+def iter_chunks(path: str) -> Iterator[Tuple[str, int, int, int, str]]:
+    """Tasks for the workers: (file, source start, chunk start inside the source, chunk length, name)."""
+    for file, start, size, label in iter_sources(path):
+        pos = 0
+        while pos < size:
+            length = min(CHUNK_SIZE + OVERLAP, size - pos)
+            yield file, start, pos, length, label
+            pos += CHUNK_SIZE
+
+
+# ----------------------------
+# Detectors. Offsets are relative to the start of the buffer given.
+# ----------------------------
+
+def find_record_tables(buf, start: int, end: int) -> List[Dict[str, Any]]:
+    positions = [m.start() for m in RECORD_NAME.finditer(buf, start, end)]
+    present = set(positions)
+    seen = set()
+    found = []
+    for i, p in enumerate(positions):
+        # The stride is the distance to one of the next few names
+        for q in positions[i + 1:i + 9]:
+            stride = q - p
+            if stride > MAX_STRIDE:
+                break
+            if stride < MIN_STRIDE or (p, stride) in seen:
+                continue
+            count = 1
+            nxt = p + stride
+            while nxt in present:
+                seen.add((nxt, stride))
+                count += 1
+                nxt += stride
+            if count >= MIN_RECORDS:
+                found.append({"kind": "song_table", "offset": p, "end": p + count * stride,
+                              "stride": stride, "count": count, "score": count})
+    return found
+
+
+def find_title_tables(buf, start: int, end: int) -> List[Dict[str, Any]]:
+    found = []
+    run = []
+    for m in STRING_NAME.finditer(buf, start, end):
+        if run and m.start(1) - run[-1] > MAX_TITLE_GAP:
+            found.extend(_title_run(run))
+            run = []
+        run.append(m.start(1))
+    found.extend(_title_run(run))
+    return found
+
+
+def _title_run(run: List[int]) -> List[Dict[str, Any]]:
+    if len(run) < MIN_RECORDS:
+        return []
+    span = run[-1] - run[0] + 1
+    # More names in less space ranks higher, but the amount of names matters most.
+    density = len(run) / span
+    return [{"kind": "title_table", "offset": run[0], "end": run[-1], "count": len(run),
+             "score": round(len(run) * (1 + density), 2)}]
+
+
+def scan_chunk(task: Tuple[str, int, int, int, str]) -> List[Dict[str, Any]]:
+    file, src_start, pos, length, label = task
+    abs_start = src_start + pos
+    aligned = abs_start - abs_start % mmap.ALLOCATIONGRANULARITY
+    delta = abs_start - aligned
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), delta + length, access=mmap.ACCESS_READ, offset=aligned) as mm:
+        found = find_record_tables(mm, delta, delta + length) + find_title_tables(mm, delta, delta + length)
+    for c in found:
+        # From "inside this window" to "inside the source file"
+        c["offset"] += pos - delta
+        c["end"] += pos - delta
+        c["file"] = label
+    return found
+
+
+# ----------------------------
+# Merge and rank
+# ----------------------------
+
+def merge_candidates(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The same table can show up in two chunks (overlap), or in pieces if it's bigger than a chunk.
+    Candidates of the same file/kind/stride that touch each other are joined.
+    """
+    candidates.sort(key=lambda c: (c["file"], c["kind"], c.get("stride", 0), c["offset"]))
+    merged: List[Dict[str, Any]] = []
+    for c in candidates:
+        last = merged[-1] if merged else None
+        if (last and last["file"] == c["file"] and last["kind"] == c["kind"]
+                and last.get("stride") == c.get("stride") and c["offset"] <= last["end"] + MAX_TITLE_GAP):
+            if c["kind"] == "song_table" and (c["offset"] - last["offset"]) % c["stride"]:
+                merged.append(c)
+                continue
+            if c["end"] > last["end"]:
+                if c["kind"] == "song_table":
+                    last["count"] = (c["end"] - last["offset"]) // c["stride"]
+                    last["score"] = last["count"]
+                else:
+                    # Overlapping title runs: the names in the overlap were counted twice, close enough for ranking
+                    last["count"] += c["count"]
+                    last["score"] += c["score"]
+                last["end"] = c["end"]
+            continue
+        merged.append(dict(c))
+    merged.sort(key=lambda c: -c["score"])
+    return drop_shadowed(merged)
+
+
+def drop_shadowed(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    A song table with stride N also looks like a table with stride 2N, 3N...
+    and the names inside it look like a (weird) title table, and the other way around.
+    Keep only the real one.
+    """
+    def shadowed(c):
+        for t in candidates:
+            if t is c or t["file"] != c["file"] or t["offset"] >= c["end"] or c["offset"] >= t["end"]:
+                continue
+            if t["kind"] == "song_table":
+                if c["kind"] == "title_table" and t["count"] >= c["count"]:
+                    return True
+                if c["kind"] == "song_table" and c["stride"] > t["stride"] and c["stride"] % t["stride"] == 0:
+                    return True
+            # Titles of similar length inside a title table can look like records too
+            elif c["kind"] == "song_table" and t["count"] >= 2 * c["count"]:
+                return True
+        return False
+
+    return [c for c in candidates if not shadowed(c)]
+
+
+def scan(path: str, workers: int = None) -> List[Dict[str, Any]]:
+    """Ranked candidates (best first) found in a folder, disc image or file."""
+    found: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(scan_chunk, iter_chunks(path), chunksize=4):
+            found.extend(result)
+    return merge_candidates(found)
+
+
+def print_candidates(candidates: List[Dict[str, Any]], limit: int = 20):
+    if not candidates:
+        print("Nothing that looks like a song or title table was found.")
+        return
+    for c in candidates[:limit]:
+        if c["kind"] == "song_table":
+            print(f"[song table]  {c['file']} @ {c['offset']} ({hex(c['offset'])}): {c['count']} records of {c['stride']} bytes"
+                  f" -> offset={c['offset']}, end_offset={c['end']}, block_size={c['stride']}")
+        else:
+            print(f"[title table] {c['file']} @ {c['offset']} ({hex(c['offset'])}): {c['count']} short names"
+                  f" -> titles_offset_start~{c['offset']}, titles_offset_end~{c['end']}")
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EXOM_PE_CLI import SongTable, block_layout, build_difficulties, nibble_difficulty_fields
+
+BLOCK_SIZE = 16
+# Single: light 3, standard 5, heavy 7, challenge 9, beginner 1. Double: light 4, standard 6, heavy 8, challenge 10
+NIBBLES = bytes([0x53, 0x97, 0x01, 0x00, 0x64, 0xA8, 0x00, 0x00])
+EXPECTED = {"single": {"beginner": 1, "light": 3, "standard": 5, "heavy": 7, "challenge": 9},
+            "double": {"beginner": 0, "light": 4, "standard": 6, "heavy": 8, "challenge": 10}}
+
+
+def difficulties(cfg, block: bytes):
+    return build_difficulties(SongTable(block, 0, 1, block_layout(cfg)).records()[0])
+
+
+def make_block(payload: bytes) -> bytes:
+    return (b"abcd\x00" + payload).ljust(BLOCK_SIZE, b"\x00")
+
+
+def test_nibble_fields():
+    cfg = {"block_size": BLOCK_SIZE,
+           "fields": [["music_id", "0x0", 5, "string"]] + nibble_difficulty_fields("single", 5)
+           + nibble_difficulty_fields("double", 9)}
+    assert difficulties(cfg, make_block(NIBBLES)) == EXPECTED
+
+
+def test_byte_fields():
+    cfg = {"block_size": BLOCK_SIZE, "fields": [["music_id", "0x0", 5, "string"], ["single_light", "0x5", 1, "u8"],
+                                                ["double_challenge", "0x6", 1, "u8"]]}
+    result = difficulties(cfg, make_block(bytes([12, 18])))
+    assert result["single"] == {"beginner": 0, "light": 12, "standard": 0, "heavy": 0, "challenge": 0}
+    assert result["double"]["challenge"] == 18
+
+
+def test_legacy_difficulty_groups():
+    cfg = {"block_size": BLOCK_SIZE, "difficulty_scale": "1_10",
+           "fields": [["music_id", "0x0", 5, "string"], ["single_difficulties", "0x5", 4, "bytes"],
+                      ["double_difficulties", "0x9", 4, "bytes"]]}
+    assert difficulties(cfg, make_block(NIBBLES)) == EXPECTED
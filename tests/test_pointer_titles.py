@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EXOM_PE_CLI import parse_titles_pointers
+
+BASE = 0x100000
+
+
+def make_file(*titles: bytes):
+    """A file with the titles at 0x100, and one decoded block per title with its address."""
+    strings = bytearray()
+    addresses = []
+    for t in titles:
+        addresses.append(BASE + 0x100 + len(strings))
+        strings += t + b"\x00"
+    data = bytes(0x100) + strings
+    blocks = [{"music_id": f"s{i:03d}", "title_ptr": a} for i, a in enumerate(addresses)]
+    return data, blocks
+
+
+def test_non_ascii_titles():
+    data, blocks = make_file("ヒマワリ".encode("utf-8"), "Café Łódź".encode("utf-8"), b"na\xefve")
+    titles = parse_titles_pointers(data, blocks, BASE)
+    assert titles["s000"] == ("ヒマワリ", "ヒマワリ")
+    assert titles["s001"] == ("Café Łódź", "Café Łódź")
+    # Not utf-8: latin-1, like the title tables
+    assert titles["s002"][0] == "naïve"
+
+
+def test_null_and_outside_pointers_have_no_title():
+    data, blocks = make_file(b"Song")
+    blocks += [{"music_id": "null", "title_ptr": 0}, {"music_id": "far", "title_ptr": BASE + len(data) + 16}]
+    titles = parse_titles_pointers(data, blocks, BASE)
+    assert titles == {"s000": ("Song", "Song")}
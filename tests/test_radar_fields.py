@@ -0,0 +1,65 @@
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EXOM_PE_CLI import SongTable, block_layout, block_to_package, parse_block, radar_matrix_from_block
+
+BLOCK_SIZE = 16
+
+
+def table_cfg(fields):
+    return {"block_size": BLOCK_SIZE, "difficulty_scale": "1_20", "fields": fields}
+
+
+def export(cfg, block: bytes):
+    record = SongTable(block, 0, 1, block_layout(cfg)).records()[0]
+    return block_to_package(record, cfg, "TEST", {})["groove_radar"]
+
+
+def make_block(*values) -> bytes:
+    block = bytearray(BLOCK_SIZE)
+    block[0:5] = b"abcd\x00"
+    pos = 5
+    for fmt, value in values:
+        struct.pack_into(fmt, block, pos, value)
+        pos += struct.calcsize(fmt)
+    return bytes(block)
+
+
+def test_u32_radar_is_not_cut():
+    cfg = table_cfg([["music_id", "0x0", 5, "string"],
+                     ["voltage_single_light", "0x5", 4, "u32_le"],
+                     ["stream_single_light", "0x9", 2, "u16_le"]])
+    block = make_block(("<I", 589833), ("<H", 77))
+    radar = export(cfg, block)["single"]["light"]
+    assert radar["voltage"] == 589833
+    assert radar["stream"] == 77
+
+
+def test_signed_and_bits_radar():
+    cfg = table_cfg([["music_id", "0x0", 5, "string"],
+                     ["chaos_double_heavy", "0x5", 2, "s16_le"],
+                     ["air_double_heavy", "0x7", 1, "nibble_hi"]])
+    block = make_block(("<h", -3), ("<B", 0xA5))
+    radar = export(cfg, block)["double"]["heavy"]
+    assert radar["chaos"] == -3
+    assert radar["air"] == 0xA
+
+
+def test_sequential_radar_fields_keep_offsets():
+    fields = [["music_id", 5, "string"],
+              ["voltage_single_standard", 2, "u16_le"],
+              ["freeze_single_standard", 4, "u32_le"],
+              ["bpm1", 2, "u16_le"]]
+    cfg = table_cfg(fields)
+    block = make_block(("<H", 12), ("<I", 100000), ("<H", 150))
+    record = SongTable(block, 0, 1, block_layout(cfg)).records()[0]
+    radar = block_to_package(record, cfg, "TEST", {})["groove_radar"]["single"]["standard"]
+    assert radar["voltage"] == 12
+    assert radar["freeze"] == 100000
+    assert record["bpm1"] == 150
+    # Same values as the plain per field parse
+    plain = parse_block(block, fields)
+    assert list(radar_matrix_from_block(plain)) == list(record["radar"])
@@ -0,0 +1,60 @@
+import gc
+import mmap
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binary_sections
+from binary_sections import section_index
+from EXOM_PE_CLI import build_titles_map, decode_game
+
+
+def test_cache_goes_away_with_the_buffer():
+    data = mmap.mmap(-1, 4096)
+    index = section_index(data)
+    assert section_index(data) is index
+    key = id(data)
+    data.close()
+    del data
+    gc.collect()
+    assert key not in binary_sections._indexes
+
+
+def test_bytes_are_never_kept():
+    data = bytes(4096)
+    before = sys.getrefcount(data)
+    section_index(data)
+    assert sys.getrefcount(data) == before
+    assert id(data) not in binary_sections._indexes
+
+
+def make_elf() -> bytes:
+    """Stripped 32-bit ELF loaded at 0x100000: one 12 byte block (music_id, title pointer) at 0x100, title at 0x200."""
+    data = bytearray(0x300)
+    data[0:6] = b"\x7fELF\x01\x01"
+    struct.pack_into("<II", data, 0x1C, 0x34, 0)
+    struct.pack_into("<HHHHH", data, 0x2A, 32, 1, 40, 0, 0)
+    struct.pack_into("<IIIIII", data, 0x34, 1, 0, 0x100000, 0x100000, len(data), len(data))
+    data[0x100:0x105] = b"abcd\x00"
+    struct.pack_into("<I", data, 0x108, 0x100200)
+    data[0x200:0x20A] = b"Some Song\x00"
+    return bytes(data)
+
+
+def test_bytes_are_parsed_once_per_decode(monkeypatch):
+    calls = []
+    parse = binary_sections.parse_sections
+    monkeypatch.setattr(binary_sections, "parse_sections", lambda data: calls.append(1) or parse(data))
+    cfg = {"offset": "va:0x100100", "end_offset": "va:0x10010C", "block_size": 12, "difficulty_scale": "1_20",
+           "titles_parser": "parse_titles_pointers",
+           "fields": [["music_id", "0x0", 5, "string"], ["title_ptr", "0x8", 4, "ptr_le"]]}
+    blocks, titles = decode_game("TEST", cfg, make_elf())
+    assert titles == {"abcd": ("Some Song", "Some Song")}
+    assert len(calls) == 1
+
+
+def test_empty_title_offsets_are_skipped():
+    cfg = {"titles_offset_start": "", "titles_offset_end": " ", "titles_parser": "parse_titles"}
+    assert build_titles_map(make_elf(), cfg, [{"music_id": "abcd"}]) == {}
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from song_index import SongIndex
+
+NO_DIFFICULTIES = {"single": {}, "double": {}}
+
+
+def make_index(*titles):
+    return SongIndex({"music_id": f"s{i:03d}", "title": t, "bpm1": 150, "bpm2": 150, "difficulties": NO_DIFFICULTIES}
+                     for i, t in enumerate(titles))
+
+
+def test_short_words_match_anywhere_like_long_ones():
+    index = make_index("Song 1 Benchmark Mix", "MAX 300")
+    assert index.search("mix") == {0}
+    assert index.search("mi") == {0}
+    assert index.search("ix") == {0}
+    assert index.search("m") == {0, 1}
+    assert index.search("30") == {1}
+    assert index.search("s0") == {0, 1}
+    assert index.search("zz") == set()
@@ -0,0 +1,155 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from EXOM_PE_CLI import TITLE_PARSERS, parse_titles_sequential
+from binary_sections import SectionIndex, section_index
+
+# ----------------------------
+# Title table detection.
+# Once the song table is mapped, the music_ids are known. The title table is where most of them show up
+# again as strings (NUL, short name, NUL), close to each other:
+# 1. One regex finds every short string that could be a short name (lowercase letters/digits, NUL terminated)
+#    in the data sections of the file, and only the ones that are music_ids are kept. That's one pass over
+#    the file, however many songs there are. The song table itself is skipped, the names are there too.
+# 2. Hits are grouped in runs (no big gaps in between). The run with the most different music_ids wins.
+# 3. Every titles parser is tried on that window and scored by how many music_ids get a real, printable title.
+#    Inside the table, "title after the short name" and "title before it" read the same strings, only the edges
+#    tell them apart: the parsers that read the title after the short name get a few more strings at the end,
+#    parse_titles_reverse gets a few more at the start. Whatever is outside the table is rarely readable text.
+# ----------------------------
+
+MAX_GAP = 4096          # Max distance between two short names of the same title table
+MAX_EXTEND = 3          # Strings to look at before the first / after the last short name
+PLACEHOLDER = "Title goes here"
+
+
+def find_id_hits(data, music_ids: List[str], skip: Optional[Tuple[int, int]] = None,
+                 index: Optional[SectionIndex] = None) -> List[Tuple[int, bytes]]:
+    """(position, music_id) of every music_id found as a NUL terminated string in the data sections."""
+    ids = {mid.lower().encode("ascii", "ignore") for mid in music_ids if mid}
+    ids.discard(b"")
+    if not ids:
+        return []
+    lengths = [len(i) for i in ids]
+    pattern = re.compile(rb"[0-9a-z]{%d,%d}(?=\x00)" % (min(lengths), max(lengths)))
+    hits = []
+    for start, end in (index or section_index(data)).data_ranges():
+        for m in pattern.finditer(data, start, min(end, len(data))):
+            if m.group() not in ids or (skip and skip[0] <= m.start() < skip[1]):
+                continue
+            hits.append((m.start(), m.group()))
+    return hits
+
+
+def densest_run(hits: List[Tuple[int, bytes]]) -> Optional[Tuple[int, int, int]]:
+    """(first hit, end of last hit, different music_ids) of the run with the most different music_ids."""
+    best = None
+    run_ids = set()
+    run_start = run_end = None
+    for pos, mid in hits + [(None, None)]:
+        if pos is None or (run_end is not None and pos - run_end > MAX_GAP):
+            if run_ids and (best is None or len(run_ids) > best[2]):
+                best = (run_start, run_end, len(run_ids))
+            run_ids = set()
+            run_start = pos
+        if pos is None:
+            break
+        if run_start is None:
+            run_start = pos
+        run_ids.add(mid)
+        run_end = pos + len(mid) + 1
+    return best
+
+
+def strings_before(data, pos: int, count: int, limit: int) -> List[int]:
+    """Starts of the 'count' NUL terminated strings right before 'pos' (closest first)."""
+    starts = []
+    p = pos
+    for _ in range(count):
+        while p > limit and data[p - 1] == 0:
+            p -= 1
+        if p <= limit:
+            break
+        nul = data.rfind(b"\x00", limit, p)
+        p = nul + 1 if nul >= 0 else limit
+        starts.append(p)
+    return starts
+
+
+def strings_after(data, pos: int, count: int, limit: int) -> List[int]:
+    """Ends of the 'count' NUL terminated strings right after 'pos' (closest first)."""
+    ends = []
+    p = pos
+    for _ in range(count):
+        while p < limit and data[p] == 0:
+            p += 1
+        if p >= limit:
+            break
+        nul = data.find(b"\x00", p, limit)
+        p = nul + 1 if nul >= 0 else limit
+        ends.append(p)
+    return ends
+
+
+def is_title(title) -> bool:
+    if isinstance(title, (list, tuple)):
+        title = title[0] if title else ""
+    return bool(title) and title != PLACEHOLDER and title.isprintable()
+
+
+def score_parser(data, parser_name: str, start: int, end: int, music_ids: List[str]) -> int:
+    """How many music_ids get a real title with this parser and window."""
+    ids = [mid.lower() for mid in music_ids]
+    try:
+        if parser_name == "parse_titles_sequential":
+            titles = parse_titles_sequential(data, start, end)
+            titles_map = {mid: (t, t) for mid, t in zip(ids, titles)}
+        else:
+            titles_map = TITLE_PARSERS[parser_name](data, start, end)
+    except (ValueError, IndexError, UnicodeError):
+        return 0
+    return sum(1 for mid in set(ids) if is_title(titles_map.get(mid)))
+
+
+def detect_titles(data, music_ids: List[str], song_table: Optional[Tuple[int, int]] = None,
+                  index: Optional[SectionIndex] = None) -> Optional[Dict[str, Any]]:
+    """
+    Best guess for titles_offset_start, titles_offset_end and titles_parser, with its score.
+    None if the music_ids don't show up anywhere (the sequential parser can't be found this way).
+    """
+    hits = find_id_hits(data, music_ids, song_table, index)
+    run = densest_run(hits)
+    if run is None:
+        return None
+    first, last, found = run
+    size = len(data)
+
+    # The title can be before the short name (reverse) or after it (the rest), so try a few windows
+    starts = [first] + strings_before(data, first, MAX_EXTEND, max(0, first - MAX_GAP))
+    ends = [last] + strings_after(data, last, MAX_EXTEND, min(size, last + MAX_GAP))
+
+    candidates = []
+    total = len(set(mid.lower() for mid in music_ids))
+    for parser_name in TITLE_PARSERS:
+        windows = [(start, last) for start in starts] if parser_name == "parse_titles_reverse" else \
+                  [(first, end) for end in ends]
+        for start, end in windows:
+            score = score_parser(data, parser_name, start, end, music_ids)
+            candidates.append((score, -(end - start), parser_name, start, end))
+    # The sequential parser always "resolves" every song (in order), so it's not a real match.
+    # Only worth suggesting if nothing else gets even half of them.
+    best = max(candidates)
+    if best[0] * 2 < total:
+        seq_score = score_parser(data, "parse_titles_sequential", first, last, music_ids)
+        if seq_score > best[0]:
+            best = (seq_score, -(last - first), "parse_titles_sequential", first, last)
+
+    score, _, parser_name, start, end = best
+    return {
+        "titles_offset_start": start,
+        "titles_offset_end": end,
+        "titles_parser": parser_name,
+        "resolved": score,
+        "total": total,
+        "ids_in_window": found,
+    }